@@ -0,0 +1,54 @@
+"""
+Compares building a query string one parameter at a
+time, as QueryParameter.add_to used to, with adding
+every parameter at once.
+
+    $ python benchmarks/query_string.py
+"""
+import os
+import sys
+import timeit
+from urllib.parse import parse_qs, urlencode, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smithy.helpers import add_query_parameters  # noqa: E402
+
+
+URL = 'https://example.com/api/items?page=1&sort=name'
+# Seconds spent on each timing run
+BUDGET = 0.1
+
+
+def add_one_by_one(url, parameters):
+    for name, value in parameters:
+        existing = urlparse(url).query
+        params = parse_qs(existing)
+        params[name] = value
+        url = url.rstrip(existing).rstrip('?') + '?' + urlencode(params, doseq = True)
+    return url
+
+
+def main():
+    print('{:>6} {:>14} {:>14} {:>8}'.format('params', 'one by one', 'at once', 'speedup'))
+    for size in (1, 10, 100, 1000):
+        parameters = [('param{}'.format(n), 'value {}'.format(n)) for n in range(size)]
+        timings = []
+        for fun in (add_one_by_one, add_query_parameters):
+            timer = timeit.Timer(lambda: fun(URL, parameters))
+            # One by one is quadratic, so the number of calls is
+            # scaled to a time budget rather than to the size, and
+            # calls slower than the budget are only timed once
+            single = timer.timeit(number = 1)
+            if single >= BUDGET:
+                timings.append(single * 1e6)
+                continue
+            number = min(10000, int(BUDGET / single))
+            best = min(timer.repeat(number = number, repeat = 3))
+            timings.append(best / number * 1e6)
+        print('{:>6} {:>12.1f}us {:>12.1f}us {:>7.1f}x'.format(
+            size, timings[0], timings[1], timings[0] / timings[1]))
+
+
+if __name__ == '__main__':
+    main()
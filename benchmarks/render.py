@@ -0,0 +1,81 @@
+"""
+Benchmarks RequestBlueprint.render(), which renders a
+blueprint without sending it, so template rendering can
+be measured apart from network and database time. Each
+blueprint is rendered with every template engine, after
+a single JSON body template is.
+
+    $ python benchmarks/render.py
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+
+from smithy.helpers import ENGINES, compile_template  # noqa: E402
+
+from benchmarks.send import create_blueprint  # noqa: E402
+
+
+BODY = '{"id": {{ id }}, "name": "{{ user.name }}", "email": "{{ user.email }}", "plan": "{{ plan }}"}'
+BODY_CONTEXT = {'id': 7, 'user': {'name': 'Ada', 'email': 'ada@example.com'}, 'plan': 'pro'}
+
+
+def time_template(engine : str, number : int) -> float:
+    """
+    Seconds per render of the BODY template with ``engine``,
+    including the Context the Django engine needs.
+    """
+    template = compile_template(BODY, engine)
+    return min(timeit.repeat(
+        lambda: template.render(BODY_CONTEXT), number = number, repeat = 3)) / number
+
+
+def time_render(blueprint, engine : str, number : int) -> float:
+    """
+    Seconds per render of ``blueprint`` with ``engine``.
+    """
+    blueprint.template_engine = engine
+    blueprint.save()
+    blueprint.render({'n': 0})
+    return min(timeit.repeat(
+        lambda: blueprint.render({'n': 0}), number = number, repeat = 3)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--sizes', default = '0,10,50,200',
+        help = "Comma separated numbers of headers and variables per blueprint.")
+    parser.add_argument(
+        '--number', type = int, default = 1000,
+        help = "Number of renders timed per blueprint and engine.")
+    options = parser.parse_args()
+
+    timings = [time_template(engine, options.number * 10) for engine in ENGINES]
+    print(''.join('{:>14}'.format(column) for column in ('template',) + ENGINES + ('speedup',)))
+    print('{:>14}'.format('JSON body') + ''.join(
+        '{:>12.2f}us'.format(timing * 1e6) for timing in timings
+    ) + '{:>13.1f}x\n'.format(timings[0] / timings[-1]))
+
+    call_command('migrate', verbosity = 0)
+    print(''.join('{:>14}'.format(column) for column in ('size',) + ENGINES + ('speedup',)))
+    for size in [int(size) for size in options.sizes.split(',')]:
+        blueprint = create_blueprint('http://localhost', size)
+        timings = [time_render(blueprint, engine, options.number) for engine in ENGINES]
+        print('{:>14}'.format(size) + ''.join(
+            '{:>12.1f}us'.format(timing * 1e6) for timing in timings
+        ) + '{:>13.1f}x'.format(timings[0] / timings[-1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmarks RequestBlueprint.send() against a local echo
+server, across blueprint sizes and send modes:
+
+* ``sync`` opens a new connection for every send
+* ``pooled`` reuses pooled keep-alive connections
+* ``concurrent`` sends from several threads at once
+
+Each run reports sends per second, p50/p99 latency,
+database queries per send and the peak memory allocated
+by one send. Results are written as JSON, so runs can be
+compared to catch regressions.
+
+    $ python benchmarks/send.py --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, override_settings  # noqa: E402
+
+import smithy  # noqa: E402
+from smithy.dispatch import map_concurrent  # noqa: E402
+from smithy.models import RequestBlueprint, Header, Variable  # noqa: E402
+from smithy.sessions import session_pool  # noqa: E402
+
+from tests.echo import EchoServer  # noqa: E402
+
+
+MODES = ('sync', 'pooled', 'concurrent')
+
+
+def percentile(values : list, fraction : float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def create_blueprint(url : str, size : int) -> RequestBlueprint:
+    """
+    A blueprint with ``size`` variables and as many
+    headers rendering them.
+    """
+    blueprint = RequestBlueprint.objects.create(
+        name = 'bench-{}'.format(size), method = 'GET', url = url + '/bench?n={{ n }}')
+    Variable.objects.bulk_create([
+        Variable(name = 'var{}'.format(n), value = str(n), request = blueprint)
+        for n in range(size)])
+    Header.objects.bulk_create([
+        Header(name = 'X-Bench-{}'.format(n), value = '{{{{ var{} }}}}'.format(n), request = blueprint)
+        for n in range(size)])
+    return RequestBlueprint.objects.get(pk = blueprint.pk)
+
+
+def measure_send(blueprint : RequestBlueprint) -> dict:
+    """
+    Queries and peak memory of a single, warm send.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        blueprint.send({'n': 0})
+
+    tracemalloc.start()
+    try:
+        blueprint.send({'n': 0})
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'queries_per_send': len(queries), 'peak_bytes_per_send': peak}
+
+
+def run(blueprint : RequestBlueprint, mode : str, sends : int, concurrency : int) -> dict:
+    def send(n):
+        started = time.perf_counter()
+        blueprint.send({'n': n})
+        return time.perf_counter() - started
+
+    with override_settings(SMITHY_KEEP_ALIVE = mode != 'sync'):
+        session_pool.reset()
+        blueprint.send({'n': 0})
+
+        started = time.perf_counter()
+        latencies, errors = map_concurrent(
+            send, range(sends), concurrency if mode == 'concurrent' else 1)
+        elapsed = time.perf_counter() - started
+
+        result = {} if mode == 'concurrent' else measure_send(blueprint)
+
+    latencies = [latency for latency in latencies if latency is not None]
+    result.update(
+        sends = sends,
+        errors = len(errors),
+        sends_per_second = sends / elapsed,
+        p50_ms = percentile(latencies, 0.50) * 1000,
+        p99_ms = percentile(latencies, 0.99) * 1000,
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--sizes', default = '0,10,50,200',
+        help = "Comma separated numbers of headers and variables per blueprint.")
+    parser.add_argument(
+        '--modes', default = ','.join(MODES),
+        help = "Comma separated send modes, among {}.".format(', '.join(MODES)))
+    parser.add_argument(
+        '--sends', type = int, default = 200,
+        help = "Number of sends measured per blueprint and mode.")
+    parser.add_argument(
+        '--concurrency', type = int, default = 8,
+        help = "Number of threads used by the concurrent mode.")
+    parser.add_argument(
+        '--output', help = "File the JSON results are written to, instead of stdout.")
+    options = parser.parse_args()
+
+    modes = options.modes.split(',')
+    for mode in modes:
+        if mode not in MODES:
+            parser.error("Unknown mode {!r}".format(mode))
+
+    call_command('migrate', verbosity = 0)
+    server = EchoServer().start()
+    results = []
+    try:
+        for size in [int(size) for size in options.sizes.split(',')]:
+            blueprint = create_blueprint(server.url, size)
+            for mode in modes:
+                result = dict(size = size, mode = mode, **run(
+                    blueprint, mode, options.sends, options.concurrency))
+                results.append(result)
+                sys.stderr.write(
+                    "{size:>4} {mode:<10} {sends_per_second:>8.1f} sends/s "
+                    "p50 {p50_ms:>6.2f}ms p99 {p99_ms:>6.2f}ms {queries}\n".format(
+                        queries = "{queries_per_send} queries, {peak_bytes_per_send} bytes".format(**result)
+                            if 'queries_per_send' in result else '',
+                        **result))
+    finally:
+        server.stop()
+        session_pool.close()
+
+    report = json.dumps({
+        'smithy': smithy.__version__,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'concurrency': options.concurrency,
+        'results': results,
+    }, indent = 2)
+    if options.output:
+        with open(options.output, 'w') as output:
+            output.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
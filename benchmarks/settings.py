@@ -0,0 +1,20 @@
+"""
+Settings used by the benchmarks: the test settings,
+with a throwaway sqlite file that worker threads can
+share and no query logging.
+"""
+import os
+import tempfile
+
+from tests.settings import *  # noqa: F401,F403
+
+
+DEBUG = False
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(tempfile.mkdtemp(prefix = 'smithy-bench-'), 'db.sqlite3'),
+        "OPTIONS": {"timeout": 30},
+    }
+}
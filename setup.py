@@ -56,21 +56,21 @@ setup(
         'smithy',
     ],
     include_package_data=True,
-    install_requires=["django-model-utils>=2.0", "djangocodemirror"],
+    install_requires=["Django>=3.2", "django-model-utils>=2.0", "djangocodemirror"],
+    python_requires=">=3.7",
     license="MIT",
     zip_safe=False,
     keywords='django-smithy',
     classifiers=[
         'Development Status :: 3 - Alpha',
-        'Framework :: Django :: 1.11',
-        'Framework :: Django :: 2.0',
+        'Framework :: Django :: 3.2',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: BSD License',
         'Natural Language :: English',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
     ],
 )
@@ -2,26 +2,61 @@
 from typing import List, Union
 
 from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
 from django.db import models
 from django.db.models import QuerySet
 from django.forms.widgets import TextInput
+from django.template.response import TemplateResponse
+from django.utils.html import format_html, format_html_join
 from django.conf import settings
-from smithy.models import RequestBlueprint, RequestRecord, Header, QueryParameter, Cookie, Variable, BodyParameter
+from requests_toolbelt.utils import dump
+from smithy.conf import get_setting
+from smithy.helpers import parse_dump_result
+from smithy.paginators import EstimatedCountPaginator
+from smithy.models import (
+    RequestBlueprint, RequestRecord, Header, QueryParameter, Cookie, Variable, BodyParameter, Schedule,
+    defer_row_changes)
 
 CODEMIRROR_PATH = getattr(settings, 'SMITHY_CODEMIRROR_PATH', "https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.44.0/").rstrip('/')
 
 
 def send(modeladmin, request, queryset : Union[QuerySet, List[RequestBlueprint]]):
-    for obj in queryset:
-        obj.send()
-    messages.success(request, "Sent {} request{}".format(
-        queryset.count(),
-        's' if queryset.count() != 1 else ''
-    ))
+    results = RequestBlueprint.objects.send_many(
+        queryset, concurrency = get_setting('ADMIN_SEND_CONCURRENCY'))
+    sent = len(results.sent)
+    if sent:
+        messages.success(request, "Sent {} request{}".format(
+            sent,
+            's' if sent != 1 else ''
+        ))
+    for blueprint, error in results.errors:
+        messages.error(request, "Could not send {}: {}".format(blueprint, error))
 
 send.short_description = "Send"
 
 
+def preview(modeladmin, request, queryset : Union[QuerySet, List[RequestBlueprint]]):
+    blueprints = list(queryset)
+    RequestBlueprint.objects.compile_all(blueprints)
+    previews = []
+    for blueprint in blueprints:
+        try:
+            rendered = blueprint.render()
+        except Exception as e:
+            previews.append((blueprint, None, "Could not render {}: {}".format(blueprint, e)))
+        else:
+            previews.append((blueprint, parse_dump_result(dump._dump_request_data, rendered.request), None))
+
+    return TemplateResponse(request, 'admin/smithy/requestblueprint/preview.html', dict(
+        modeladmin.admin_site.each_context(request),
+        title = "Preview",
+        opts = modeladmin.model._meta,
+        previews = previews,
+    ))
+
+preview.short_description = "Preview without sending"
+
+
 def ObjectInline(m, readonly = False):
     class Inline(admin.TabularInline):
         extra = 0
@@ -46,7 +81,6 @@ class RequestAdmin(admin.ModelAdmin):
     fields = [
         'name',
         'method',
-        #'follow_redirects',
         'url',
         'content_type',
         'body',
@@ -60,10 +94,38 @@ class RequestAdmin(admin.ModelAdmin):
     ]
 
 
+class ScheduleInline(admin.TabularInline):
+    model = Schedule
+    extra = 0
+    fields = ['interval', 'cron', 'context', 'enabled', 'next_run_at', 'last_run_at']
+    readonly_fields = ['next_run_at', 'last_run_at']
+    formfield_overrides = {
+        models.TextField: {'widget': TextInput},
+    }
+
+
 class RequestBlueprintAdmin(RequestAdmin):
     actions = [
         send,
+        preview,
     ]
+    fields = RequestAdmin.fields + [
+        'follow_redirects', 'connect_timeout', 'read_timeout', 'rate_limit', 'rate_limit_burst', 'template_engine']
+    inlines = RequestAdmin.inlines + [ScheduleInline]
+
+    def save_related(self, request, form, formsets, change):
+        # The blueprint's modified time is bumped once for
+        # all the rows saved, not once per row
+        with defer_row_changes():
+            super().save_related(request, form, formsets, change)
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is Schedule:
+            for schedule_form in formset.forms:
+                # Start over from now when the timing changes
+                if {'interval', 'cron', 'enabled'} & set(schedule_form.changed_data):
+                    schedule_form.instance.next_run_at = None
+        super().save_formset(request, form, formset, change)
 
     class Media:
         css = {
@@ -80,14 +142,77 @@ class RequestBlueprintAdmin(RequestAdmin):
         )
 
 
+class StatusListFilter(admin.SimpleListFilter):
+    """
+    Filters records by class of status, with range
+    lookups that can use the index on status.
+    """
+    title = 'status'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('2', '2xx Success'),
+            ('3', '3xx Redirection'),
+            ('4', '4xx Client error'),
+            ('5', '5xx Server error'),
+            ('none', 'No response'),
+        )
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == 'none':
+            return queryset.filter(status__isnull = True)
+        if value in ('2', '3', '4', '5'):
+            return queryset.filter(
+                status__gte = int(value) * 100,
+                status__lt = (int(value) + 1) * 100)
+        return queryset
+
+
+class RequestRecordChangeList(ChangeList):
+
+    def get_queryset(self, request):
+        # Payloads can be huge and are never shown in the list
+        return super().get_queryset(request).defer(*RequestRecordAdmin.list_deferred)
+
+
 class RequestRecordAdmin(RequestAdmin):
-    inlines = [
-        ObjectInline(Header, True),
-        ObjectInline(QueryParameter, True),
-        ObjectInline(Cookie, True),
+    ROW_TITLES = (
+        ('headers', 'Headers'),
+        ('query_parameters', 'Query parameters'),
+        ('cookies', 'Cookies'),
+    )
+
+    list_display = ['name', 'method', 'url', 'status', 'state', 'duration', 'blueprint', 'created']
+    list_filter = [StatusListFilter, 'state', 'blueprint']
+    # The blueprint is nullable, so select_related() alone
+    # would load each one in a query of its own
+    list_select_related = ['blueprint']
+    list_deferred = [
+        'body',
+        'request_text',
+        'response_text',
+        'request_payload',
+        'response_payload',
+        'context',
+        'rows',
+        'timings',
+        'redirects',
+        'error',
+        'blueprint__body',
     ]
+    date_hierarchy = 'created'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
-    fields = RequestAdmin.fields + ['raw_request', 'raw_response']
+    # Rows are rendered by request_rows, formsets would
+    # cost several queries per inline on every page load.
+    inlines = []
+
+    fields = RequestAdmin.fields + [
+        'request_rows', 'state', 'attempts', 'error', 'duration', 'timing', 'redirect_chain',
+        'raw_request', 'raw_response']
 
     def has_add_permission(self, request):
         return False
@@ -96,13 +221,40 @@ class RequestRecordAdmin(RequestAdmin):
         if obj:
             self.readonly_fields = [
                 field.name for field in obj.__class__._meta.fields
-                if field.name not in self.exclude]
+                if field.name not in self.exclude
+            ] + ['request_rows', 'timing', 'redirect_chain', 'raw_request', 'raw_response']
         return self.readonly_fields
 
-    def get_formsets_with_inlines(self, request, obj=None):
-        for inline in self.get_inline_instances(request, obj):
-            if obj is not None and inline.get_queryset(request).count() > 0:
-                yield inline.get_formset(request, obj), inline
+    def get_changelist(self, request, **kwargs):
+        return RequestRecordChangeList
+
+    def request_rows(self, obj):
+        rows = obj.get_rows()
+        return format_html_join('', '<h4>{}</h4><table>{}</table>', (
+            (title, format_html_join('', '<tr><td>{}</td><td>{}</td></tr>', rows[kind]))
+            for kind, title in self.ROW_TITLES if rows[kind]
+        )) or '-'
+
+    request_rows.short_description = 'Headers, query parameters and cookies'
+
+    def timing(self, obj):
+        timings = obj.get_timings()
+        if not timings:
+            return '-'
+        return format_html('<table>{}</table>', format_html_join(
+            '', '<tr><td>{}</td><td>{} ms</td></tr>', timings.items()))
+
+    timing.short_description = 'Timing breakdown'
+
+    def redirect_chain(self, obj):
+        redirects = obj.get_redirects()
+        if not redirects:
+            return '-'
+        return format_html('<table>{}</table>', format_html_join(
+            '', '<tr><td>{}</td><td>{} {}</td><td>{} ms</td></tr>', (
+                (hop['status'], hop['method'], hop['url'], hop['ms']) for hop in redirects)))
+
+    redirect_chain.short_description = 'Redirects'
 
     class Media:
         css = {
@@ -1,6 +1,14 @@
 # -*- coding: utf-8
+from importlib import import_module
+
 from django.apps import AppConfig
 
 
 class SmithyConfig(AppConfig):
     name = 'smithy'
+
+    def ready(self):
+        from smithy.conf import get_setting
+
+        for name in get_setting('INSTRUMENTATION'):
+            import_module(name).install()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Reads response bodies in chunks, keeping only the first
+SMITHY_RESPONSE_BODY_LIMIT bytes in memory. The size and
+SHA-256 of the whole body are always recorded, and the
+full body of a truncated response can be spilled to
+Django file storage.
+"""
+import hashlib
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage, get_storage_class
+
+from smithy.conf import get_setting
+from smithy.helpers import format_response
+
+
+HTTP_VERSIONS = {
+    9: 'HTTP/0.9',
+    10: 'HTTP/1.0',
+    11: 'HTTP/1.1',
+    20: 'HTTP/2',
+}
+
+
+def get_response_storage():
+    storage = get_setting('RESPONSE_STORAGE')
+    if not storage:
+        return None
+    if storage is True:
+        return default_storage
+    return get_storage_class(storage)()
+
+
+class BodyCapture:
+
+    def __init__(self, limit : int = None, storage = None):
+        self.limit = get_setting('RESPONSE_BODY_LIMIT') if limit is None else limit
+        self.storage = storage
+        self.head = bytearray()
+        self.size = 0
+        self.hash = hashlib.sha256()
+        self.spool = None
+        self.path = ''
+
+    @classmethod
+    def from_settings(cls):
+        return cls(storage = get_response_storage())
+
+    @property
+    def truncated(self) -> bool:
+        return self.size > len(self.head)
+
+    @property
+    def sha256(self) -> str:
+        return self.hash.hexdigest()
+
+    def feed(self, chunk : bytes):
+        self.size += len(chunk)
+        self.hash.update(chunk)
+
+        room = self.limit - len(self.head)
+        if room > 0:
+            self.head.extend(chunk[:room])
+        if len(chunk) <= room or self.storage is None:
+            return
+
+        # The body no longer fits, start spilling it
+        if self.spool is None:
+            self.spool = tempfile.TemporaryFile()
+            self.spool.write(self.head)
+            chunk = chunk[max(room, 0):]
+        self.spool.write(chunk)
+
+    def finish(self) -> str:
+        """
+        Save the spilled body, if any, and return its
+        name in storage.
+        """
+        if self.spool is None:
+            return self.path
+        try:
+            self.spool.seek(0)
+            self.path = self.storage.save(
+                'smithy/responses/{}'.format(self.sha256), File(self.spool))
+        finally:
+            self.spool.close()
+            self.spool = None
+        return self.path
+
+    def close(self):
+        if self.spool is not None:
+            self.spool.close()
+            self.spool = None
+
+    def get_body(self) -> bytes:
+        body = bytes(self.head)
+        if not self.truncated:
+            return body
+        # Don't leave half of a multi-byte character behind
+        try:
+            body.decode('utf-8')
+        except UnicodeDecodeError as e:
+            if e.reason == 'unexpected end of data':
+                body = body[:e.start]
+        return body + '\r\n\r\n<< Truncated, showing {} of {} bytes >>'.format(
+            len(self.head), self.size).encode('utf-8')
+
+    def format(self, version : str, status : int, reason : str, headers) -> str:
+        return format_response(version, status, reason, headers, self.get_body())
+
+    def get_record_values(self) -> dict:
+        return dict(
+            response_size = self.size,
+            response_sha256 = self.sha256,
+            response_file = self.path,
+        )
+
+
+def capture_response(response) -> dict:
+    """
+    Read a streamed requests response and release its
+    connection. Returns the values to store on its
+    RequestRecord.
+    """
+    capture = BodyCapture.from_settings()
+    try:
+        for chunk in response.iter_content(get_setting('RESPONSE_CHUNK_SIZE')):
+            capture.feed(chunk)
+        capture.finish()
+    finally:
+        capture.close()
+        # Hand the connection back to the pool
+        response.close()
+
+    raw = response.raw
+    headers = [
+        (name, value)
+        for name in raw.headers.keys()
+        for value in raw.headers.getlist(name)]
+
+    return dict(
+        status = response.status_code,
+        raw_response = capture.format(
+            HTTP_VERSIONS.get(raw.version, 'HTTP/?'),
+            response.status_code,
+            response.reason,
+            headers),
+        **capture.get_record_values()
+    )
+
+
+async def acapture_response(response) -> dict:
+    """
+    The asyncio counterpart of capture_response,
+    for streamed httpx responses.
+    """
+    from asgiref.sync import sync_to_async
+
+    capture = BodyCapture.from_settings()
+    try:
+        async for chunk in response.aiter_bytes(get_setting('RESPONSE_CHUNK_SIZE')):
+            capture.feed(chunk)
+        if capture.spool is not None:
+            await sync_to_async(capture.finish)()
+    finally:
+        capture.close()
+        await response.aclose()
+
+    return dict(
+        status = response.status_code,
+        raw_response = capture.format(
+            response.http_version,
+            response.status_code,
+            response.reason_phrase,
+            response.headers.multi_items()),
+        **capture.get_record_values()
+    )
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Settings used by Django Smithy. Every setting can be
+overridden in the project's settings module by
+prefixing its name with ``SMITHY_``.
+"""
+from django.conf import settings
+
+
+DEFAULTS = {
+    # Maximum number of compiled templates kept in memory
+    'TEMPLATE_CACHE_SIZE': 1024,
+    # Name of the cache in CACHES used to store send
+    # plans, or None to keep them in each process
+    'PLAN_CACHE': None,
+    # Seconds a send plan is cached for, or None to keep
+    # it until its blueprint changes
+    'PLAN_CACHE_TIMEOUT': 300,
+    # Seconds between checks of the plans kept in each
+    # process against the database, or None to not check
+    'PLAN_CACHE_CHECK_INTERVAL': 1,
+    # Maximum number of hosts with a pooled session
+    'POOL_SIZE': 32,
+    # Maximum number of connections kept open per host
+    'POOL_CONNECTIONS_PER_HOST': 10,
+    # Wait for a free connection instead of opening a
+    # new one once POOL_CONNECTIONS_PER_HOST is reached
+    'POOL_BLOCK': False,
+    # Seconds a pooled session may sit unused before
+    # it is closed, or None to keep it forever
+    'POOL_MAX_IDLE': 300,
+    # Keep connections open between requests
+    'KEEP_ALIVE': True,
+    # Maximum number of connections opened by the
+    # async client of each event loop
+    'ASYNC_MAX_CONNECTIONS': 100,
+    # Seconds to wait for a connection to open, unless
+    # the blueprint sets its own, or None to wait forever
+    'CONNECT_TIMEOUT': 10,
+    # Seconds to wait for the server to send data, unless
+    # the blueprint sets its own, or None to wait forever
+    'READ_TIMEOUT': 30,
+    # Maximum number of redirects followed by blueprints
+    # with follow_redirects set
+    'MAX_REDIRECTS': 10,
+    # Maximum number of requests in flight to the same
+    # host in each process, or None for no limit
+    'HOST_CONCURRENCY': None,
+    # Consecutive failures after which requests to a host
+    # fail fast, or None to never stop sending
+    'CIRCUIT_BREAKER_THRESHOLD': 5,
+    # Seconds requests to a failing host fail fast for
+    'CIRCUIT_BREAKER_COOLDOWN': 30,
+    # Requests per second allowed to each host, by host,
+    # or (requests per second, burst) tuples
+    'HOST_RATE_LIMITS': {},
+    # Name of the cache in CACHES used to share rate limits
+    # between processes, or None to enforce them per process
+    'RATE_LIMIT_CACHE': None,
+    # Number of response body bytes kept in raw_response
+    'RESPONSE_BODY_LIMIT': 64 * 1024,
+    # Size of the chunks response bodies are read in
+    'RESPONSE_CHUNK_SIZE': 16 * 1024,
+    # Where to save the full body of truncated responses:
+    # None to discard it, True for the default storage,
+    # or the dotted path of a storage class
+    'RESPONSE_STORAGE': None,
+    # Codec used to store raw requests and responses:
+    # "text", "zlib", "zstd", "file" or a registered codec
+    'PAYLOAD_CODEC': 'text',
+    # zlib compression level, from 1 (fastest) to 9
+    'PAYLOAD_COMPRESSION_LEVEL': 6,
+    # Storage used by the "file" codec: True for the
+    # default storage, or the dotted path of a storage class
+    'PAYLOAD_STORAGE': None,
+    # Store the headers, query parameters and cookies of
+    # each record as one JSON column instead of a row each
+    'SNAPSHOT_ROWS': False,
+    # Modules whose install() function is called on startup
+    # to instrument sends, such as smithy.contrib.prometheus
+    # and smithy.contrib.opentelemetry
+    'INSTRUMENTATION': (),
+    # Row count above which the admin changelist uses
+    # the database's estimate instead of COUNT(*)
+    'ESTIMATED_COUNT_THRESHOLD': 10000,
+    # Number of threads used by the admin's send action
+    'ADMIN_SEND_CONCURRENCY': 8,
+    # Number of times smithy_worker tries a queued request
+    'WORKER_MAX_ATTEMPTS': 5,
+    # Seconds before the first retry, doubled every attempt
+    'WORKER_BACKOFF_BASE': 1,
+    # Maximum number of seconds between two attempts
+    'WORKER_BACKOFF_MAX': 300,
+    # Seconds a worker may hold a claimed request before
+    # another worker is allowed to claim it again
+    'WORKER_LEASE': 300,
+    # Seconds a worker waits for a rate limit before putting
+    # the request back in the queue instead
+    'WORKER_RATE_LIMIT_WAIT': 1,
+    # Response statuses that are retried like errors
+    'WORKER_RETRY_STATUSES': (429, 500, 502, 503, 504),
+}
+
+
+def get_setting(name : str):
+    return getattr(settings, 'SMITHY_' + name, DEFAULTS[name])
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Read send contexts from files, one at a time, so that
+batches of any size can be streamed from disk.
+"""
+import csv
+import json
+
+
+FORMATS = ('csv', 'json', 'jsonl')
+
+
+def get_format(path : str, default : str = 'jsonl') -> str:
+    """
+    The format of a file of contexts, from its extension.
+    """
+    extension = path.rsplit('.', 1)[-1].lower() if '.' in path else ''
+    if extension in ('csv', 'json'):
+        return extension
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    return default
+
+
+def read_contexts(file, format : str):
+    """
+    Yield the contexts of a text file: the rows of a CSV
+    file with a header line, as dicts keyed by column, a
+    JSON object or list of objects, or the JSON objects of
+    a JSON Lines file. Only JSON files are read at once.
+    """
+    if format == 'csv':
+        yield from csv.DictReader(file)
+        return
+
+    if format == 'json':
+        contexts = json.load(file)
+        if isinstance(contexts, dict):
+            contexts = [contexts]
+        if not isinstance(contexts, list) or not all(isinstance(context, dict) for context in contexts):
+            raise ValueError("Expected a JSON object or a list of objects")
+        yield from contexts
+        return
+
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            context = json.loads(line)
+        except ValueError as e:
+            raise ValueError("Line {}: {}".format(number, e))
+        if not isinstance(context, dict):
+            raise ValueError("Line {}: expected a JSON object".format(number))
+        yield context
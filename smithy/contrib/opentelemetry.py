@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Traces every send with an OpenTelemetry client span and
+injects the trace context, such as the ``traceparent``
+header, into the request. Requires the opentelemetry-api
+package. Enable it by adding ``smithy.contrib.opentelemetry``
+to SMITHY_INSTRUMENTATION.
+"""
+import weakref
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+from smithy.signals import pre_send, post_send, send_failed
+
+
+# Spans in flight, by the request they trace
+spans = weakref.WeakKeyDictionary()
+
+
+def start_span(sender, blueprint, request, **kwargs):
+    from opentelemetry import propagate, trace
+
+    parts = urlsplit(request.url)
+    span = trace.get_tracer('smithy').start_span(
+        request.method,
+        kind = trace.SpanKind.CLIENT,
+        attributes = {
+            'http.request.method': request.method,
+            'url.full': request.url,
+            'server.address': parts.hostname or '',
+            'smithy.blueprint': blueprint.name or str(blueprint.pk),
+        })
+    propagate.inject(request.headers, context = trace.set_span_in_context(span))
+    spans[request] = span
+
+
+def end_span(sender, request, status, response_bytes, **kwargs):
+    from opentelemetry.trace import Status, StatusCode
+
+    span = spans.pop(request, None)
+    if span is None:
+        return
+    span.set_attribute('http.response.status_code', status)
+    if response_bytes is not None:
+        span.set_attribute('http.response.body.size', response_bytes)
+    if status >= 400:
+        span.set_status(Status(StatusCode.ERROR))
+    span.end()
+
+
+def fail_span(sender, request, exception, **kwargs):
+    from opentelemetry.trace import Status, StatusCode
+
+    span = spans.pop(request, None) if request is not None else None
+    if span is None:
+        return
+    span.record_exception(exception)
+    span.set_status(Status(StatusCode.ERROR, str(exception)))
+    span.end()
+
+
+def install():
+    try:
+        import opentelemetry.trace  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured(
+            "opentelemetry-api must be installed to trace smithy requests")
+
+    pre_send.connect(start_span, dispatch_uid = 'smithy.contrib.opentelemetry')
+    post_send.connect(end_span, dispatch_uid = 'smithy.contrib.opentelemetry')
+    send_failed.connect(fail_span, dispatch_uid = 'smithy.contrib.opentelemetry')
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Exports Prometheus metrics for every send, labelled by
+blueprint and host. Requires the prometheus_client
+package. Enable it by adding ``smithy.contrib.prometheus``
+to SMITHY_INSTRUMENTATION.
+"""
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+from smithy.signals import post_send, send_failed
+
+
+metrics = {}
+
+
+def get_labels(blueprint, request) -> dict:
+    return dict(
+        blueprint = blueprint.name or str(blueprint.pk),
+        host = urlsplit(request.url).netloc if request is not None else '')
+
+
+def record_sent(sender, blueprint, request, status, duration, response_bytes, **kwargs):
+    labels = get_labels(blueprint, request)
+    metrics['requests'].labels(status = str(status), **labels).inc()
+    metrics['duration'].labels(**labels).observe(duration / 1000)
+    if response_bytes:
+        metrics['response_bytes'].labels(**labels).inc(response_bytes)
+
+
+def record_failed(sender, blueprint, request, exception, duration, **kwargs):
+    labels = get_labels(blueprint, request)
+    metrics['errors'].labels(exception = type(exception).__name__, **labels).inc()
+    metrics['duration'].labels(**labels).observe(duration / 1000)
+
+
+def install(registry = None):
+    try:
+        from prometheus_client import REGISTRY, Counter, Histogram
+    except ImportError:
+        raise ImproperlyConfigured(
+            "prometheus_client must be installed to export smithy metrics")
+
+    if metrics:
+        return
+    registry = registry or REGISTRY
+    labels = ['blueprint', 'host']
+    metrics.update(
+        requests = Counter(
+            'smithy_requests', "Requests sent, by response status",
+            labels + ['status'], registry = registry),
+        errors = Counter(
+            'smithy_request_errors', "Requests that could not be sent",
+            labels + ['exception'], registry = registry),
+        duration = Histogram(
+            'smithy_request_duration_seconds', "Time taken to send a request and read its response",
+            labels, registry = registry),
+        response_bytes = Counter(
+            'smithy_response_bytes', "Size of the response bodies received",
+            labels, registry = registry),
+    )
+    post_send.connect(record_sent, dispatch_uid = 'smithy.contrib.prometheus')
+    send_failed.connect(record_failed, dispatch_uid = 'smithy.contrib.prometheus')
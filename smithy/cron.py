@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+A small parser for standard five field cron expressions:
+minute, hour, day of month, month and day of week. Fields
+accept ``*``, numbers, ranges, lists and steps, as well
+as month and day names. Expressions are evaluated in UTC.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+
+MACROS = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+DAYS = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+
+# Name, lowest and highest value and value names of each field
+FIELDS = (
+    ('minute', 0, 59, None),
+    ('hour', 0, 23, None),
+    ('day of month', 1, 31, None),
+    ('month', 1, 12, dict((name, n + 1) for n, name in enumerate(MONTHS))),
+    ('day of week', 0, 7, dict((name, n) for n, name in enumerate(DAYS))),
+)
+
+# Never look further ahead than this for a match, so
+# impossible dates such as February 30 end the search
+MAX_YEARS = 5
+
+
+def parse_value(value : str, names) -> int:
+    if names and value.lower() in names:
+        return names[value.lower()]
+    return int(value)
+
+
+def parse_field(source : str, name : str, low : int, high : int, names = None) -> frozenset:
+    error = ValueError("Invalid {} field {!r}".format(name, source))
+    values = set()
+    for part in source.split(','):
+        part, _, step = part.partition('/')
+        try:
+            step = int(step) if step else 1
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (parse_value(value, names) for value in part.split('-', 1))
+            else:
+                start = end = parse_value(part, names)
+                if step != 1:
+                    end = high
+        except ValueError:
+            raise error
+        if not low <= start <= end <= high or step < 1:
+            raise error
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronExpression:
+    __slots__ = ('source', 'minutes', 'hours', 'days', 'months', 'weekdays', 'any_day', 'any_weekday')
+
+    def __init__(self, source : str):
+        self.source = source
+        fields = MACROS.get(source.strip().lower(), source).split()
+        if len(fields) != 5:
+            raise ValueError("Cron expressions have 5 fields, got {!r}".format(source))
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_field(field, *spec) for field, spec in zip(fields, FIELDS))
+        # 7 is another name for Sunday
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def __str__(self):
+        return self.source
+
+    def matches_day(self, moment : datetime) -> bool:
+        in_days = moment.day in self.days
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        # Like cron, a restricted day of month and day of
+        # week match when either of them does
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def get_next(self, after : datetime) -> datetime:
+        """
+        The first time matching this expression strictly
+        after ``after``, as an aware datetime in UTC.
+        """
+        if after.tzinfo is not None:
+            after = after.astimezone(dt_timezone.utc).replace(tzinfo = None)
+        moment = after.replace(second = 0, microsecond = 0) + timedelta(minutes = 1)
+        limit = moment + timedelta(days = 366 * MAX_YEARS)
+
+        while moment < limit:
+            if moment.month not in self.months:
+                year, month = divmod(moment.month, 12)
+                moment = moment.replace(year = moment.year + year, month = month + 1, day = 1, hour = 0, minute = 0)
+            elif not self.matches_day(moment):
+                moment = moment.replace(hour = 0, minute = 0) + timedelta(days = 1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute = 0) + timedelta(hours = 1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes = 1)
+            else:
+                return moment.replace(tzinfo = dt_timezone.utc)
+
+        raise ValueError("{!r} never matches".format(self.source))
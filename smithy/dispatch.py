@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers for sending many requests at once from a
+pool of worker threads.
+"""
+from threading import Lock, Thread
+
+from django.db import connections
+
+
+class SendResults(list):
+    """
+    The RequestRecords of a batch, in input order. Items
+    that failed to send are None, and the blueprint, or
+    for RequestBlueprint.send_chunks the context, and the
+    exception for each of them are kept in ``errors``.
+    """
+
+    def __init__(self, records = (), errors = ()):
+        super().__init__(records)
+        self.errors = list(errors)
+
+    @property
+    def sent(self):
+        return [record for record in self if record is not None]
+
+
+class BatchResults:
+    """
+    The totals of RequestBlueprint.send_batch: the number
+    of records written, and the context and exception of
+    every request that couldn't be sent.
+    """
+
+    def __init__(self):
+        self.sent = 0
+        self.errors = []
+
+    def add(self, results : SendResults):
+        self.sent += len(results.sent)
+        self.errors.extend(results.errors)
+
+
+def map_concurrent(fun, items, concurrency : int = 1):
+    """
+    Call ``fun`` for every item using up to ``concurrency``
+    threads. Returns the results in input order, and a
+    dict of exceptions raised keyed by the item's index.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    errors = {}
+
+    def call(index, item):
+        try:
+            results[index] = fun(item)
+        except Exception as e:
+            errors[index] = e
+
+    if concurrency <= 1 or len(items) <= 1:
+        for index, item in enumerate(items):
+            call(index, item)
+        return results, errors
+
+    pending = iter(enumerate(items))
+    lock = Lock()
+
+    def work():
+        try:
+            while True:
+                with lock:
+                    try:
+                        index, item = next(pending)
+                    except StopIteration:
+                        return
+                call(index, item)
+        finally:
+            # Each thread opens its own database
+            # connections, which nobody else will close.
+            connections.close_all()
+
+    threads = [
+        Thread(target = work, daemon = True)
+        for _ in range(min(concurrency, len(items)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
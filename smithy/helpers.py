@@ -1,11 +1,234 @@
-from django.template import Template, Context
+import re
+from collections import OrderedDict
+from threading import Lock
+from urllib.parse import unquote_plus, urlencode, urlsplit, urlunsplit
+
+from django.core.exceptions import ValidationError
+from django.template import Template, Context, TemplateSyntaxError
 from requests_toolbelt.utils import dump
 
+from smithy.conf import get_setting
+
+
+TEMPLATE_TOKENS = ('{{', '{%', '{#')
+
+DJANGO = 'django'
+FAST = 'fast'
+ENGINES = (DJANGO, FAST)
+
+# A variable with optional dotted lookups, the only
+# construct the fast engine substitutes by itself
+FAST_VARIABLE = re.compile(r'{{\s*([A-Za-z]\w*(?:\.[A-Za-z0-9]\w*)*)\s*}}')
+# Names Django's context resolves to constants
+CONSTANTS = ('True', 'False', 'None')
+
+
+class TemplateCache:
+    """
+    A bounded LRU cache of compiled templates, keyed
+    by their source text. Compiling a template is far
+    more expensive than rendering it, and blueprints
+    are rendered with the same sources over and over.
+    """
+
+    def __init__(self, maxsize = None):
+        self._maxsize = maxsize
+        self._templates = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def maxsize(self):
+        if self._maxsize is None:
+            return get_setting('TEMPLATE_CACHE_SIZE')
+        return self._maxsize
+
+    def get(self, source : str) -> Template:
+        with self._lock:
+            template = self._templates.get(source)
+            if template is not None:
+                self._templates.move_to_end(source)
+                return template
+
+        # Compile outside of the lock, a duplicate
+        # compile is cheaper than serializing them all.
+        template = Template(source)
+
+        with self._lock:
+            self._templates[source] = template
+            while len(self._templates) > max(self.maxsize, 0):
+                self._templates.popitem(last = False)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def __contains__(self, source):
+        return source in self._templates
+
+
+template_cache = TemplateCache()
+
+
+def is_template(source : str) -> bool:
+    return any(token in source for token in TEMPLATE_TOKENS)
+
+class CompiledTemplate:
+    """
+    A template compiled once and rendered many times.
+    Values without template tags are never compiled.
+    Pickles as its source, so it can be stored in a cache.
+    """
+    __slots__ = ('source', 'template')
+
+    def __init__(self, source):
+        self.source = str(source)
+        self.template = template_cache.get(self.source) \
+            if is_template(self.source) else None
+
+    def render(self, context):
+        if self.template is None:
+            return self.source
+        if not isinstance(context, Context):
+            context = Context(context)
+        return self.template.render(context)
+
+    def __reduce__(self):
+        return (CompiledTemplate, (self.source,))
+
+    def __repr__(self):
+        return '<CompiledTemplate {!r}>'.format(self.source)
+
+class FastTemplate:
+    """
+    A template of the "fast" engine, compiled once into a
+    format string and the lookups filling it in. Variables
+    and dotted lookups are resolved the way Django resolves
+    them, converted with str() and never HTML escaped.
+    Templates using tags, filters or comments are rendered
+    by Django's engine instead, without autoescaping.
+    """
+    __slots__ = ('source', 'format', 'lookups', 'template')
+
+    def __init__(self, source):
+        self.source = str(source)
+        self.format = None
+        self.lookups = ()
+        self.template = None
+        if not is_template(self.source):
+            return
+
+        parts = FAST_VARIABLE.split(self.source)
+        literals, variables = parts[0::2], parts[1::2]
+        if any(is_template(literal) for literal in literals) \
+                or any(variable.split('.')[0] in CONSTANTS for variable in variables):
+            self.template = template_cache.get(self.source)
+            return
+
+        self.format = '{}'.join(
+            literal.replace('{', '{{').replace('}', '}}') for literal in literals)
+        self.lookups = tuple(tuple(variable.split('.')) for variable in variables)
+
+    def render(self, context):
+        if self.format is not None:
+            return self.format.format(*[
+                resolve_lookup(context, lookup) for lookup in self.lookups])
+        if self.template is None:
+            return self.source
+        if not isinstance(context, Context):
+            context = Context(context, autoescape = False)
+        return self.template.render(context)
+
+    def __reduce__(self):
+        return (FastTemplate, (self.source,))
+
+    def __repr__(self):
+        return '<FastTemplate {!r}>'.format(self.source)
+
+def resolve_lookup(context, lookup : tuple):
+    """
+    Resolve a dotted lookup like django.template.Variable,
+    trying keys, attributes and list indexes, and calling
+    callables. Lookups that fail resolve to ''.
+    """
+    current = context
+    for bit in lookup:
+        try:
+            current = current[bit]
+        except (TypeError, AttributeError, KeyError, ValueError, IndexError):
+            try:
+                current = getattr(current, bit)
+            except (TypeError, AttributeError):
+                try:
+                    current = current[int(bit)]
+                except (IndexError, ValueError, KeyError, TypeError):
+                    return ''
+        if callable(current):
+            if getattr(current, 'do_not_call_in_templates', False):
+                pass
+            elif getattr(current, 'alters_data', False):
+                return ''
+            else:
+                try:
+                    current = current()
+                except TypeError:
+                    return ''
+    return current
+
+def compile_template(source, engine : str = DJANGO):
+    """
+    Compile a template with one of ENGINES.
+    """
+    if engine == FAST:
+        return FastTemplate(source)
+    return CompiledTemplate(source)
+
+def validate_template(source : str):
+    """
+    Raise ValidationError if ``source`` doesn't compile.
+    Valid templates stay in the template cache, ready for
+    the next send.
+    """
+    try:
+        CompiledTemplate(source)
+    except TemplateSyntaxError as e:
+        raise ValidationError(
+            "Invalid template: %(error)s", code = 'invalid_template', params = {'error': e})
+
 def render_with_context(template, context):
-    template = Template(template)
+    template = str(template)
+    if not is_template(template):
+        return template
+    template = template_cache.get(template)
     context = Context(context)
     return template.render(context)
 
+def add_query_parameters(url : str, parameters) -> str:
+    """
+    Add name/value pairs to the query string of a URL,
+    parsing and encoding it only once. Parameters keep
+    their order and may repeat. They replace parameters
+    of the URL with the same name, while the rest of the
+    URL's query string is kept as it was written.
+    """
+    parameters = list(parameters)
+    if not parameters:
+        return url
+
+    scheme, netloc, path, query, fragment = urlsplit(url)
+    names = set(name for name, _ in parameters)
+    kept = [
+        part for part in query.split('&')
+        if part and unquote_plus(part.partition('=')[0]) not in names]
+    kept.append(urlencode(parameters))
+    return urlunsplit((scheme, netloc, path, '&'.join(kept), fragment))
+
+def add_query_parameter(url : str, name : str, value : str) -> str:
+    return add_query_parameters(url, [(name, value)])
+
 def parse_dump_result(fun, obj):
     prefixes = dump.PrefixSettings('', '')
     try:
@@ -14,3 +237,19 @@ def parse_dump_result(fun, obj):
         return result.decode('utf-8')
     except Exception:
         return "Could not parse request as a string"
+
+def format_response(version : str, status : int, reason : str, headers, body : bytes) -> str:
+    """
+    Format a response the same way requests_toolbelt dumps
+    one, for responses that did not come from requests.
+    """
+    result = bytearray()
+    result.extend("{} {} {}\r\n".format(version, status, reason).encode('utf-8'))
+    for name, value in headers:
+        result.extend("{}: {}\r\n".format(name, value).encode('utf-8'))
+    result.extend(b'\r\n')
+    result.extend(body)
+    try:
+        return result.decode('utf-8')
+    except UnicodeDecodeError:
+        return "Could not parse request as a string"
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Per-host protection for the send path. HostLimiter caps
+the number of requests in flight to each host, and
+CircuitBreaker stops sending to a host that keeps failing
+until it had time to recover. Both are per process.
+"""
+import asyncio
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlsplit
+
+from smithy.conf import get_setting
+
+
+def get_host(url : str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class CircuitOpen(Exception):
+    """
+    Raised instead of sending a request to a host whose
+    circuit breaker is open.
+    """
+
+    def __init__(self, host : str, retry_after : float):
+        self.host = host
+        self.retry_after = retry_after
+        super().__init__(
+            "Circuit open for {} after repeated failures, retrying in {:.0f}s".format(
+                host, retry_after))
+
+
+class HostLimiter:
+    """
+    Allows at most SMITHY_HOST_CONCURRENCY requests in
+    flight to the same host. Threads wait for a free slot,
+    as do coroutines, which get semaphores of their own
+    per event loop.
+    """
+
+    def __init__(self):
+        self._semaphores = {}
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._lock = Lock()
+
+    def get_semaphore(self, host : str, limit : int):
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = BoundedSemaphore(limit)
+        return semaphore
+
+    def get_async_semaphore(self, host : str, limit : int):
+        semaphores = self._async_semaphores.setdefault(asyncio.get_running_loop(), {})
+        semaphore = semaphores.get(host)
+        if semaphore is None:
+            semaphore = semaphores[host] = asyncio.BoundedSemaphore(limit)
+        return semaphore
+
+    @contextmanager
+    def limit(self, host : str):
+        limit = get_setting('HOST_CONCURRENCY')
+        if not limit:
+            yield
+            return
+        with self.get_semaphore(host, limit):
+            yield
+
+    @asynccontextmanager
+    async def alimit(self, host : str):
+        limit = get_setting('HOST_CONCURRENCY')
+        if not limit:
+            yield
+            return
+        async with self.get_async_semaphore(host, limit):
+            yield
+
+    def reset(self):
+        self._semaphores = {}
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._lock = Lock()
+
+
+class CircuitBreaker:
+    """
+    Opens the circuit of a host after
+    SMITHY_CIRCUIT_BREAKER_THRESHOLD consecutive failures.
+    Requests to it then fail fast for
+    SMITHY_CIRCUIT_BREAKER_COOLDOWN seconds, after which a
+    single request is let through as a probe while the
+    others keep failing fast. The circuit closes if the
+    probe succeeds, and opens for another cooldown if it
+    fails. A probe that never reports back is given up on
+    after a cooldown, and another one is let through.
+    """
+
+    def __init__(self):
+        # Consecutive failures, the time the circuit was
+        # opened and the time the probe was let through,
+        # by host
+        self._hosts = {}
+        self._lock = Lock()
+
+    def get_retry_after(self, host : str, claim : bool = False) -> float:
+        """
+        Seconds until ``host`` may be sent to, or 0 if it can
+        be now. A request that would be the probe of an open
+        circuit claims it when ``claim`` is set.
+        """
+        # Closed circuits are checked without taking the lock
+        state = self._hosts.get(host)
+        if state is None or state[1] is None:
+            return 0
+        cooldown = get_setting('CIRCUIT_BREAKER_COOLDOWN')
+        with self._lock:
+            failures, opened_at, probe_at = self._hosts.get(host, (0, None, None))
+            if opened_at is None:
+                return 0
+            now = time.monotonic()
+            retry_after = (probe_at or opened_at) + cooldown - now
+            if retry_after <= 0:
+                if claim:
+                    self._hosts[host] = (failures, opened_at, now)
+                return 0
+            return retry_after
+
+    def check(self, host : str):
+        """
+        Raise CircuitOpen if ``host`` shouldn't be sent to.
+        """
+        retry_after = self.get_retry_after(host, claim = True)
+        if retry_after > 0:
+            raise CircuitOpen(host, retry_after)
+
+    def record_success(self, host : str):
+        if host in self._hosts:
+            with self._lock:
+                self._hosts.pop(host, None)
+
+    def record_failure(self, host : str):
+        threshold = get_setting('CIRCUIT_BREAKER_THRESHOLD')
+        if not threshold:
+            return
+        with self._lock:
+            failures, opened_at, probe_at = self._hosts.get(host, (0, None, None))
+            failures += 1
+            if failures >= threshold:
+                # Also reopens the circuit when the probe fails
+                opened_at, probe_at = time.monotonic(), None
+            self._hosts[host] = (failures, opened_at, probe_at)
+
+    def is_open(self, host : str) -> bool:
+        return self.get_retry_after(host) > 0
+
+    def reset(self):
+        self._hosts = {}
+        self._lock = Lock()
+
+
+host_limiter = HostLimiter()
+circuit_breaker = CircuitBreaker()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child = host_limiter.reset)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.management.base import BaseCommand
+
+from smithy.conf import get_setting
+from smithy.models import RequestRecord
+from smithy.payloads import TEXT, get_codec
+
+
+class Command(BaseCommand):
+    help = "Re-encode plain text request and response payloads with a payload codec."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--codec', default = None,
+            help = "Codec to encode payloads with. Defaults to SMITHY_PAYLOAD_CODEC.")
+        parser.add_argument(
+            '--batch-size', type = int, default = 500,
+            help = "Number of records updated per query.")
+
+    def handle(self, *args, **options):
+        codec = options['codec'] or get_setting('PAYLOAD_CODEC')
+        if codec == TEXT:
+            self.stderr.write("Nothing to do, the codec is {!r}".format(TEXT))
+            return
+        get_codec(codec)
+
+        fields = ['payload_codec', 'request_text', 'response_text', 'request_payload', 'response_payload']
+        started = time.monotonic()
+        last_pk = 0
+        total = 0
+
+        while True:
+            records = list(
+                RequestRecord.objects
+                .filter(payload_codec = TEXT, pk__gt = last_pk)
+                .order_by('pk')
+                .only('pk', 'payload_codec', 'request_text', 'response_text')
+                [:options['batch_size']])
+            if not records:
+                break
+
+            for record in records:
+                request, response = record.raw_request, record.raw_response
+                record.payload_codec = codec
+                record.raw_request = request
+                record.raw_response = response
+
+            RequestRecord.objects.bulk_update(records, fields)
+            last_pk = records[-1].pk
+            total += len(records)
+            self.stdout.write("Encoded {} records".format(total))
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            "Encoded {} records with {} in {:.1f}s ({:.0f} records/s)".format(
+                total, codec, elapsed, total / elapsed if elapsed else 0)))
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import operator
+import time
+from datetime import timedelta
+from functools import reduce
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from django.utils import timezone
+
+from smithy.capture import get_response_storage
+from smithy.models import Request, RequestRecord, Header, QueryParameter, Cookie
+from smithy.payloads import StorageCodec
+
+
+def delete_records(pks : list) -> int:
+    """
+    Delete records and their rows without collecting them
+    first. Deleting through the ORM would load every record
+    and row into memory to run cascades and signals.
+    """
+    using = router.db_for_write(RequestRecord)
+    files = get_files(pks)
+    with transaction.atomic(using = using):
+        for model in (Header, QueryParameter, Cookie):
+            model.objects.filter(request_id__in = pks)._raw_delete(using)
+        deleted = RequestRecord.objects.filter(pk__in = pks)._raw_delete(using)
+        Request.objects.filter(pk__in = pks)._raw_delete(using)
+        # Files of records that are kept after all must stay
+        transaction.on_commit(lambda: delete_files(files), using = using)
+    return deleted
+
+
+def get_files(pks : list) -> list:
+    """
+    The (storage, name) of every file stored for the records.
+    Response files are left alone when no storage is set up,
+    since there is nowhere to delete them from.
+    """
+    files = []
+    records = RequestRecord.objects.filter(pk__in = pks)
+    storage = get_response_storage()
+    if storage is not None:
+        names = records.exclude(response_file = '').values_list('response_file', flat = True)
+        files.extend((storage, name) for name in names)
+
+    payloads = records.filter(payload_codec = StorageCodec.name) \
+        .values_list('request_payload', 'response_payload')
+    if payloads:
+        storage = StorageCodec.get_storage()
+        for names in payloads:
+            files.extend(
+                (storage, bytes(name).decode('utf-8')) for name in names if name is not None)
+    return files
+
+
+def delete_files(files : list):
+    for storage, name in files:
+        storage.delete(name)
+
+
+class Command(BaseCommand):
+    help = "Delete old RequestRecords in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type = int, metavar = 'DAYS',
+            help = "Delete records older than this many days.")
+        parser.add_argument(
+            '--max-per-blueprint', type = int, metavar = 'N',
+            help = "Keep only the N newest records of each blueprint.")
+        parser.add_argument(
+            '--keep-failures-after', type = int, metavar = 'DAYS',
+            help = "Delete successful records older than this many days, keeping failures.")
+        parser.add_argument(
+            '--batch-size', type = int, default = 1000,
+            help = "Number of records deleted per transaction.")
+        parser.add_argument(
+            '--sleep', type = float, default = 0,
+            help = "Seconds to pause between batches, to spare the database.")
+        parser.add_argument(
+            '--dry-run', action = 'store_true',
+            help = "Count the records that would be deleted without deleting them.")
+
+    def handle(self, *args, **options):
+        if not any(options[name] is not None for name in (
+                'max_age', 'max_per_blueprint', 'keep_failures_after')):
+            raise CommandError(
+                "Pass at least one of --max-age, --max-per-blueprint or --keep-failures-after.")
+
+        self.options = options
+        self.deleted = 0
+        self.matched = []
+        self.started = time.monotonic()
+
+        # Queued records haven't been sent yet
+        records = RequestRecord.objects.exclude(
+            state__in = [RequestRecord.PENDING, RequestRecord.SENDING])
+        now = timezone.now()
+
+        if options['max_age'] is not None:
+            self.prune(records.filter(
+                created__lt = now - timedelta(days = options['max_age'])))
+
+        if options['keep_failures_after'] is not None:
+            self.prune(records.filter(
+                created__lt = now - timedelta(days = options['keep_failures_after']),
+                status__lt = 400))
+
+        keep = options['max_per_blueprint']
+        if keep is not None:
+            blueprints = records.order_by().values_list('blueprint_id', flat = True).distinct()
+            for blueprint_id in list(blueprints):
+                of_blueprint = records.filter(blueprint_id = blueprint_id)
+                if keep > 0:
+                    # Records are numbered in the order they were created
+                    oldest_kept = list(
+                        of_blueprint.order_by('-pk').values_list('pk', flat = True)[keep - 1:keep])
+                    if not oldest_kept:
+                        continue
+                    of_blueprint = of_blueprint.filter(pk__lt = oldest_kept[0])
+                self.prune(of_blueprint)
+
+        if self.matched:
+            # Records matched by several options are counted once
+            self.deleted = reduce(operator.or_, self.matched).count()
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            "{} {} records in {:.1f}s ({:.0f} records/s)".format(
+                "Would delete" if options['dry_run'] else "Deleted",
+                self.deleted, elapsed, self.deleted / elapsed if elapsed else 0)))
+
+    def prune(self, queryset):
+        if self.options['dry_run']:
+            self.matched.append(queryset)
+            return
+
+        batch_size = self.options['batch_size']
+        while True:
+            pks = list(queryset.order_by('pk').values_list('pk', flat = True)[:batch_size])
+            if not pks:
+                return
+
+            self.deleted += delete_records(pks)
+            elapsed = time.monotonic() - self.started
+            self.stdout.write("Deleted {} records ({:.0f} records/s)".format(
+                self.deleted, self.deleted / elapsed if elapsed else 0))
+
+            if len(pks) < batch_size:
+                return
+            if self.options['sleep']:
+                time.sleep(self.options['sleep'])
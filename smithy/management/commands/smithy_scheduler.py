@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from smithy.scheduler import Scheduler
+
+
+class Command(BaseCommand):
+    help = "Send scheduled requests as they fall due."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type = int, default = 4,
+            help = "Number of requests sent at once.")
+        parser.add_argument(
+            '--refresh-interval', type = float, default = 30,
+            help = "Seconds between two reloads of the schedules.")
+        parser.add_argument(
+            '--once', action = 'store_true',
+            help = "Send the schedules that are due, then exit.")
+
+    def handle(self, *args, **options):
+        Scheduler(
+            concurrency = options['concurrency'],
+            refresh_interval = options['refresh_interval'],
+        ).run(once = options['once'])
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from threading import Lock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+
+from smithy.contexts import FORMATS, get_format, read_contexts
+from smithy.models import RequestBlueprint
+from smithy.ratelimits import take
+
+
+class Pacer:
+    """
+    Spaces out the sends of one command to at most
+    ``rate`` per second, across its threads.
+    """
+
+    def __init__(self, rate : float):
+        self.rate = rate
+        self.full_at = 0
+        self.lock = Lock()
+
+    def wait(self):
+        with self.lock:
+            wait, self.full_at = take(self.full_at, time.time(), self.rate, 1)
+        if wait:
+            time.sleep(wait)
+
+
+class Command(BaseCommand):
+    help = (
+        "Send blueprints once per context and print a JSON line with the "
+        "outcome of every request as it completes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'blueprints', nargs = '+',
+            help = "Primary keys or names of the blueprints to send.")
+        parser.add_argument(
+            '--context', metavar = 'FILE',
+            help = "File of contexts, or - to read standard input. Each blueprint is sent once per context, "
+                   "or once with an empty context if not given.")
+        parser.add_argument(
+            '--format', choices = FORMATS,
+            help = "Format of the contexts. Guessed from the file's extension, JSON Lines otherwise.")
+        parser.add_argument(
+            '--concurrency', type = int, default = 8,
+            help = "Number of requests sent at once.")
+        parser.add_argument(
+            '--rps', type = float,
+            help = "Maximum number of requests sent per second.")
+        parser.add_argument(
+            '--no-record', action = 'store_false', dest = 'record',
+            help = "Don't store a RequestRecord for each request.")
+
+    def get_blueprints(self, selectors : list) -> list:
+        blueprints = []
+        for selector in selectors:
+            if selector.isdigit():
+                matches = list(RequestBlueprint.objects.filter(pk = selector))
+            else:
+                matches = list(RequestBlueprint.objects.filter(name = selector).order_by('pk'))
+            if not matches:
+                raise CommandError("No blueprint with primary key or name {!r}".format(selector))
+            blueprints.extend(matches)
+        RequestBlueprint.objects.compile_all(blueprints)
+        return blueprints
+
+    def send(self, blueprint : RequestBlueprint, index : int, context : dict, record : bool, pacer) -> dict:
+        result = {'blueprint': blueprint.pk, 'index': index}
+        close_old_connections()
+        try:
+            if pacer is not None:
+                pacer.wait()
+            if record:
+                record = blueprint.send(context)
+                result.update(
+                    record = record.pk,
+                    status = record.status,
+                    duration = record.duration,
+                    timings = record.get_timings(),
+                    error = record.error or None)
+            else:
+                _, values = blueprint.send_unrecorded(context)
+                result.update(
+                    status = values['status'],
+                    duration = values['duration'],
+                    timings = json.loads(values['timings']),
+                    error = values.get('error') or None)
+        except Exception as e:
+            result['error'] = repr(e)
+        finally:
+            close_old_connections()
+        return result
+
+    def write(self, futures) -> int:
+        """
+        Print the results of finished sends, and return the
+        number of those that failed.
+        """
+        failed = 0
+        for future in futures:
+            result = future.result()
+            failed += result['error'] is not None
+            self.stdout.write(json.dumps(result, cls = DjangoJSONEncoder))
+            self.stdout.flush()
+        return failed
+
+    def handle(self, *args, **options):
+        blueprints = self.get_blueprints(options['blueprints'])
+        pacer = Pacer(options['rps']) if options['rps'] else None
+
+        path = options['context']
+        if path is None:
+            file, contexts = None, [{}]
+        else:
+            file = sys.stdin if path == '-' else open(path, newline = '', encoding = 'utf-8')
+            contexts = read_contexts(file, options['format'] or get_format(path))
+
+        concurrency = max(options['concurrency'], 1)
+        failed = 0
+        try:
+            with ThreadPoolExecutor(concurrency, thread_name_prefix = 'smithy-send') as executor:
+                # Only a few contexts are read ahead, so any
+                # number of them can be streamed through
+                pending = set()
+                for index, context in enumerate(contexts):
+                    for blueprint in blueprints:
+                        if len(pending) >= concurrency * 2:
+                            done, pending = wait(pending, return_when = FIRST_COMPLETED)
+                            failed += self.write(done)
+                        pending.add(executor.submit(
+                            self.send, blueprint, index, context, options['record'], pacer))
+                failed += self.write(as_completed(pending))
+        except ValueError as e:
+            raise CommandError(e)
+        finally:
+            if file is not None and file is not sys.stdin:
+                file.close()
+
+        if failed:
+            raise CommandError("{} requests failed".format(failed))
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from smithy.contexts import FORMATS, get_format, read_contexts
+from smithy.models import RequestBlueprint
+
+
+class Command(BaseCommand):
+    help = "Send a blueprint once per row of a CSV or JSON Lines file of contexts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'blueprint', type = int,
+            help = "Primary key of the blueprint to send.")
+        parser.add_argument(
+            'file',
+            help = "File of contexts, or - to read standard input.")
+        parser.add_argument(
+            '--format', choices = FORMATS,
+            help = "Format of the file. Guessed from its extension, JSON Lines otherwise.")
+        parser.add_argument(
+            '--concurrency', type = int, default = 8,
+            help = "Number of requests sent at once.")
+        parser.add_argument(
+            '--chunk-size', type = int, default = 500,
+            help = "Number of contexts read, sent and recorded at a time.")
+
+    def handle(self, *args, **options):
+        try:
+            blueprint = RequestBlueprint.objects.get(pk = options['blueprint'])
+        except RequestBlueprint.DoesNotExist:
+            raise CommandError("No blueprint with primary key {}".format(options['blueprint']))
+
+        path = options['file']
+        format = options['format'] or get_format(path)
+        file = sys.stdin if path == '-' else open(path, newline = '', encoding = 'utf-8')
+
+        sent = failed = 0
+        try:
+            chunks = blueprint.send_chunks(
+                read_contexts(file, format),
+                concurrency = options['concurrency'],
+                chunk_size = options['chunk_size'])
+            for results in chunks:
+                sent += len(results.sent)
+                failed += len(results.errors)
+                for context, error in results.errors:
+                    self.stderr.write("Could not send {!r}: {!r}".format(context, error))
+                if options['verbosity'] > 1:
+                    self.stdout.write("Sent {} requests, {} failed".format(sent, failed))
+        except ValueError as e:
+            raise CommandError(e)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+        self.stdout.write("Sent {} requests, {} failed".format(sent, failed))
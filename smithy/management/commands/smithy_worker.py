@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from smithy import worker
+
+
+class Command(BaseCommand):
+    help = "Send queued requests, retrying failures with exponential backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type = int, default = 4,
+            help = "Number of requests sent at once.")
+        parser.add_argument(
+            '--batch-size', type = int, default = 20,
+            help = "Number of queued requests claimed at a time.")
+        parser.add_argument(
+            '--poll-interval', type = float, default = 1,
+            help = "Seconds to wait when no request is due.")
+        parser.add_argument(
+            '--once', action = 'store_true',
+            help = "Exit once no queued request is due.")
+
+    def handle(self, *args, **options):
+        worker.run(
+            batch_size = options['batch_size'],
+            concurrency = options['concurrency'],
+            poll_interval = options['poll_interval'],
+            once = options['once'])
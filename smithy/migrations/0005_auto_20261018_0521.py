@@ -0,0 +1,42 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smithy', '0004_auto_20190721_2012'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestrecord',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='requestrecord',
+            name='context',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='requestrecord',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='requestrecord',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='requestrecord',
+            name='state',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='sent', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='requestrecord',
+            index=models.Index(fields=['state', 'next_attempt_at'], name='smithy_requ_state_d7b7af_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smithy', '0005_auto_20261018_0521'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestrecord',
+            name='response_file',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='requestrecord',
+            name='response_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='requestrecord',
+            name='response_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smithy', '0006_auto_20261018_0523'),
+    ]
+
+    operations = [
+        # raw_request and raw_response become properties that
+        # decode the payload, the columns keep their names.
+        migrations.SeparateDatabaseAndState(
+            state_operations = [
+                migrations.RenameField(
+                    model_name='requestrecord',
+                    old_name='raw_request',
+                    new_name='request_text',
+                ),
+                migrations.RenameField(
+                    model_name='requestrecord',
+                    old_name='raw_response',
+                    new_name='response_text',
+                ),
+                migrations.AlterField(
+                    model_name='requestrecord',
+                    name='request_text',
+                    field=models.TextField(db_column='raw_request'),
+                ),
+                migrations.AlterField(
+                    model_name='requestrecord',
+                    name='response_text',
+                    field=models.TextField(db_column='raw_response'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='requestrecord',
+            name='request_text',
+            field=models.TextField(blank=True, db_column='raw_request'),
+        ),
+        migrations.AlterField(
+            model_name='requestrecord',
+            name='response_text',
+            field=models.TextField(blank=True, db_column='raw_response'),
+        ),
+        migrations.AddField(
+            model_name='requestrecord',
+            name='request_payload',
+            field=models.BinaryField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='requestrecord',
+            name='response_payload',
+            field=models.BinaryField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='requestrecord',
+            name='payload_codec',
+            field=models.CharField(default='text', max_length=10),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smithy', '0007_payload_codecs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['created'], name='smithy_requ_created_572d0b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestrecord',
+            index=models.Index(fields=['blueprint', '-request_ptr'], name='smithy_requ_bluepri_fa4346_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestrecord',
+            index=models.Index(fields=['status'], name='smithy_requ_status_8f9412_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smithy', '0008_auto_20261018_0526'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestrecord',
+            name='rows',
+            field=models.TextField(blank=True),
+        ),
+    ]
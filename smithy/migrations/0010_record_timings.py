@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smithy', '0009_requestrecord_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestrecord',
+            name='duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='requestrecord',
+            name='timings',
+            field=models.TextField(blank=True),
+        ),
+    ]
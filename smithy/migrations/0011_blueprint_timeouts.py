@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smithy', '0010_record_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestblueprint',
+            name='connect_timeout',
+            field=models.FloatField(blank=True, help_text='Seconds to wait for a connection. Leave empty to use SMITHY_CONNECT_TIMEOUT.', null=True),
+        ),
+        migrations.AddField(
+            model_name='requestblueprint',
+            name='read_timeout',
+            field=models.FloatField(blank=True, help_text='Seconds to wait for the server to send data. Leave empty to use SMITHY_READ_TIMEOUT.', null=True),
+        ),
+    ]
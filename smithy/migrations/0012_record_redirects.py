@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smithy', '0011_blueprint_timeouts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestrecord',
+            name='redirects',
+            field=models.TextField(blank=True),
+        ),
+    ]
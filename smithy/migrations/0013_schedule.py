@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smithy', '0012_record_redirects'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Schedule',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('interval', models.PositiveIntegerField(blank=True, help_text='Seconds between two sends.', null=True)),
+                ('cron', models.CharField(blank=True, help_text='A cron expression, such as "*/5 * * * *", evaluated in UTC.', max_length=100)),
+                ('context', models.TextField(blank=True, help_text='JSON object used as the context of every send.')),
+                ('enabled', models.BooleanField(default=True)),
+                ('next_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('blueprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='smithy.requestblueprint')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['enabled', 'next_run_at'], name='smithy_sche_enabled_cb892e_idx'),
+        ),
+    ]
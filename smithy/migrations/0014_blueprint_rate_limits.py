@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smithy', '0013_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestblueprint',
+            name='rate_limit',
+            field=models.FloatField(blank=True, help_text='Maximum number of requests sent per second. Leave empty for no limit.', null=True),
+        ),
+        migrations.AddField(
+            model_name='requestblueprint',
+            name='rate_limit_burst',
+            field=models.PositiveIntegerField(blank=True, help_text='Number of requests that may be sent at once within the rate limit. Defaults to 1.', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smithy', '0014_blueprint_rate_limits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestblueprint',
+            name='template_engine',
+            field=models.CharField(choices=[('django', 'Django'), ('fast', 'Fast')], default='django', help_text='Fast substitutes {{ variables }} directly and never HTML escapes. Templates with tags or filters still use Django.', max_length=10),
+        ),
+    ]
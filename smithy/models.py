@@ -1,16 +1,55 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import groupby, islice
+from operator import itemgetter
 
-from django.db import models
-from django.db.models.signals import post_save
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, transaction
+from django.db.models import prefetch_related_objects
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from requests import Request as HTTPRequest, Session
+from django.utils import timezone
+from requests import Request as HTTPRequest
 from requests.cookies import create_cookie, RequestsCookieJar
-from urllib.parse import parse_qs, urlparse, urlencode
 from requests_toolbelt.utils import dump
 
 from model_utils.models import TimeStampedModel
 
-from smithy.helpers import render_with_context, parse_dump_result
+from smithy import signals
+from smithy.capture import acapture_response, capture_response, get_response_storage
+from smithy.conf import get_setting
+from smithy.cron import CronExpression
+from smithy.dispatch import BatchResults, SendResults, map_concurrent
+from smithy.helpers import (
+    DJANGO, FAST, render_with_context, parse_dump_result, add_query_parameter, validate_template)
+from smithy.hosts import CircuitOpen, circuit_breaker, get_host, host_limiter
+from smithy.payloads import TEXT, get_codec
+from smithy.plans import RenderedRequest, SendPlan, plan_cache
+from smithy.ratelimits import rate_limiter
+from smithy.redirects import Hops, adrain, drain, get_redirect, to_prepared
+from smithy.sessions import async_client_pool, session_pool
+from smithy.stats import PercentileCont, percentile
+from smithy.timing import Timer, activate, measure
+
+
+def clean_templates(obj):
+    """
+    Validate the templates of a blueprint or one of its
+    rows, as named by their ``template_fields``.
+    """
+    errors = {}
+    for field in obj.template_fields:
+        try:
+            validate_template(getattr(obj, field))
+        except ValidationError as e:
+            errors[field] = e
+    if errors:
+        raise ValidationError(errors)
 
 
 class NameValueModel(TimeStampedModel):
@@ -20,6 +59,12 @@ class NameValueModel(TimeStampedModel):
     def __str__(self):
         return self.name
 
+    # Fields rendered as templates when sending
+    template_fields = ('name', 'value')
+
+    def clean(self):
+        clean_templates(self)
+
     class Meta:
         abstract = True
 
@@ -58,6 +103,11 @@ class Request(TimeStampedModel):
         blank = True, null = True,
         max_length = 100, choices = BODY_TYPES)
 
+    class Meta:
+        indexes = [
+            models.Index(fields = ['created']),
+        ]
+
     def __str__(self):
         if self.name:
             return self.name
@@ -67,6 +117,90 @@ class Request(TimeStampedModel):
         )
 
 
+class RequestBlueprintManager(models.Manager):
+
+    @staticmethod
+    def get_contexts(blueprints : list, contexts = None) -> list:
+        if contexts is None or isinstance(contexts, dict):
+            return [contexts] * len(blueprints)
+        contexts = list(contexts)
+        if len(contexts) != len(blueprints):
+            raise ValueError(
+                "Expected {} contexts, got {}".format(
+                    len(blueprints), len(contexts)))
+        return contexts
+
+    @staticmethod
+    def compile_all(blueprints : list):
+        """
+        Compile the plans of every blueprint that has none
+        cached, loading all of their rows in one query per
+        relation.
+        """
+        if plan_cache.check_due():
+            plan_cache.check()
+        missing = [
+            blueprint for blueprint in blueprints
+            if plan_cache.get(blueprint.pk) is None]
+        prefetch_related_objects(missing, *RequestBlueprint.RELATED)
+        for blueprint in missing:
+            blueprint.compile()
+
+    def send_many(self, queryset = None, contexts = None, concurrency : int = 1):
+        """
+        Send every blueprint in ``queryset`` (or all of them)
+        using up to ``concurrency`` threads. ``contexts`` may
+        be a single context shared by every blueprint, or a
+        list with one context per blueprint. A failed send
+        does not stop the batch, see SendResults.
+        """
+        blueprints = list(self.all() if queryset is None else queryset)
+        contexts = self.get_contexts(blueprints, contexts)
+        self.compile_all(blueprints)
+
+        records, errors = map_concurrent(
+            lambda item: item[0].send(item[1]),
+            zip(blueprints, contexts),
+            concurrency)
+
+        return SendResults(records, [
+            (blueprints[index], errors[index]) for index in sorted(errors)
+        ])
+
+    async def asend_many(self, queryset = None, contexts = None, concurrency : int = 100):
+        """
+        The asyncio counterpart of send_many. At most
+        ``concurrency`` requests are in flight at once.
+        """
+        from asgiref.sync import sync_to_async
+
+        def load():
+            blueprints = list(self.all() if queryset is None else queryset)
+            self.compile_all(blueprints)
+            return blueprints
+
+        blueprints = await sync_to_async(load)()
+        contexts = self.get_contexts(blueprints, contexts)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def asend(blueprint, context):
+            async with semaphore:
+                return await blueprint.asend(context)
+
+        results = await asyncio.gather(*[
+            asend(blueprint, context)
+            for blueprint, context in zip(blueprints, contexts)
+        ], return_exceptions = True)
+
+        return SendResults(
+            [None if isinstance(result, Exception) else result for result in results],
+            [
+                (blueprint, result)
+                for blueprint, result in zip(blueprints, results)
+                if isinstance(result, Exception)
+            ])
+
+
 class RequestBlueprint(Request):
     """
     A blueprint for HTTP requests. This model will be
@@ -75,6 +209,40 @@ class RequestBlueprint(Request):
     """
     follow_redirects = models.BooleanField(
         default = False, blank = False, null = False)
+    connect_timeout = models.FloatField(
+        null = True, blank = True,
+        help_text = "Seconds to wait for a connection. Leave empty to use SMITHY_CONNECT_TIMEOUT.")
+    read_timeout = models.FloatField(
+        null = True, blank = True,
+        help_text = "Seconds to wait for the server to send data. Leave empty to use SMITHY_READ_TIMEOUT.")
+    TEMPLATE_ENGINES = (
+        (DJANGO, 'Django'),
+        (FAST, 'Fast'),
+    )
+    template_engine = models.CharField(
+        max_length = 10, choices = TEMPLATE_ENGINES, default = DJANGO,
+        help_text = "Fast substitutes {{ variables }} directly and never HTML escapes. "
+                    "Templates with tags or filters still use Django.")
+    rate_limit = models.FloatField(
+        null = True, blank = True,
+        help_text = "Maximum number of requests sent per second. Leave empty for no limit.")
+    rate_limit_burst = models.PositiveIntegerField(
+        null = True, blank = True,
+        help_text = "Number of requests that may be sent at once within the rate limit. Defaults to 1.")
+
+    objects = RequestBlueprintManager()
+
+    # Fields rendered as templates when sending
+    template_fields = ('url', 'body')
+
+    # Relations read when sending a blueprint
+    RELATED = (
+        'variables',
+        'headers',
+        'query_parameters',
+        'cookies',
+        'body_parameters',
+    )
 
     @property
     def name_value_related(self):
@@ -84,51 +252,561 @@ class RequestBlueprint(Request):
             self.cookies
         ]
 
-    def send(self, context = None):
+    def get_related_rows(self) -> dict:
+        """
+        Every row needed to send this blueprint, by relation.
+        Takes one query per relation, or none at all if the
+        blueprint was loaded with prefetch_related(*RELATED).
+        """
+        with measure('db'):
+            return dict(
+                (name, list(getattr(self, name).all()))
+                for name in self.RELATED)
 
-        context = context or {}
-        for variable in self.variables.all():
-            context[variable.name] = variable.value
+    def clean(self):
+        clean_templates(self)
 
-        request = HTTPRequest(
-            url = render_with_context(self.url, context),
-            method = self.method)
+    def has_form_body(self) -> bool:
+        return self.content_type == 'application/x-www-form-urlencoded'
 
-        session = Session()
-        record = RequestRecord.objects.create(blueprint = self)
+    def compile(self) -> SendPlan:
+        """
+        Returns the SendPlan for this blueprint, from the plan
+        cache when possible. Plans reflect the blueprint as it
+        was saved, and are rebuilt once it or its rows change,
+        in this process or any other.
+        """
+        if not self.pk:
+            return self.build_plan()
 
-        # Copy RequestBlueprint values to RequestRecord
-        for qs in self.name_value_related:
-            for obj in qs.all():
-                obj.pk = 0
-                obj.name = render_with_context(obj.name, context)
-                obj.value = render_with_context(obj.value, context)
-                obj.add_to(request)
-                obj.request = record
-                obj.save()
+        if plan_cache.check_due():
+            plan_cache.check()
+        plan = plan_cache.get(self.pk)
+        if plan is not None:
+            return plan
+        if plan_cache.is_outdated(self.pk, self.modified):
+            # Changed by another process since it was loaded
+            self.refresh_from_db()
+        plan = self.build_plan()
+        plan_cache.set(self.pk, plan, self.modified)
+        return plan
 
-        if self.content_type == self.BODY_TYPES[0][0]:
-            data = render_with_context(self.body, context)
-        else:
-            data = {}
-            for param in self.body_parameters.all():
-                param.add_to(data, context)
+    def build_plan(self) -> SendPlan:
+        """
+        Compile a SendPlan of this instance, without the
+        plan cache.
+        """
+        rows = self.get_related_rows()
+
+        def pairs(name):
+            return [(obj.name, obj.value) for obj in rows[name]]
+
+        return SendPlan.compile(
+            blueprint_id = self.pk,
+            method = self.method,
+            url = self.url,
+            variables = pairs('variables'),
+            headers = pairs('headers'),
+            query_parameters = pairs('query_parameters'),
+            cookies = pairs('cookies'),
+            body = None if self.has_form_body() else self.body,
+            body_parameters = pairs('body_parameters') if self.has_form_body() else None,
+            fields = [
+                (name, getattr(self, name))
+                for name in RequestRecord.get_clone_fields(self)
+            ],
+            connect_timeout = self.connect_timeout,
+            read_timeout = self.read_timeout,
+            follow_redirects = self.follow_redirects,
+            rate_limit = self.rate_limit,
+            rate_limit_burst = self.rate_limit_burst,
+            template_engine = self.template_engine)
 
-        request.data = data
-        prepared_request = request.prepare()
+    def render(self, context = None) -> RenderedRequest:
+        """
+        Render this blueprint with ``context`` without sending
+        it or writing to the database, to see what would be
+        sent. Returns the RenderedRequest, whose ``request``
+        is the prepared request.
+        """
+        return self.compile().render(context)
 
-        response = session.send(prepared_request, stream = True)
-        # TODO: follow redirects
+    def enqueue(self, context = None, delay : float = 0):
+        """
+        Queue this blueprint to be sent by ``manage.py
+        smithy_worker``. Returns the pending RequestRecord.
+        The context must be serializable as JSON.
+        """
+        return RequestRecord.objects.create(
+            blueprint = self,
+            name = self.name,
+            method = self.method,
+            url = self.url,
+            state = RequestRecord.PENDING,
+            context = json.dumps(context or {}, cls = DjangoJSONEncoder),
+            next_attempt_at = timezone.now() + timedelta(seconds = delay))
 
-        RequestRecord.objects.filter(pk = record.pk).update(
-            raw_request = parse_dump_result(dump._dump_request_data, prepared_request),
-            raw_response = parse_dump_result(dump._dump_response_data, response),
-            status = response.status_code,
-            **RequestRecord.get_clone_args(self, context)
+    def get_record_values(self, rendered : RenderedRequest, **values) -> dict:
+        """
+        The field values of the RequestRecord of a sent
+        request. ``values`` are the fields describing the
+        response, such as the status, and the raw request
+        if it isn't the rendered one.
+        """
+        values = dict(
+            dict(
+                payload_codec = get_setting('PAYLOAD_CODEC'),
+                state = RequestRecord.SENT,
+                error = '',
+                next_attempt_at = None,
+                redirects = '',
+                **rendered.fields
+            ),
+            **values
         )
+        if 'raw_request' not in values:
+            values['raw_request'] = parse_dump_result(dump._dump_request_data, rendered.request)
+        if get_setting('SNAPSHOT_ROWS'):
+            values['rows'] = json.dumps({
+                'headers': rendered.headers,
+                'query_parameters': rendered.query_parameters,
+                'cookies': rendered.cookies,
+            })
+        else:
+            values['rows'] = ''
+        return values
+
+    @transaction.atomic
+    def create_record(self, rendered : RenderedRequest, record = None, **values):
+        """
+        Store a sent request, see get_record_values.
+        """
+        values = self.get_record_values(rendered, **values)
+        snapshot = bool(values['rows'])
+
+        if record is None:
+            record = RequestRecord.objects.create(blueprint = self, **values)
+        else:
+            # Payloads are encoded with the record's codec
+            record.payload_codec = values.pop('payload_codec')
+            for name, value in values.items():
+                setattr(record, name, value)
+            record.save()
+            # Replace the rows of a previous attempt, without
+            # sending a delete signal for each of them
+            for model in (Header, QueryParameter, Cookie):
+                model.objects.filter(request = record)._raw_delete(record._state.db)
 
-        # Return fresh copy after update
-        return RequestRecord.objects.get(pk = record.pk)
+        if snapshot:
+            return record
+
+        for model, pairs in (
+                (Header, rendered.headers),
+                (QueryParameter, rendered.query_parameters),
+                (Cookie, rendered.cookies)):
+            if pairs:
+                model.objects.bulk_create([
+                    model(name = name, value = value, request = record)
+                    for name, value in pairs])
+        return record
+
+    def store_record(self, rendered : RenderedRequest, record, timer : Timer, **values):
+        """
+        Store a sent request with create_record, adding the
+        time spent writing it to its timings.
+        """
+        with timer.measure('db_write'):
+            record = self.create_record(rendered, record, **values, **timer.get_record_values())
+        self.save_timings([record], [timer])
+        return record
+
+    @staticmethod
+    def save_timings(records : list, timers : list):
+        """
+        Update the timings and durations of stored records,
+        once the time spent writing them is known, in one
+        query.
+        """
+        if not records:
+            return
+        for record, timer in zip(records, timers):
+            for name, value in timer.get_record_values().items():
+                setattr(record, name, value)
+        RequestRecord.objects.bulk_update(records, ['timings', 'duration'])
+
+    @transaction.atomic
+    def create_records(self, items : list) -> list:
+        """
+        Store the sent requests of a batch in bulk. ``items``
+        are (rendered request, values) pairs, as taken by
+        create_record.
+        """
+        records = [
+            RequestRecord(blueprint = self, **self.get_record_values(rendered, **values))
+            for rendered, values in items]
+        RequestRecord.objects.bulk_insert(records)
+
+        if not get_setting('SNAPSHOT_ROWS'):
+            for model, kind in (
+                    (Header, 'headers'),
+                    (QueryParameter, 'query_parameters'),
+                    (Cookie, 'cookies')):
+                model.objects.bulk_create([
+                    model(name = name, value = value, request = record)
+                    for record, (rendered, _) in zip(records, items)
+                    for name, value in getattr(rendered, kind)])
+        return records
+
+    def send(self, context = None, record = None, max_wait : float = None):
+        """
+        Send this blueprint and return its RequestRecord.
+        If ``record`` is given, for example a queued one,
+        it is filled in instead of creating a new record.
+        While the circuit breaker of the host is open, a
+        failed record is returned without sending anything.
+        Sends over a rate limit wait their turn, or raise
+        RateLimited if that takes more than ``max_wait``
+        seconds.
+        """
+        timer = Timer()
+        rendered = None
+        try:
+            with activate(timer):
+                with timer.measure('render'):
+                    plan = self.compile()
+                    rendered = plan.render(context)
+                try:
+                    values = self.exchange(plan, rendered, timer, max_wait)
+                except CircuitOpen as e:
+                    return self.short_circuit(rendered, record, e, timer)
+
+            record = self.store_record(rendered, record, timer, **values)
+        except Exception as e:
+            signals.failed(self, rendered, e, timer)
+            raise
+
+        signals.finished(self, rendered, record)
+        return record
+
+    async def asend(self, context = None, max_wait : float = None):
+        """
+        Send this blueprint without blocking the event loop.
+        The request is sent with an async HTTP client and
+        database work runs through sync_to_async.
+        """
+        from asgiref.sync import sync_to_async
+
+        timer = Timer()
+        rendered = None
+        try:
+            with timer.measure('render'):
+                if plan_cache.check_due():
+                    with timer.measure('db'):
+                        await sync_to_async(plan_cache.check)()
+                plan = plan_cache.get(self.pk)
+                if plan is None:
+                    with timer.measure('db'):
+                        plan = await sync_to_async(self.compile)()
+                rendered = plan.render(context)
+            try:
+                values = await self.aexchange(plan, rendered, timer, max_wait)
+            except CircuitOpen as e:
+                return await sync_to_async(self.short_circuit)(rendered, None, e, timer)
+
+            record = await sync_to_async(self.store_record)(rendered, None, timer, **values)
+        except Exception as e:
+            signals.failed(self, rendered, e, timer)
+            raise
+
+        signals.finished(self, rendered, record)
+        return record
+
+    def send_unrecorded(self, context = None, max_wait : float = None) -> tuple:
+        """
+        Send this blueprint like send, without writing a
+        RequestRecord or reading the database once its plan
+        is cached. Returns the rendered request and the
+        values its record would have had.
+        """
+        timer = Timer()
+        rendered = None
+        try:
+            with activate(timer):
+                with timer.measure('render'):
+                    plan = self.compile()
+                    rendered = plan.render(context)
+                values = self.exchange(plan, rendered, timer, max_wait)
+        except Exception as e:
+            signals.failed(self, rendered, e, timer)
+            raise
+
+        values.update(timer.get_record_values())
+        signals.finished(self, rendered, None, values)
+        return rendered, values
+
+    def send_chunks(self, contexts, concurrency : int = 8, chunk_size : int = 500):
+        """
+        Send this blueprint once per context, yielding the
+        SendResults of every ``chunk_size`` contexts. The
+        blueprint is compiled once, and ``contexts`` may be
+        any iterable, such as a generator reading a file,
+        as only one chunk is held in memory at a time. The
+        contexts of a chunk are sent using up to
+        ``concurrency`` threads, and their records are then
+        written in bulk. The errors of each SendResults are
+        (context, exception) pairs.
+        """
+        plan = self.compile()
+        contexts = iter(contexts)
+        while True:
+            chunk = list(islice(contexts, chunk_size))
+            if not chunk:
+                return
+            yield self.send_chunk(plan, chunk, concurrency)
+
+    def send_chunk(self, plan : SendPlan, contexts : list, concurrency : int) -> SendResults:
+        def exchange(context):
+            timer = Timer()
+            rendered = None
+            try:
+                with activate(timer):
+                    with timer.measure('render'):
+                        rendered = plan.render(context)
+                    try:
+                        values = self.exchange(plan, rendered, timer)
+                    except CircuitOpen as e:
+                        values = dict(state = RequestRecord.FAILED, error = str(e), raw_response = '')
+                        return rendered, values, timer, e
+            except Exception as e:
+                signals.failed(self, rendered, e, timer)
+                raise
+            return rendered, values, timer, None
+
+        results, errors = map_concurrent(exchange, contexts, concurrency)
+        sent = [result for result in results if result is not None]
+        timers = [timer for _, _, timer, _ in sent]
+        writing = Timer()
+        with writing.measure('db_write'):
+            records = self.create_records([
+                (rendered, dict(values, **timer.get_record_values()))
+                for rendered, values, timer, _ in sent])
+        # Every record gets an equal share of the bulk write
+        for timer in timers:
+            timer.add('db_write', writing.phases['db_write'] // max(len(timers), 1))
+        self.save_timings(records, timers)
+
+        for (rendered, _, timer, error), record in zip(sent, records):
+            if error is None:
+                signals.finished(self, rendered, record)
+            else:
+                signals.failed(self, rendered, error, timer)
+
+        records = iter(records)
+        return SendResults(
+            [None if result is None else next(records) for result in results],
+            [(contexts[index], errors[index]) for index in sorted(errors)])
+
+    def send_batch(self, contexts, concurrency : int = 8, chunk_size : int = 500) -> BatchResults:
+        """
+        Send this blueprint once per context and return the
+        totals, see send_chunks. The records themselves are
+        not kept, so memory use doesn't grow with the batch.
+        """
+        results = BatchResults()
+        for chunk in self.send_chunks(contexts, concurrency, chunk_size):
+            results.add(chunk)
+        return results
+
+    def exchange(self, plan : SendPlan, rendered : RenderedRequest, timer : Timer, max_wait : float = None) -> dict:
+        """
+        Send a rendered request, once the circuit breaker and
+        rate limits of its host let it through. Returns the
+        values to store on its record, which isn't written.
+        """
+        host = get_host(rendered.request.url)
+        circuit_breaker.check(host)
+        rate_limiter.acquire(rate_limiter.get_limits(plan, host), max_wait)
+        signals.started(self, rendered)
+
+        with host_limiter.limit(host):
+            try:
+                values = self.transfer(plan, rendered.request, timer)
+            except Exception:
+                circuit_breaker.record_failure(host)
+                raise
+        self.record_health(host, values['status'])
+        return values
+
+    async def aexchange(self, plan : SendPlan, rendered : RenderedRequest, timer : Timer,
+                        max_wait : float = None) -> dict:
+        """
+        The asyncio counterpart of exchange.
+        """
+        host = get_host(rendered.request.url)
+        circuit_breaker.check(host)
+        await rate_limiter.aacquire(rate_limiter.get_limits(plan, host), max_wait)
+        signals.started(self, rendered)
+
+        async with host_limiter.alimit(host):
+            try:
+                values = await self.atransfer(plan, rendered.request, timer)
+            except Exception:
+                circuit_breaker.record_failure(host)
+                raise
+        self.record_health(host, values['status'])
+        return values
+
+    @staticmethod
+    def transfer(plan : SendPlan, request, timer : Timer) -> dict:
+        """
+        Send a prepared request, following redirects if the
+        plan says so, and read the last response. Returns
+        the values to store on the RequestRecord.
+        """
+        hops = Hops()
+        values = {}
+        while True:
+            with timer.measure('ttfb'):
+                response = session_pool.send(
+                    request, stream = True, timeout = plan.get_timeout(), allow_redirects = False)
+
+            next_request = get_redirect(response, request) if plan.follow_redirects else None
+            if next_request is None:
+                break
+            if hops.exceeded:
+                values['error'] = hops.get_error()
+                break
+            with timer.measure('download'):
+                drain(response)
+            hops.add(request.method, request.url, response.status_code)
+            request = next_request
+
+        with timer.measure('download'):
+            values.update(capture_response(response))
+        if hops:
+            values.update(
+                redirects = json.dumps(hops),
+                raw_request = parse_dump_result(dump._dump_request_data, request))
+        return values
+
+    @staticmethod
+    async def atransfer(plan : SendPlan, request, timer : Timer) -> dict:
+        """
+        The asyncio counterpart of transfer.
+        """
+        hops = Hops()
+        values = {}
+        with timer.measure('ttfb'):
+            response = await async_client_pool.send(
+                request, timer = timer, timeout = plan.get_timeout())
+
+        while plan.follow_redirects and response.next_request is not None:
+            if hops.exceeded:
+                values['error'] = hops.get_error()
+                break
+            with timer.measure('download'):
+                await adrain(response)
+            hops.add(response.request.method, str(response.request.url), response.status_code)
+            with timer.measure('ttfb'):
+                response = await async_client_pool.send_request(response.next_request)
+
+        with timer.measure('download'):
+            values.update(await acapture_response(response))
+        if hops:
+            await response.request.aread()
+            values.update(
+                redirects = json.dumps(hops),
+                raw_request = parse_dump_result(
+                    dump._dump_request_data, to_prepared(response.request)))
+        return values
+
+    @staticmethod
+    def record_health(host : str, status : int):
+        if status >= 500:
+            circuit_breaker.record_failure(host)
+        else:
+            circuit_breaker.record_success(host)
+
+    def short_circuit(self, rendered : RenderedRequest, record, error : CircuitOpen, timer : Timer):
+        """
+        Record a request that wasn't sent because the
+        circuit breaker of its host is open.
+        """
+        record = self.store_record(
+            rendered, record, timer,
+            state = RequestRecord.FAILED,
+            error = str(error),
+            raw_response = '')
+        signals.failed(self, rendered, error, timer)
+        return record
+
+
+class RequestRecordQuerySet(models.QuerySet):
+
+    def bulk_insert(self, records : list) -> list:
+        """
+        Insert new records in bulk. bulk_create refuses
+        multi-table inheritance, so the Request rows are bulk
+        created first, and the RequestRecord rows are then
+        inserted with the primary keys returned for them, in
+        a single executemany. Databases that don't return
+        rows from bulk inserts, such as SQLite before Django
+        4, save each record in turn instead, so call this in
+        a transaction.
+        """
+        connection = connections[self.db]
+        if not connection.features.can_return_rows_from_bulk_insert:
+            for record in records:
+                record.save(force_insert = True, using = self.db)
+            return records
+
+        Request.objects.using(self.db).bulk_create(records)
+        for record in records:
+            record.request_ptr_id = record.id
+
+        fields = self.model._meta.local_concrete_fields
+        quote = connection.ops.quote_name
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(self.model._meta.db_table),
+            ', '.join(quote(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)))
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [
+                [field.get_db_prep_save(field.pre_save(record, True), connection) for field in fields]
+                for record in records])
+
+        for record in records:
+            record._state.adding = False
+            record._state.db = self.db
+        return records
+
+    def duration_percentiles(self, fractions = (0.5, 0.95)) -> dict:
+        """
+        Percentiles of the send duration of each blueprint,
+        in milliseconds, as ``{blueprint_id: {0.5: p50, ...}}``.
+        Computed by the database on PostgreSQL, otherwise
+        from the durations, streamed in one query.
+        """
+        records = self.filter(duration__isnull = False, blueprint__isnull = False).order_by()
+        if connections[records.db].vendor == 'postgresql':
+            rows = records.values('blueprint_id').annotate(**dict(
+                ('p{}'.format(n), PercentileCont('duration', fraction))
+                for n, fraction in enumerate(fractions)))
+            return dict(
+                (row['blueprint_id'], dict(
+                    (fraction, row['p{}'.format(n)])
+                    for n, fraction in enumerate(fractions)))
+                for row in rows)
+
+        rows = records.order_by('blueprint_id', 'duration') \
+            .values_list('blueprint_id', 'duration').iterator()
+        result = {}
+        for blueprint_id, group in groupby(rows, key = itemgetter(0)):
+            durations = [duration for _, duration in group]
+            result[blueprint_id] = dict(
+                (fraction, percentile(durations, fraction))
+                for fraction in fractions)
+        return result
 
 
 class RequestRecord(Request):
@@ -137,13 +815,136 @@ class RequestRecord(Request):
     Contains response and diagnostic information
     about the request.
     """
-    raw_request = models.TextField()
-    raw_response = models.TextField()
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATES = (
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+    # Payloads stored with the "text" codec
+    request_text = models.TextField(blank = True, db_column = 'raw_request')
+    response_text = models.TextField(blank = True, db_column = 'raw_response')
+    # Payloads stored with any other codec, see smithy.payloads
+    request_payload = models.BinaryField(null = True, editable = False)
+    response_payload = models.BinaryField(null = True, editable = False)
+    payload_codec = models.CharField(max_length = 10, default = TEXT)
     status = models.PositiveIntegerField(null = True)
     blueprint = models.ForeignKey(
         'smithy.RequestBlueprint',
         on_delete = models.SET_NULL,
         null = True)
+    state = models.CharField(
+        max_length = 10, choices = STATES, default = SENT)
+    context = models.TextField(blank = True)
+    attempts = models.PositiveIntegerField(default = 0)
+    next_attempt_at = models.DateTimeField(null = True, blank = True)
+    error = models.TextField(blank = True)
+    response_size = models.BigIntegerField(null = True, blank = True)
+    response_sha256 = models.CharField(max_length = 64, blank = True)
+    response_file = models.CharField(max_length = 255, blank = True)
+    # JSON snapshot of the headers, query parameters and
+    # cookies, used instead of their rows when not empty
+    rows = models.TextField(blank = True)
+    # JSON list of the redirects followed before the
+    # recorded response, see smithy.redirects
+    redirects = models.TextField(blank = True)
+    # Milliseconds spent in each phase of the send as
+    # JSON, see smithy.timing, and their total
+    timings = models.TextField(blank = True)
+    duration = models.FloatField(null = True, blank = True)
+
+    objects = RequestRecordQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields = ['state', 'next_attempt_at']),
+            # Records of a blueprint, newest first
+            models.Index(fields = ['blueprint', '-request_ptr']),
+            models.Index(fields = ['status']),
+        ]
+
+    def get_payload(self, kind : str) -> str:
+        payloads = self.__dict__.setdefault('_payloads', {})
+        if kind not in payloads:
+            if self.payload_codec == TEXT:
+                payloads[kind] = getattr(self, kind + '_text')
+            else:
+                data = getattr(self, kind + '_payload')
+                payloads[kind] = '' if data is None \
+                    else get_codec(self.payload_codec).decode(bytes(data))
+        return payloads[kind]
+
+    def set_payload(self, kind : str, text : str):
+        if self.payload_codec == TEXT:
+            setattr(self, kind + '_text', text)
+            setattr(self, kind + '_payload', None)
+        else:
+            setattr(self, kind + '_text', '')
+            setattr(self, kind + '_payload', get_codec(self.payload_codec).encode(text))
+        self.__dict__.setdefault('_payloads', {})[kind] = text
+
+    raw_request = property(
+        lambda self: self.get_payload('request'),
+        lambda self, text: self.set_payload('request', text))
+
+    raw_response = property(
+        lambda self: self.get_payload('response'),
+        lambda self, text: self.set_payload('response', text))
+
+    def refresh_from_db(self, *args, **kwargs):
+        self.__dict__.pop('_payloads', None)
+        super().refresh_from_db(*args, **kwargs)
+
+    def get_context(self) -> dict:
+        return json.loads(self.context) if self.context else {}
+
+    def get_timings(self) -> dict:
+        return json.loads(self.timings) if self.timings else {}
+
+    def get_redirects(self) -> list:
+        return json.loads(self.redirects) if self.redirects else []
+
+    def get_rows(self) -> dict:
+        """
+        The headers, query parameters and cookies sent with
+        this request as name/value pairs, read from the JSON
+        snapshot or, for records without one, loaded from
+        their rows in one query.
+        """
+        if self.rows:
+            return dict(
+                (kind, [tuple(pair) for pair in pairs])
+                for kind, pairs in json.loads(self.rows).items())
+
+        kinds = (
+            ('headers', Header),
+            ('query_parameters', QueryParameter),
+            ('cookies', Cookie),
+        )
+        querysets = [
+            model.objects
+            .filter(request_id = self.pk)
+            .annotate(kind = models.Value(kind, output_field = models.CharField()))
+            .values_list('kind', 'pk', 'name', 'value')
+            for kind, model in kinds]
+
+        rows = dict((kind, []) for kind, _ in kinds)
+        for kind, pk, name, value in sorted(querysets[0].union(*querysets[1:], all = True)):
+            rows[kind].append((name, value))
+        return rows
+
+    def open_response_file(self):
+        """
+        Open the full response body, if it was too large
+        to keep in raw_response and was saved to storage.
+        """
+        if not self.response_file:
+            return None
+        return get_response_storage().open(self.response_file)
 
     @property
     def is_success(self):
@@ -155,19 +956,25 @@ class RequestRecord(Request):
             blueprint = blueprint)
 
     @classmethod
-    def get_clone_args(cls, obj, context : dict):
-        return dict([
-            (
-                render_with_context(fld.name, context),
-                render_with_context(getattr(obj, fld.name), context)
-            )
+    def get_clone_fields(cls, obj):
+        return [
+            fld.name
             for fld \
             in cls._meta.fields \
             if fld.name != obj._meta.pk \
             and fld in obj._meta.fields \
             and fld.name not in [
                    'request', 'id', 'created', 'updated'
-               ]])
+               ]]
+
+    @classmethod
+    def get_clone_args(cls, obj, context : dict):
+        return dict([
+            (
+                render_with_context(name, context),
+                render_with_context(getattr(obj, name), context)
+            )
+            for name in cls.get_clone_fields(obj)])
 
 
 class Variable(NameValueModel):
@@ -182,6 +989,9 @@ class Variable(NameValueModel):
         on_delete = models.CASCADE,
         related_name = 'variables')
 
+    # Variables are added to the context as they are
+    template_fields = ()
+
 
 class BodyParameter(NameValueModel):
     """
@@ -235,14 +1045,7 @@ class QueryParameter(NameValueModel):
         related_name = 'query_parameters')
 
     def add_to(self, request : HTTPRequest):
-        existing_param_str = urlparse(request.url).query
-        param_dict = parse_qs(existing_param_str)
-
-        param_dict[self.name] = self.value
-
-        base_url = request.url.rstrip(existing_param_str)
-        param_str = urlencode(param_dict, doseq=True)
-        request.url = base_url.rstrip("?") + "?" + param_str
+        request.url = add_query_parameter(request.url, self.name, self.value)
 
 
 class Cookie(NameValueModel):
@@ -265,6 +1068,75 @@ class Cookie(NameValueModel):
         )
 
 
+class Schedule(TimeStampedModel):
+    """
+    Sends its blueprint every ``interval`` seconds, or at
+    the times matching a ``cron`` expression, while
+    ``manage.py smithy_scheduler`` runs.
+    """
+    blueprint = models.ForeignKey(
+        'smithy.RequestBlueprint',
+        on_delete = models.CASCADE,
+        related_name = 'schedules')
+    interval = models.PositiveIntegerField(
+        null = True, blank = True,
+        help_text = "Seconds between two sends.")
+    cron = models.CharField(
+        max_length = 100, blank = True,
+        help_text = "A cron expression, such as \"*/5 * * * *\", evaluated in UTC.")
+    context = models.TextField(
+        blank = True,
+        help_text = "JSON object used as the context of every send.")
+    enabled = models.BooleanField(default = True)
+    next_run_at = models.DateTimeField(null = True, blank = True)
+    last_run_at = models.DateTimeField(null = True, blank = True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields = ['enabled', 'next_run_at']),
+        ]
+
+    def __str__(self):
+        return "{} ({})".format(
+            self.blueprint, self.cron or "every {}s".format(self.interval))
+
+    def clean(self):
+        if bool(self.interval) == bool(self.cron):
+            raise ValidationError("Set either an interval or a cron expression.")
+        if self.cron:
+            try:
+                CronExpression(self.cron).get_next(timezone.now())
+            except ValueError as e:
+                raise ValidationError({'cron': str(e)})
+        try:
+            self.get_context()
+        except ValueError as e:
+            raise ValidationError({'context': "Invalid JSON: {}".format(e)})
+
+    def get_context(self) -> dict:
+        return json.loads(self.context) if self.context else {}
+
+    def get_next_run(self, after):
+        """
+        The first run strictly after ``after``. Runs
+        missed while no scheduler was running are skipped.
+        Intervals are counted from the previous run, so
+        they don't drift.
+        """
+        if self.cron:
+            return CronExpression(self.cron).get_next(after)
+        interval = timedelta(seconds = self.interval)
+        if self.next_run_at is None:
+            return after + interval
+        missed = max((after - self.next_run_at) // interval + 1, 1)
+        return self.next_run_at + missed * interval
+
+    def save(self, *args, **kwargs):
+        if self.next_run_at is None and self.enabled:
+            self.next_run_at = self.get_next_run(timezone.now())
+        super().save(*args, **kwargs)
+
+
 @receiver(post_save, sender = RequestBlueprint)
 def add_content_type(sender, instance : RequestBlueprint, created, **kwargs):
     if created and not instance.headers.filter(name__iexact = 'content-type').exists():
@@ -273,3 +1145,65 @@ def add_content_type(sender, instance : RequestBlueprint, created, **kwargs):
             value = instance.content_type,
             request = instance.request_ptr
         )
+
+
+@receiver(post_save, sender = RequestBlueprint)
+@receiver(post_delete, sender = RequestBlueprint)
+def clear_blueprint_caches(sender, instance, **kwargs):
+    # Templates are cached by their source, so they can't
+    # go stale and are kept.
+    plan_cache.delete(instance.pk)
+
+
+class DeferredRowChanges(threading.local):
+    pks = None
+
+
+deferred_row_changes = DeferredRowChanges()
+
+
+@contextmanager
+def defer_row_changes():
+    """
+    Bump the modified time of blueprints whose rows change
+    inside the block once when it ends, instead of once for
+    every row saved or deleted.
+    """
+    if deferred_row_changes.pks is not None:
+        yield
+        return
+    deferred_row_changes.pks = set()
+    try:
+        yield
+    finally:
+        pks, deferred_row_changes.pks = deferred_row_changes.pks, None
+        if pks:
+            RequestBlueprint.objects.filter(pk__in = pks).update(modified = timezone.now())
+
+
+@receiver(post_save, sender = Variable)
+@receiver(post_delete, sender = Variable)
+@receiver(post_save, sender = BodyParameter)
+@receiver(post_delete, sender = BodyParameter)
+@receiver(post_save, sender = Header)
+@receiver(post_delete, sender = Header)
+@receiver(post_save, sender = QueryParameter)
+@receiver(post_delete, sender = QueryParameter)
+@receiver(post_save, sender = Cookie)
+@receiver(post_delete, sender = Cookie)
+def clear_row_caches(sender, instance, **kwargs):
+    # Rows copied onto a RequestRecord are written on
+    # every send and never change a blueprint.
+    cached = sender.request.is_cached(instance)
+    if cached and isinstance(instance.request, RequestRecord):
+        return
+    plan_cache.delete(instance.request_id)
+    if deferred_row_changes.pks is not None:
+        deferred_row_changes.pks.add(instance.request_id)
+        return
+    # The blueprint's modified time is the version other
+    # processes check their plans against. Nothing is
+    # updated when the row belongs to a record.
+    modified = timezone.now()
+    if RequestBlueprint.objects.filter(pk = instance.request_id).update(modified = modified) and cached:
+        instance.request.modified = modified
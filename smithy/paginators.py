@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from smithy.conf import get_setting
+
+
+def estimate_count(queryset):
+    """
+    The number of rows in the table of an unfiltered
+    queryset, from the database's statistics. Returns None
+    when the queryset is filtered or the database keeps
+    no usable statistics.
+    """
+    if queryset.query.where:
+        return None
+
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = "SELECT reltuples FROM pg_class WHERE relname = %s"
+    elif connection.vendor == 'mysql':
+        sql = "SELECT table_rows FROM information_schema.tables " \
+              "WHERE table_schema = DATABASE() AND table_name = %s"
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginates large tables without a full COUNT(*). When an
+    unfiltered table is estimated to hold more than
+    SMITHY_ESTIMATED_COUNT_THRESHOLD rows, the estimate is
+    used as the count. Smaller tables and filtered results
+    are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list) \
+            if hasattr(self.object_list, 'query') else None
+        if estimate is not None and estimate > get_setting('ESTIMATED_COUNT_THRESHOLD'):
+            return estimate
+        return super().count
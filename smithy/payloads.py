@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Codecs used to store RequestRecord payloads. Records
+written with the ``text`` codec keep their payloads in
+plain text columns. Every other codec encodes them
+into binary columns, and payloads are only decoded
+when they are read.
+"""
+import uuid
+import zlib
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, get_storage_class
+from django.db import transaction
+
+from smithy.conf import get_setting
+
+
+TEXT = 'text'
+
+
+class Codec:
+    name = None
+
+    def encode(self, text : str) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data : bytes) -> str:
+        raise NotImplementedError
+
+
+class ZlibCodec(Codec):
+    name = 'zlib'
+
+    def encode(self, text : str) -> bytes:
+        return zlib.compress(text.encode('utf-8'), get_setting('PAYLOAD_COMPRESSION_LEVEL'))
+
+    def decode(self, data : bytes) -> str:
+        return zlib.decompress(data).decode('utf-8')
+
+
+class ZstdCodec(Codec):
+    """
+    Faster and smaller than zlib. Requires the
+    zstandard package.
+    """
+    name = 'zstd'
+
+    @staticmethod
+    def get_module():
+        try:
+            import zstandard
+        except ImportError:
+            raise ImproperlyConfigured(
+                "zstandard must be installed to use the zstd payload codec")
+        return zstandard
+
+    def encode(self, text : str) -> bytes:
+        return self.get_module().ZstdCompressor().compress(text.encode('utf-8'))
+
+    def decode(self, data : bytes) -> str:
+        return self.get_module().ZstdDecompressor().decompress(data).decode('utf-8')
+
+
+class StorageCodec(Codec):
+    """
+    Offloads zlib compressed payloads to file storage,
+    keeping only their name in the database. Uses the
+    storage set by SMITHY_PAYLOAD_STORAGE.
+    """
+    name = 'file'
+    compressor = ZlibCodec()
+
+    @staticmethod
+    def get_storage():
+        storage = get_setting('PAYLOAD_STORAGE')
+        if storage is True:
+            return default_storage
+        if not storage:
+            raise ImproperlyConfigured(
+                "SMITHY_PAYLOAD_STORAGE must be set to use the file payload codec")
+        return get_storage_class(storage)()
+
+    def encode(self, text : str) -> bytes:
+        storage = self.get_storage()
+        name = 'smithy/payloads/{}.zlib'.format(uuid.uuid4().hex)
+        content = ContentFile(self.compressor.encode(text))
+        # Written once the record is committed, so that
+        # rolled back records leave no files behind
+        transaction.on_commit(lambda: storage.save(name, content))
+        return name.encode('utf-8')
+
+    def decode(self, data : bytes) -> str:
+        with self.get_storage().open(bytes(data).decode('utf-8')) as payload:
+            return self.compressor.decode(payload.read())
+
+
+CODECS = {}
+
+
+def register_codec(codec : Codec):
+    CODECS[codec.name] = codec
+
+
+def get_codec(name : str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ImproperlyConfigured("Unknown payload codec {!r}".format(name))
+
+
+register_codec(ZlibCodec())
+register_codec(ZstdCodec())
+register_codec(StorageCodec())
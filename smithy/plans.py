@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Send plans are immutable snapshots of a RequestBlueprint
+and its rows, with every template compiled. Rendering a
+plan needs no database access, so a cached plan can be
+sent over and over without reading the blueprint again.
+"""
+import time
+from threading import Lock
+
+from django.core.cache import caches
+from django.template import Context
+from requests import Request as HTTPRequest
+from requests.cookies import create_cookie, RequestsCookieJar
+
+from smithy.conf import get_setting
+from smithy.helpers import DJANGO, add_query_parameters, compile_template
+
+
+class Frozen:
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is immutable".format(self.__class__.__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("{} is immutable".format(self.__class__.__name__))
+
+    def __reduce__(self):
+        return (_unpickle, (self.__class__, dict(
+            (name, getattr(self, name)) for name in self.__slots__)))
+
+
+def _unpickle(cls, values):
+    return cls(**values)
+
+
+class RenderedRequest(Frozen):
+    """
+    A plan rendered with a context. ``request`` is the
+    prepared HTTP request, the name/value pairs are the
+    rendered rows and ``fields`` the values to copy onto
+    the RequestRecord.
+    """
+    __slots__ = (
+        'context',
+        'request',
+        'headers',
+        'query_parameters',
+        'cookies',
+        'fields',
+    )
+
+
+class SendPlan(Frozen):
+    __slots__ = (
+        'blueprint_id',
+        'method',
+        'url',
+        'variables',
+        'headers',
+        'query_parameters',
+        'cookies',
+        'body',
+        'body_parameters',
+        'fields',
+        'connect_timeout',
+        'read_timeout',
+        'follow_redirects',
+        'rate_limit',
+        'rate_limit_burst',
+        'template_engine',
+    )
+
+    @classmethod
+    def compile(cls, blueprint_id, method : str, url : str, variables,
+                headers, query_parameters, cookies, body = None,
+                body_parameters = None, fields = (),
+                connect_timeout : float = None, read_timeout : float = None,
+                follow_redirects : bool = False, rate_limit : float = None,
+                rate_limit_burst : int = None, template_engine : str = DJANGO):
+        """
+        Build a plan from plain values. ``variables`` and the
+        rows are iterables of name/value pairs, ``fields``
+        of record field names and values. The body is either
+        a string, or body_parameters for form encoded bodies.
+        Timeouts left to None use the global settings, and
+        a rate_limit of None sends as fast as possible.
+        Templates are compiled with ``template_engine``.
+        """
+        def compile(source):
+            return compile_template(source, template_engine)
+
+        def compile_pairs(pairs):
+            return tuple(
+                (compile(name), compile(value))
+                for name, value in pairs)
+
+        return cls(
+            blueprint_id = blueprint_id,
+            method = method,
+            url = compile(url),
+            variables = tuple(variables),
+            headers = compile_pairs(headers),
+            query_parameters = compile_pairs(query_parameters),
+            cookies = compile_pairs(cookies),
+            body = None if body is None else compile(body),
+            body_parameters = None if body_parameters is None else compile_pairs(
+                (name, value) for name, value in body_parameters if name and value),
+            fields = tuple(
+                (name, compile(value)) for name, value in fields),
+            connect_timeout = connect_timeout,
+            read_timeout = read_timeout,
+            follow_redirects = follow_redirects,
+            rate_limit = rate_limit,
+            rate_limit_burst = rate_limit_burst,
+            template_engine = template_engine,
+        )
+
+    def get_timeout(self) -> tuple:
+        """
+        The connect and read timeouts, in seconds.
+        """
+        return (
+            get_setting('CONNECT_TIMEOUT') if self.connect_timeout is None else self.connect_timeout,
+            get_setting('READ_TIMEOUT') if self.read_timeout is None else self.read_timeout,
+        )
+
+    def render(self, context = None) -> RenderedRequest:
+        context = dict(context or {})
+        context.update(self.variables)
+        # Fast templates read the dict itself
+        template_context = Context(context) if self.template_engine == DJANGO else context
+
+        def render_pairs(pairs):
+            return [
+                (name.render(template_context), value.render(template_context))
+                for name, value in pairs]
+
+        headers = render_pairs(self.headers)
+        query_parameters = render_pairs(self.query_parameters)
+        cookies = render_pairs(self.cookies)
+
+        request = HTTPRequest(
+            url = add_query_parameters(self.url.render(template_context), query_parameters),
+            method = self.method)
+
+        for name, value in headers:
+            if name and value:
+                request.headers[name] = value
+
+        if cookies:
+            request.cookies = RequestsCookieJar()
+            for name, value in cookies:
+                request.cookies.set_cookie(create_cookie(name, value))
+
+        if self.body_parameters is None:
+            request.data = self.body.render(template_context) if self.body else ''
+        else:
+            request.data = dict(render_pairs(self.body_parameters))
+
+        return RenderedRequest(
+            context = context,
+            request = request.prepare(),
+            headers = headers,
+            query_parameters = query_parameters,
+            cookies = cookies,
+            fields = dict(
+                (name, value.render(template_context))
+                for name, value in self.fields),
+        )
+
+
+class PlanCache:
+    """
+    Holds compiled plans by blueprint primary key, either
+    in this process or, when SMITHY_PLAN_CACHE names one
+    of the project's CACHES, in Django's cache framework.
+    Plans expire after SMITHY_PLAN_CACHE_TIMEOUT seconds
+    and are deleted whenever their blueprint changes.
+
+    Plans kept in this process are tagged with the
+    ``modified`` time of their blueprint, which is updated
+    whenever it or one of its rows changes. Every
+    SMITHY_PLAN_CACHE_CHECK_INTERVAL seconds, check drops
+    the plans of blueprints changed by other processes.
+    """
+    # The number after "plan" changes along with SendPlan's
+    # slots, so plans pickled by older versions are ignored
+    KEY = 'smithy:plan:5:{}'
+
+    def __init__(self):
+        self._plans = {}
+        self._changed = {}
+        self._checked_at = None
+        self._lock = Lock()
+
+    @property
+    def backend(self):
+        alias = get_setting('PLAN_CACHE')
+        return caches[alias] if alias else None
+
+    def get(self, pk):
+        backend = self.backend
+        if backend is not None:
+            return backend.get(self.KEY.format(pk))
+
+        entry = self._plans.get(pk)
+        if entry is None:
+            return None
+        plan, expires, _ = entry
+        if expires is not None and expires < time.monotonic():
+            return None
+        return plan
+
+    def set(self, pk, plan : SendPlan, version = None):
+        timeout = get_setting('PLAN_CACHE_TIMEOUT')
+        backend = self.backend
+        if backend is not None:
+            backend.set(self.KEY.format(pk), plan, timeout)
+            return
+
+        expires = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._plans[pk] = (plan, expires, version)
+            self._changed.pop(pk, None)
+            if self._checked_at is None:
+                self._checked_at = time.monotonic()
+
+    def delete(self, pk):
+        backend = self.backend
+        if backend is not None:
+            backend.delete(self.KEY.format(pk))
+        with self._lock:
+            self._plans.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self._changed.clear()
+            self._checked_at = None
+
+    def check_due(self) -> bool:
+        """
+        Whether the plans kept in this process should be
+        checked against the database.
+        """
+        interval = get_setting('PLAN_CACHE_CHECK_INTERVAL')
+        if interval is None or self._checked_at is None or self.backend is not None:
+            return False
+        return time.monotonic() - self._checked_at >= interval
+
+    def check(self):
+        """
+        Drop the plans of blueprints that were changed or
+        deleted since they were compiled, in one query.
+        """
+        from smithy.models import RequestBlueprint
+
+        self._checked_at = time.monotonic()
+        with self._lock:
+            versions = dict((pk, entry[2]) for pk, entry in self._plans.items())
+        current = dict(
+            RequestBlueprint.objects
+            .filter(pk__in = list(versions))
+            .values_list('pk', 'modified'))
+        with self._lock:
+            for pk, version in versions.items():
+                if current.get(pk) == version:
+                    continue
+                entry = self._plans.get(pk)
+                if entry is not None and entry[2] == version:
+                    del self._plans[pk]
+                if pk in current:
+                    self._changed[pk] = current[pk]
+
+    def is_outdated(self, pk, version) -> bool:
+        """
+        Whether a check found blueprint ``pk`` was changed
+        after ``version``, so that an instance loaded
+        before then has to be refreshed.
+        """
+        changed = self._changed.get(pk)
+        return changed is not None and changed != version
+
+
+plan_cache = PlanCache()
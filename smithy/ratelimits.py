@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Token bucket rate limits for blueprints and hosts. A
+bucket holds up to ``burst`` tokens and refills at
+``rate`` tokens a second. Every send takes a token from
+the bucket of its blueprint and of its host, waiting for
+one to be refilled rather than failing.
+
+Buckets are kept as the time at which they will be full
+again, which is a single number that Django's cache can
+hold, so that with SMITHY_RATE_LIMIT_CACHE the limits
+are shared by every process using that cache.
+"""
+import asyncio
+import math
+import os
+import time
+from threading import Lock
+
+from django.core.cache import caches
+
+from smithy.conf import get_setting
+
+
+class RateLimited(Exception):
+    """
+    Raised instead of waiting for a token when that would
+    take longer than the caller allowed.
+    """
+
+    def __init__(self, key : str, retry_after : float):
+        self.key = key
+        self.retry_after = retry_after
+        super().__init__(
+            "Rate limit of {} reached, retrying in {:.2f}s".format(key, retry_after))
+
+
+def take(full_at : float, now : float, rate : float, burst : int) -> tuple:
+    """
+    Take a token from a bucket that is full at ``full_at``.
+    Returns the seconds to wait until the token is there,
+    and the time the bucket is full again once it's taken.
+    """
+    interval = 1 / rate
+    full_at = max(full_at, now) + interval
+    return max(full_at - now - burst * interval, 0), full_at
+
+
+class RateLimiter:
+    """
+    Enforces the rate limits of blueprints and hosts. The
+    buckets are kept in this process, or in the cache named
+    by SMITHY_RATE_LIMIT_CACHE, where a short lived lock
+    key guards every update.
+    """
+    KEY = 'smithy:ratelimit:{}'
+    # Seconds a process may hold the lock of a bucket
+    # kept in the cache
+    LOCK_TIMEOUT = 1
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = Lock()
+
+    @property
+    def backend(self):
+        alias = get_setting('RATE_LIMIT_CACHE')
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def get_limits(plan, host : str) -> list:
+        """
+        The buckets a send has to take a token from, as
+        (key, rate, burst) tuples.
+        """
+        limits = []
+        if plan.rate_limit:
+            limits.append((
+                'blueprint:{}'.format(plan.blueprint_id), plan.rate_limit, plan.rate_limit_burst or 1))
+        limit = get_setting('HOST_RATE_LIMITS').get(host)
+        if limit:
+            rate, burst = limit if isinstance(limit, (tuple, list)) else (limit, 1)
+            limits.append(('host:{}'.format(host), rate, burst))
+        return limits
+
+    def reserve(self, key : str, rate : float, burst : int, max_wait : float = None) -> float:
+        """
+        Take a token from the bucket ``key`` and return the
+        seconds to wait before it may be used.
+        """
+        return self.get_wait([(key, rate, burst)], max_wait)
+
+    @staticmethod
+    def take_all(buckets : dict, limits : list, now : float, max_wait : float = None) -> tuple:
+        """
+        Take a token from every bucket in ``limits``, given
+        the time each is full at in ``buckets``. Returns the
+        seconds to wait until all are there, and the times
+        the buckets are full at once they're taken. If one
+        would make that longer than ``max_wait``, RateLimited
+        is raised instead.
+        """
+        wait, taken = 0, {}
+        for key, rate, burst in limits:
+            bucket_wait, taken[key] = take(buckets.get(key, 0), now, rate, burst)
+            if max_wait is not None and bucket_wait > max_wait:
+                raise RateLimited(key, bucket_wait)
+            wait = max(wait, bucket_wait)
+        return wait, taken
+
+    def get_wait(self, limits : list, max_wait : float = None) -> float:
+        """
+        Take a token from every bucket in ``limits`` and
+        return the seconds to wait until all are there. If
+        that is longer than ``max_wait``, no token is taken
+        from any of them and RateLimited is raised instead.
+        """
+        if not limits:
+            return 0
+        backend = self.backend
+        if backend is not None:
+            return self.get_wait_shared(backend, limits, max_wait)
+
+        with self._lock:
+            wait, taken = self.take_all(self._buckets, limits, time.time(), max_wait)
+            self._buckets.update(taken)
+        return wait
+
+    def lock(self, backend, lock_key : str) -> bool:
+        deadline = time.monotonic() + self.LOCK_TIMEOUT
+        # If the lock can't be had, the process holding it
+        # probably died, and its lock is about to expire
+        locked = backend.add(lock_key, 1, self.LOCK_TIMEOUT)
+        while not locked and time.monotonic() < deadline:
+            time.sleep(0.001)
+            locked = backend.add(lock_key, 1, self.LOCK_TIMEOUT)
+        return locked
+
+    def get_wait_shared(self, backend, limits : list, max_wait : float = None) -> float:
+        cache_keys = {key: self.KEY.format(key) for key, _, _ in limits}
+        locks = []
+        try:
+            # Every process locks the buckets in the same
+            # order, so that none waits for another's
+            for cache_key in sorted(cache_keys.values()):
+                if self.lock(backend, cache_key + ':lock'):
+                    locks.append(cache_key + ':lock')
+            now = time.time()
+            stored = backend.get_many(list(cache_keys.values()))
+            buckets = {key: stored.get(cache_key, 0) for key, cache_key in cache_keys.items()}
+            wait, taken = self.take_all(buckets, limits, now, max_wait)
+            for key, full_at in taken.items():
+                backend.set(cache_keys[key], full_at, math.ceil(full_at - now) + 1)
+        finally:
+            if locks:
+                backend.delete_many(locks)
+        return wait
+
+    def acquire(self, limits : list, max_wait : float = None):
+        wait = self.get_wait(limits, max_wait)
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self, limits : list, max_wait : float = None):
+        if self.backend is None:
+            wait = self.get_wait(limits, max_wait)
+        else:
+            # Keep the cache's I/O and lock polling off the
+            # event loop
+            from asgiref.sync import sync_to_async
+            wait = await sync_to_async(self.get_wait)(limits, max_wait)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def reset(self):
+        self._buckets = {}
+        self._lock = Lock()
+
+
+rate_limiter = RateLimiter()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child = rate_limiter.reset)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Redirects are followed by smithy rather than by the HTTP
+clients, so that every hop goes through the pooled
+connections and is timed. The record of a redirected
+send describes the last response, and keeps each hop
+before it as a compact entry in RequestRecord.redirects.
+"""
+from time import perf_counter_ns
+from urllib.parse import urljoin, urlsplit
+
+from requests import PreparedRequest
+from requests.cookies import extract_cookies_to_jar
+from requests.sessions import SessionRedirectMixin
+from requests.structures import CaseInsensitiveDict
+from requests.utils import requote_uri
+
+from smithy.conf import get_setting
+
+
+_mixin = SessionRedirectMixin()
+
+
+class Hops(list):
+    """
+    The hops of a redirect chain, each a dict with the
+    method and URL requested, the redirect status and the
+    milliseconds spent on it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.started = perf_counter_ns()
+
+    def add(self, method : str, url : str, status : int):
+        now = perf_counter_ns()
+        self.append({
+            'method': method,
+            'url': url,
+            'status': status,
+            'ms': round((now - self.started) / 1e6, 3),
+        })
+        self.started = now
+
+    @property
+    def exceeded(self) -> bool:
+        return len(self) >= get_setting('MAX_REDIRECTS')
+
+    def get_error(self) -> str:
+        return "Stopped after {} redirects".format(len(self))
+
+
+def get_redirect(response, request : PreparedRequest):
+    """
+    The request to send to follow a requests response,
+    or None if it isn't a redirect. Methods, bodies and
+    credentials change the way requests changes them.
+    """
+    url = _mixin.get_redirect_target(response)
+    if not url:
+        return None
+
+    if url.startswith('//'):
+        url = '{}:{}'.format(urlsplit(response.url).scheme, url)
+    if urlsplit(url).netloc:
+        url = requote_uri(url)
+    else:
+        url = urljoin(response.url, requote_uri(url))
+
+    next_request = request.copy()
+    next_request.url = url
+    return rebuild(next_request, request, response)
+
+
+def rebuild(next_request : PreparedRequest, request : PreparedRequest, response):
+    _mixin.rebuild_method(next_request, response)
+    if response.status_code not in (307, 308):
+        for name in ('Content-Length', 'Content-Type', 'Transfer-Encoding'):
+            next_request.headers.pop(name, None)
+        next_request.body = None
+
+    if _mixin.should_strip_auth(request.url, next_request.url):
+        next_request.headers.pop('Authorization', None)
+
+    next_request.headers.pop('Cookie', None)
+    extract_cookies_to_jar(next_request._cookies, request, response.raw)
+    next_request.prepare_cookies(next_request._cookies)
+    return next_request
+
+
+def drain(response):
+    """
+    Read what is left of a redirect response, so its
+    connection can be reused, then release it. Bodies
+    larger than SMITHY_RESPONSE_BODY_LIMIT are not worth
+    reading, and their connection is closed instead.
+    """
+    limit = get_setting('RESPONSE_BODY_LIMIT')
+    size = 0
+    try:
+        for chunk in response.iter_content(get_setting('RESPONSE_CHUNK_SIZE')):
+            size += len(chunk)
+            if size > limit:
+                break
+    finally:
+        response.close()
+
+
+async def adrain(response):
+    limit = get_setting('RESPONSE_BODY_LIMIT')
+    size = 0
+    try:
+        async for chunk in response.aiter_raw(get_setting('RESPONSE_CHUNK_SIZE')):
+            size += len(chunk)
+            if size > limit:
+                break
+    finally:
+        await response.aclose()
+
+
+def to_prepared(request) -> PreparedRequest:
+    """
+    A requests PreparedRequest with the method, URL,
+    headers and body of an httpx request, so it can be
+    dumped like every other request.
+    """
+    prepared = PreparedRequest()
+    prepared.method = request.method
+    prepared.url = str(request.url)
+    prepared.headers = CaseInsensitiveDict(request.headers.multi_items())
+    prepared.body = request.content or None
+    return prepared
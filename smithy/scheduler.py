@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Sends scheduled blueprints. Every scheduler process keeps
+the enabled schedules in a heap ordered by their next
+run, sleeps until the first one is due, and claims it with
+a compare-and-swap on its next_run_at. Only the process
+whose update matched the run it saw sends it, so several
+schedulers can run side by side without sending twice.
+"""
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from smithy.models import Schedule
+
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+
+    def __init__(self, concurrency : int = 4, refresh_interval : float = 30):
+        self.refresh_interval = refresh_interval
+        self.executor = ThreadPoolExecutor(concurrency, thread_name_prefix = 'smithy-scheduler')
+        self.stopped = threading.Event()
+        self.schedules = {}
+        self.heap = []
+
+    def load(self):
+        """
+        Read every enabled schedule, to pick up schedules
+        that were added, changed or claimed elsewhere.
+        """
+        self.schedules = dict(
+            (schedule.pk, schedule)
+            for schedule in Schedule.objects
+            .filter(enabled = True, next_run_at__isnull = False)
+            .select_related('blueprint'))
+        self.heap = [
+            (schedule.next_run_at.timestamp(), pk)
+            for pk, schedule in self.schedules.items()]
+        heapq.heapify(self.heap)
+
+    def push(self, schedule : Schedule):
+        self.schedules[schedule.pk] = schedule
+        heapq.heappush(self.heap, (schedule.next_run_at.timestamp(), schedule.pk))
+
+    def claim(self, schedule : Schedule) -> bool:
+        """
+        Move a due schedule to its next run, unless another
+        scheduler already did. Returns whether this process
+        owns the run.
+        """
+        due = schedule.next_run_at
+        next_run_at = schedule.get_next_run(max(due, timezone.now()))
+        claimed = Schedule.objects.filter(
+            pk = schedule.pk, enabled = True, next_run_at = due,
+        ).update(next_run_at = next_run_at, last_run_at = due)
+
+        if claimed:
+            schedule.last_run_at = due
+            schedule.next_run_at = next_run_at
+            self.push(schedule)
+            return True
+
+        # Claimed elsewhere, changed or deleted
+        schedule = Schedule.objects.filter(
+            pk = schedule.pk, enabled = True, next_run_at__isnull = False,
+        ).select_related('blueprint').first()
+        if schedule is not None:
+            self.push(schedule)
+        return False
+
+    def fire(self, schedule : Schedule):
+        close_old_connections()
+        try:
+            schedule.blueprint.send(schedule.get_context())
+        except Exception:
+            logger.exception("Could not send scheduled %s", schedule)
+        finally:
+            close_old_connections()
+
+    def run_due(self, now : float) -> int:
+        """
+        Claim and dispatch every schedule due at ``now``,
+        a timestamp. Returns the number of runs dispatched.
+        """
+        fired = 0
+        while self.heap and self.heap[0][0] <= now:
+            timestamp, pk = heapq.heappop(self.heap)
+            schedule = self.schedules.get(pk)
+            # Skip entries left behind by a later push
+            if schedule is None or schedule.next_run_at.timestamp() != timestamp:
+                continue
+            try:
+                claimed = self.claim(schedule)
+            except Exception:
+                # Left out until the next load, so that one
+                # broken schedule doesn't stop the others
+                logger.exception("Could not claim scheduled %s", schedule)
+                continue
+            if claimed:
+                self.executor.submit(self.fire, schedule)
+                fired += 1
+        return fired
+
+    def run(self, once : bool = False):
+        """
+        Send schedules as they fall due until stopped, or
+        with ``once`` only those that are due now.
+        """
+        try:
+            refresh_at = 0
+            while not self.stopped.is_set():
+                now = timezone.now().timestamp()
+                if now >= refresh_at:
+                    self.load()
+                    refresh_at = now + self.refresh_interval
+                self.run_due(now)
+                if once:
+                    return
+
+                wake_at = min(self.heap[0][0], refresh_at) if self.heap else refresh_at
+                self.stopped.wait(max(wake_at - timezone.now().timestamp(), 0))
+        finally:
+            self.executor.shutdown(wait = True)
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+A process-wide pool of HTTP sessions. Sessions are
+keyed by scheme and host so that repeated requests to
+the same host reuse warm connections instead of paying
+for a new TCP and TLS handshake on every send.
+"""
+import asyncio
+import atexit
+import os
+import time
+import weakref
+from collections import OrderedDict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from threading import Lock
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from smithy import timing
+from smithy.conf import get_setting
+
+
+class NoCookiesPolicy(DefaultCookiePolicy):
+    """
+    Pooled sessions are shared by every blueprint that
+    targets the same host, so they must never remember
+    cookies set by a response.
+    """
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+class TimedHTTPConnection(HTTPConnection):
+
+    def connect(self):
+        with timing.measure('connect'):
+            super().connect()
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+
+    def connect(self):
+        with timing.measure('connect'):
+            super().connect()
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    Adds the time spent opening connections, including
+    the TLS handshake, to the active timer.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+class SessionPool:
+
+    def __init__(self):
+        self._sessions = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def get_key(url : str):
+        parts = urlsplit(url)
+        return parts.scheme.lower(), parts.netloc.lower()
+
+    @staticmethod
+    def create_session() -> Session:
+        session = Session()
+        session.cookies.set_policy(NoCookiesPolicy())
+        adapter = TimedHTTPAdapter(
+            pool_connections = 1,
+            pool_maxsize = get_setting('POOL_CONNECTIONS_PER_HOST'),
+            pool_block = get_setting('POOL_BLOCK'))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def get(self, url : str) -> Session:
+        key = self.get_key(url)
+        now = time.monotonic()
+        expired = []
+
+        with self._lock:
+            max_idle = get_setting('POOL_MAX_IDLE')
+            for other, (_, last_used) in list(self._sessions.items()):
+                if max_idle is not None and now - last_used > max_idle:
+                    expired.append(self._sessions.pop(other)[0])
+
+            if key in self._sessions:
+                session = self._sessions.pop(key)[0]
+            else:
+                session = self.create_session()
+            self._sessions[key] = (session, now)
+
+            while len(self._sessions) > max(get_setting('POOL_SIZE'), 1):
+                expired.append(self._sessions.popitem(last = False)[1][0])
+
+        for idle in expired:
+            idle.close()
+        return session
+
+    def send(self, prepared_request, **kwargs):
+        if not get_setting('KEEP_ALIVE'):
+            prepared_request.headers['Connection'] = 'close'
+        session = self.get(prepared_request.url)
+        return session.send(prepared_request, **kwargs)
+
+    def close(self):
+        with self._lock:
+            sessions = [session for session, _ in self._sessions.values()]
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def reset(self):
+        """
+        Forget every session without closing it. Used in
+        forked children, whose sockets belong to the parent.
+        """
+        self._lock = Lock()
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class AsyncClientPool:
+    """
+    One httpx.AsyncClient, with its own connection pool,
+    per running event loop. Requires httpx to be installed.
+    Call ``aclose`` when the loop shuts down, for example
+    from an ASGI lifespan shutdown handler.
+    """
+
+    def __init__(self):
+        self._clients = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def create_client():
+        try:
+            import httpx
+        except ImportError:
+            raise ImproperlyConfigured(
+                "httpx must be installed to send requests asynchronously")
+
+        max_idle = get_setting('POOL_MAX_IDLE')
+        max_connections = get_setting('ASYNC_MAX_CONNECTIONS')
+        return httpx.AsyncClient(
+            cookies = CookieJar(NoCookiesPolicy()),
+            follow_redirects = False,
+            timeout = None,
+            limits = httpx.Limits(
+                max_connections = max_connections,
+                max_keepalive_connections = max_connections,
+                keepalive_expiry = max_idle))
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = self.create_client()
+        return client
+
+    @staticmethod
+    def get_trace(timer):
+        """
+        An httpx trace callback adding the time spent
+        opening connections to ``timer``.
+        """
+        started = {}
+
+        async def trace(event_name, info):
+            prefix, _, step = event_name.rpartition('.')
+            if prefix in ('connection.connect_tcp', 'connection.start_tls'):
+                if step == 'started':
+                    started[prefix] = time.perf_counter_ns()
+                elif step in ('complete', 'failed') and prefix in started:
+                    timer.add('connect', time.perf_counter_ns() - started.pop(prefix))
+
+        return trace
+
+    async def send(self, prepared_request, timer = None, timeout = (None, None)):
+        """
+        Send a requests PreparedRequest. The response is
+        streamed, and must be closed once it has been read.
+        ``timeout`` is a (connect, read) tuple in seconds.
+        """
+        import httpx
+
+        client = self.get()
+        headers = dict(prepared_request.headers)
+        if not get_setting('KEEP_ALIVE'):
+            headers['Connection'] = 'close'
+
+        request = client.build_request(
+            prepared_request.method,
+            prepared_request.url,
+            headers = headers,
+            content = prepared_request.body,
+            timeout = httpx.Timeout(timeout[1], connect = timeout[0]),
+            extensions = {'trace': self.get_trace(timer)} if timer is not None else None)
+
+        return await self.send_request(request)
+
+    async def send_request(self, request):
+        """
+        Send an httpx request, such as the next request of
+        a redirect, which keeps the timeout and trace of
+        the request it follows.
+        """
+        return await self.get().send(request, stream = True)
+
+    async def aclose(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+session_pool = SessionPool()
+async_client_pool = AsyncClientPool()
+
+atexit.register(session_pool.close)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child = session_pool.reset)
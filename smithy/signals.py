@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Signals sent around every RequestBlueprint send, from
+both ``send`` and ``asend``. The sender is the blueprint's
+class. Building their arguments is skipped entirely when
+nothing is connected, so unused signals cost nothing.
+
+``pre_send(blueprint, request, context)``
+    Sent once the request is rendered, right before it goes
+    out. ``request`` is the requests PreparedRequest, whose
+    headers may still be changed, for example to add trace
+    context.
+
+``post_send(blueprint, request, record, status, duration,
+request_bytes, response_bytes)``
+    Sent once the response has been read and recorded.
+    ``duration`` is in milliseconds, see smithy.timing.
+    ``record`` is None for sends that aren't recorded.
+
+``send_failed(blueprint, request, exception, duration)``
+    Sent when the request could not be rendered, sent or
+    recorded. ``request`` is None if rendering failed.
+"""
+from django.dispatch import Signal
+
+
+pre_send = Signal()
+post_send = Signal()
+send_failed = Signal()
+
+
+def get_size(body) -> int:
+    """
+    The number of bytes of a request body.
+    """
+    if not body:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    return len(body)
+
+
+def started(blueprint, rendered):
+    if pre_send.receivers:
+        pre_send.send(
+            sender = type(blueprint),
+            blueprint = blueprint,
+            request = rendered.request,
+            context = rendered.context)
+
+
+def finished(blueprint, rendered, record, values = None):
+    """
+    ``values`` are the values of the record, for sends
+    that aren't recorded.
+    """
+    if post_send.receivers:
+        if record is not None:
+            values = dict(
+                status = record.status,
+                duration = record.duration,
+                response_size = record.response_size)
+        post_send.send(
+            sender = type(blueprint),
+            blueprint = blueprint,
+            request = rendered.request,
+            record = record,
+            status = values['status'],
+            duration = values['duration'],
+            request_bytes = get_size(rendered.request.body),
+            response_bytes = values.get('response_size'))
+
+
+def failed(blueprint, rendered, exception, timer):
+    if send_failed.receivers:
+        send_failed.send(
+            sender = type(blueprint),
+            blueprint = blueprint,
+            request = rendered.request if rendered is not None else None,
+            exception = exception,
+            duration = timer.duration)
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+
+
+class PercentileCont(models.Aggregate):
+    """
+    PostgreSQL's continuous percentile, interpolating
+    between the two nearest values.
+    """
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = models.FloatField()
+
+    def __init__(self, expression, fraction : float, **extra):
+        super().__init__(expression, fraction = float(fraction), **extra)
+
+
+def percentile(values : list, fraction : float) -> float:
+    """
+    The same percentile as PercentileCont, of a
+    sorted list of values.
+    """
+    if not values:
+        return None
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Per-send timing breakdown. A Timer is active on the
+thread sending a request, so that code deep in the
+send path, such as opening a pooled connection, can
+add to it without being handed the timer.
+"""
+import json
+import threading
+from contextlib import contextmanager
+from time import perf_counter_ns
+
+
+PHASES = ('db', 'render', 'connect', 'ttfb', 'download', 'db_write')
+
+_local = threading.local()
+
+
+class Timer:
+    """
+    Adds up the nanoseconds spent in each phase of a send.
+    Time spent in a phase measured inside another phase
+    only counts toward the inner one, so phases add up
+    to the duration of the send.
+    """
+    __slots__ = ('phases', '_nested')
+
+    def __init__(self):
+        self.phases = {}
+        self._nested = []
+
+    @contextmanager
+    def measure(self, phase : str):
+        started = perf_counter_ns()
+        self._nested.append(0)
+        try:
+            yield
+        finally:
+            elapsed = perf_counter_ns() - started
+            nested = self._nested.pop()
+            self.phases[phase] = self.phases.get(phase, 0) + elapsed - nested
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def add(self, phase : str, elapsed : int):
+        """
+        Add time measured elsewhere, for example by
+        an HTTP client's trace events.
+        """
+        self.phases[phase] = self.phases.get(phase, 0) + elapsed
+        if self._nested:
+            self._nested[-1] += elapsed
+
+    def as_dict(self) -> dict:
+        """
+        Milliseconds spent in each phase.
+        """
+        return dict(
+            (phase, round(self.phases[phase] / 1e6, 3))
+            for phase in PHASES if phase in self.phases)
+
+    @property
+    def duration(self) -> float:
+        return round(sum(self.phases.values()) / 1e6, 3)
+
+    def get_record_values(self) -> dict:
+        return dict(timings = json.dumps(self.as_dict()), duration = self.duration)
+
+
+def current():
+    return getattr(_local, 'timer', None)
+
+
+@contextmanager
+def activate(timer : Timer):
+    previous = current()
+    _local.timer = timer
+    try:
+        yield timer
+    finally:
+        _local.timer = previous
+
+
+@contextmanager
+def measure(phase : str):
+    """
+    Measure a phase with the active timer, if any.
+    """
+    timer = current()
+    if timer is None:
+        yield
+    else:
+        with timer.measure(phase):
+            yield
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Sends queued RequestRecords, using the database as the
+broker. Records are claimed with SELECT ... FOR UPDATE
+SKIP LOCKED so several workers can run side by side, and
+failed sends are retried with exponential backoff.
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from smithy.conf import get_setting
+from smithy.dispatch import map_concurrent
+from smithy.models import RequestRecord
+from smithy.ratelimits import RateLimited
+
+
+def get_backoff(attempts : int) -> float:
+    """
+    Seconds to wait before the next attempt: exponential
+    in the number of attempts so far, capped, with half
+    of it randomized so retries don't arrive in lockstep.
+    """
+    delay = min(
+        get_setting('WORKER_BACKOFF_MAX'),
+        get_setting('WORKER_BACKOFF_BASE') * 2 ** max(attempts - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim(batch_size : int) -> list:
+    """
+    Claim up to ``batch_size`` records that are due. A
+    claimed record is leased for SMITHY_WORKER_LEASE
+    seconds, after which another worker may claim it
+    again if it was never finished.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pks = list(
+            RequestRecord.objects
+            .select_for_update(skip_locked = True)
+            .filter(
+                state__in = [RequestRecord.PENDING, RequestRecord.SENDING],
+                next_attempt_at__lte = now)
+            .order_by('next_attempt_at')
+            .values_list('pk', flat = True)[:batch_size])
+
+        RequestRecord.objects.filter(pk__in = pks).update(
+            state = RequestRecord.SENDING,
+            attempts = F('attempts') + 1,
+            next_attempt_at = now + timedelta(seconds = get_setting('WORKER_LEASE')))
+
+    return list(
+        RequestRecord.objects
+        .filter(pk__in = pks)
+        .select_related('blueprint')
+        .order_by('pk'))
+
+
+def retry_or_fail(record : RequestRecord, error : str):
+    if record.attempts >= get_setting('WORKER_MAX_ATTEMPTS'):
+        record.state = RequestRecord.FAILED
+        record.next_attempt_at = None
+    else:
+        record.state = RequestRecord.PENDING
+        record.next_attempt_at = timezone.now() + timedelta(
+            seconds = get_backoff(record.attempts))
+    record.error = error
+    record.save(update_fields = ['state', 'next_attempt_at', 'error'])
+
+
+def defer(record : RequestRecord, delay : float):
+    """
+    Put a record that wasn't sent because of a rate limit
+    back in the queue, without counting it as an attempt.
+    """
+    record.state = RequestRecord.PENDING
+    record.attempts -= 1
+    record.next_attempt_at = timezone.now() + timedelta(seconds = delay)
+    record.save(update_fields = ['state', 'attempts', 'next_attempt_at'])
+
+
+def process(record : RequestRecord) -> RequestRecord:
+    if record.blueprint is None:
+        record.state = RequestRecord.FAILED
+        record.next_attempt_at = None
+        record.error = "The blueprint of this request was deleted"
+        record.save(update_fields = ['state', 'next_attempt_at', 'error'])
+        return record
+
+    try:
+        record = record.blueprint.send(
+            record.get_context(), record = record,
+            max_wait = get_setting('WORKER_RATE_LIMIT_WAIT'))
+    except RateLimited as e:
+        defer(record, e.retry_after)
+        return record
+    except Exception as e:
+        retry_or_fail(record, repr(e))
+        return record
+
+    if record.state == RequestRecord.FAILED:
+        # Not sent, because the circuit breaker is open
+        retry_or_fail(record, record.error)
+    elif record.status in get_setting('WORKER_RETRY_STATUSES'):
+        retry_or_fail(record, "Received HTTP {}".format(record.status))
+    return record
+
+
+def work(batch_size : int = 10, concurrency : int = 1) -> int:
+    """
+    Claim and send one batch. Returns the number of
+    records processed.
+    """
+    records = claim(batch_size)
+    map_concurrent(process, records, concurrency)
+    return len(records)
+
+
+def run(batch_size : int = 10, concurrency : int = 1, poll_interval : float = 1, once : bool = False):
+    """
+    Send queued records until interrupted, or with
+    ``once`` until no record is due.
+    """
+    while True:
+        if not work(batch_size, concurrency):
+            if once:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,113 @@
+"""
+A tiny in-process HTTP server that echoes requests
+back as JSON, so tests never depend on the network.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, which
+    # Nagle's algorithm delays on kept-alive connections
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_any(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8')
+        parts = urlsplit(self.path)
+        self.server.connections.add(self.client_address)
+        self.server.requests.append(self.path)
+
+        if parts.path.startswith('/bytes/'):
+            return self.send_bytes(int(parts.path.split('/')[2]))
+        if parts.path.startswith('/redirect/'):
+            return self.send_redirect(int(parts.path.split('/')[2]))
+        if parts.path.startswith('/delay/'):
+            time.sleep(float(parts.path.split('/')[2]))
+
+        payload = json.dumps({
+            'method': self.command,
+            'path': parts.path,
+            'args': parse_qsl(parts.query, keep_blank_values = True),
+            'headers': dict(self.headers.items()),
+            'body': body,
+        }).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def send_redirect(self, hops):
+        self.send_response(302)
+        self.send_header('Location', '/redirect/{}'.format(hops - 1) if hops > 1 else '/get')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_bytes(self, size):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(size))
+        self.end_headers()
+        chunk = b'x' * 8192
+        while size > 0:
+            self.wfile.write(chunk[:size])
+            size -= len(chunk)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_OPTIONS = do_HEAD = handle_any
+
+
+class EchoServer:
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), EchoHandler)
+        self.server.daemon_threads = True
+        self.server.connections = set()
+        self.server.requests = []
+        self.thread = threading.Thread(target = self.server.serve_forever, daemon = True)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+    @property
+    def connections(self):
+        return self.server.connections
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class EchoServerMixin:
+    """
+    Runs an EchoServer, as ``server``, while the tests of
+    a test case class run.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = EchoServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
@@ -19,18 +19,27 @@ DATABASES = {
 ROOT_URLCONF = "tests.urls"
 
 INSTALLED_APPS = [
+    "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
+    "django.contrib.messages",
+    "django.contrib.sessions",
     "django.contrib.sites",
     "smithy",
 ]
 
 SITE_ID = 1
 
+_MIDDLEWARE = (
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+)
+
 if django.VERSION >= (1, 10):
-    MIDDLEWARE = ()
+    MIDDLEWARE = _MIDDLEWARE
 else:
-    MIDDLEWARE_CLASSES = ()
+    MIDDLEWARE_CLASSES = _MIDDLEWARE
 
 TEMPLATES = [
     {
@@ -0,0 +1,156 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from smithy.models import RequestBlueprint, RequestRecord, Header, Cookie
+from smithy.paginators import EstimatedCountPaginator
+
+
+class RequestRecordAdminTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.user)
+        self.blueprint = RequestBlueprint.objects.create(
+            name = 'hook', method = 'GET', url = 'http://localhost/')
+        for status in (200, 404, None):
+            RequestRecord.objects.create(
+                blueprint = self.blueprint, name = 'record {}'.format(status),
+                method = 'GET', url = 'http://localhost/', status = status,
+                raw_request = 'request', raw_response = 'response')
+
+    def test_changelist_does_not_load_payloads(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:smithy_requestrecord_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'record 404')
+        selects = [q['sql'] for q in queries if 'smithy_requestrecord' in q['sql']]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertNotIn('raw_response', sql)
+            self.assertNotIn('response_payload', sql)
+
+    def test_changelist_loads_blueprints_with_records(self):
+        def get_changelist():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('admin:smithy_requestrecord_changelist'))
+            self.assertEqual(response.status_code, 200)
+            return queries
+
+        queries = len(get_changelist())
+        for n in range(10):
+            blueprint = RequestBlueprint.objects.create(
+                name = 'hook {}'.format(n), method = 'GET', url = 'http://localhost/')
+            RequestRecord.objects.create(blueprint = blueprint, method = 'GET', url = 'http://localhost/')
+        with self.assertNumQueries(queries):
+            self.client.get(reverse('admin:smithy_requestrecord_changelist'))
+        selects = [
+            q['sql'] for q in get_changelist().captured_queries
+            if '"smithy_requestrecord"."blueprint_id" =' in q['sql']]
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn('."body"', selects[0])
+
+    def test_status_filter(self):
+        response = self.client.get(
+            reverse('admin:smithy_requestrecord_changelist'), {'status': '4'})
+        self.assertContains(response, 'record 404')
+        self.assertNotContains(response, 'record 200')
+
+        response = self.client.get(
+            reverse('admin:smithy_requestrecord_changelist'), {'status': 'none'})
+        self.assertContains(response, 'record None')
+        self.assertNotContains(response, 'record 404')
+
+    def test_paginator_counts_small_tables_exactly(self):
+        paginator = EstimatedCountPaginator(RequestRecord.objects.order_by('pk'), 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+
+    def test_change_view(self):
+        record = RequestRecord.objects.get(status = 200)
+        record.timings = '{"ttfb": 12.5, "download": 0.25}'
+        record.save()
+        response = self.client.get(
+            reverse('admin:smithy_requestrecord_change', args = [record.pk]))
+        self.assertContains(response, 'response')
+        self.assertContains(response, '<td>ttfb</td><td>12.5 ms</td>', html = True)
+
+    def test_change_view_uses_constant_number_of_queries(self):
+        def count_queries(rows):
+            record = RequestRecord.objects.create(
+                blueprint = self.blueprint, method = 'GET', url = 'http://localhost/')
+            for n in range(rows):
+                Header.objects.create(name = 'X-Header-{}'.format(n), value = 'v', request = record)
+                Cookie.objects.create(name = 'cookie-{}'.format(n), value = 'v', request = record)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    reverse('admin:smithy_requestrecord_change', args = [record.pk]))
+            self.assertContains(response, 'X-Header-{}'.format(rows - 1))
+            self.assertContains(response, 'cookie-{}'.format(rows - 1))
+            return len(queries)
+
+        self.assertEqual(count_queries(1), count_queries(20))
+
+
+class RequestBlueprintAdminTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.user)
+        self.blueprint = RequestBlueprint.objects.create(
+            name = 'hook', method = 'POST', url = 'http://localhost/{{ path|default:"hooks" }}',
+            body = 'hello', content_type = 'text/plain')
+        Header.objects.create(name = 'X-Token', value = 'abc', request = self.blueprint)
+
+    def test_preview_action(self):
+        response = self.client.post(reverse('admin:smithy_requestblueprint_changelist'), {
+            'action': 'preview',
+            '_selected_action': [self.blueprint.pk],
+        })
+        self.assertContains(response, 'POST /hooks HTTP/1.1')
+        self.assertContains(response, 'X-Token: abc')
+        self.assertContains(response, 'hello')
+        self.assertEqual(RequestRecord.objects.count(), 0)
+
+    def get_add_data(self, **fields):
+        data = dict({
+            'name': 'new', 'method': 'GET', 'url': 'http://localhost/',
+            'content_type': '', 'body': '', 'template_engine': 'django',
+        }, **fields)
+        for prefix in ('body_parameters', 'headers', 'query_parameters', 'cookies', 'variables', 'schedules'):
+            data.update({
+                prefix + '-TOTAL_FORMS': '0', prefix + '-INITIAL_FORMS': '0',
+                prefix + '-MIN_NUM_FORMS': '0', prefix + '-MAX_NUM_FORMS': '1000',
+            })
+        return data
+
+    def test_invalid_templates_are_rejected(self):
+        add_url = reverse('admin:smithy_requestblueprint_add')
+        data = self.get_add_data(url = 'http://localhost/{% if %}')
+        data.update({'headers-TOTAL_FORMS': '1', 'headers-0-name': 'X-Id', 'headers-0-value': '{{ id|nope }}'})
+
+        response = self.client.post(add_url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Invalid template')
+        self.assertContains(response, 'Invalid filter')
+        self.assertFalse(RequestBlueprint.objects.filter(name = 'new').exists())
+
+        data.update({'url': 'http://localhost/{{ id }}', 'headers-0-value': '{{ id|upper }}'})
+        response = self.client.post(add_url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(RequestBlueprint.objects.filter(name = 'new').exists())
+
+    def test_rows_bump_modified_once(self):
+        data = self.get_add_data()
+        data['headers-TOTAL_FORMS'] = '3'
+        for n in range(3):
+            data.update({'headers-{}-name'.format(n): 'X-{}'.format(n), 'headers-{}-value'.format(n): 'v'})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('admin:smithy_requestblueprint_add'), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(RequestBlueprint.objects.get(name = 'new').headers.count(), 3)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "smithy_request"')]
+        self.assertEqual(len(updates), 1)
@@ -0,0 +1,56 @@
+import json
+from unittest import skipIf
+
+from django.test import TestCase
+
+from smithy.models import RequestBlueprint
+from smithy.sessions import async_client_pool
+
+from tests.echo import EchoServerMixin
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+@skipIf(httpx is None, "httpx is not installed")
+class AsyncSendTestCase(EchoServerMixin, TestCase):
+
+    def setUp(self):
+        self.blueprint = RequestBlueprint.objects.create(
+            method = 'POST',
+            url = self.server.url + '/{{ path }}',
+            body = '{"name": "{{ name }}"}',
+            content_type = '')
+
+    async def test_asend_creates_record(self):
+        record = await self.blueprint.asend({'path': 'hook', 'name': 'smithy'})
+        await async_client_pool.aclose()
+
+        self.assertEqual(record.status, 200)
+        self.assertEqual(record.url, self.server.url + '/hook')
+        echoed = json.loads(record.raw_response.split('\r\n\r\n', 1)[1])
+        self.assertEqual(echoed['path'], '/hook')
+        self.assertEqual(echoed['body'], '{"name": "smithy"}')
+        self.assertTrue(record.raw_request.startswith('POST /hook HTTP/1.1'))
+
+    async def test_asend_records_timings(self):
+        record = await self.blueprint.asend({'path': 'timed', 'name': 'smithy'})
+        await async_client_pool.aclose()
+
+        timings = record.get_timings()
+        self.assertGreater(timings['connect'], 0)
+        self.assertEqual(set(timings) - {'db'}, {'render', 'connect', 'ttfb', 'download', 'db_write'})
+        self.assertAlmostEqual(record.duration, sum(timings.values()), places = 2)
+
+    async def test_asend_many_returns_records_in_order(self):
+        results = await RequestBlueprint.objects.asend_many(
+            RequestBlueprint.objects.filter(pk = self.blueprint.pk),
+            contexts = [{'path': 'one', 'name': 'a'}],
+            concurrency = 2)
+        await async_client_pool.aclose()
+
+        self.assertEqual(len(results.sent), 1)
+        self.assertEqual(results.errors, [])
+        self.assertEqual(results[0].url, self.server.url + '/one')
@@ -0,0 +1,127 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+
+from smithy.contexts import read_contexts
+from smithy.models import Header, Request, RequestBlueprint, RequestRecord
+from smithy.signals import post_send
+
+from tests.echo import EchoServerMixin
+
+
+class ReadContextsTestCase(TestCase):
+
+    def test_csv(self):
+        contexts = read_contexts(StringIO("id,name\n1,a\n2,b\n"), 'csv')
+        self.assertEqual(list(contexts), [{'id': '1', 'name': 'a'}, {'id': '2', 'name': 'b'}])
+
+    def test_jsonl(self):
+        contexts = read_contexts(StringIO('{"id": 1}\n\n{"id": 2}\n'), 'jsonl')
+        self.assertEqual(list(contexts), [{'id': 1}, {'id': 2}])
+
+    def test_invalid_jsonl(self):
+        with self.assertRaisesMessage(ValueError, "Line 2: expected a JSON object"):
+            list(read_contexts(StringIO('{"id": 1}\n[1]\n'), 'jsonl'))
+
+
+class SendBatchTestCase(EchoServerMixin, TestCase):
+
+    def setUp(self):
+        self.blueprint = RequestBlueprint.objects.create(
+            method = 'GET', url = '{{ base }}/{{ id }}')
+        self.blueprint.headers.create(name = 'X-Id', value = '{{ id }}')
+
+    def get_contexts(self, count):
+        for n in range(count):
+            yield {'base': self.server.url, 'id': n}
+
+    def test_send_batch(self):
+        finished = []
+
+        def receiver(sender, record, **kwargs):
+            finished.append(record.pk)
+        post_send.connect(receiver)
+        self.addCleanup(post_send.disconnect, receiver)
+
+        results = self.blueprint.send_batch(self.get_contexts(25), concurrency = 4, chunk_size = 10)
+
+        self.assertEqual(results.sent, 25)
+        self.assertEqual(results.errors, [])
+        records = RequestRecord.objects.filter(blueprint = self.blueprint).order_by('pk')
+        self.assertEqual(sorted(finished), [record.pk for record in records])
+        self.assertEqual(
+            sorted(record.url for record in records),
+            sorted('{}/{}'.format(self.server.url, n) for n in range(25)))
+        self.assertTrue(all(record.status == 200 for record in records))
+        self.assertEqual(Header.objects.filter(request__in = records).count(), 25)
+        record = records.get(url = self.server.url + '/7')
+        self.assertEqual(record.get_rows()['headers'], [('X-Id', '7')])
+        self.assertIsNotNone(record.duration)
+
+    def test_chunks_keep_input_order(self):
+        contexts = [
+            {'base': self.server.url, 'id': 1},
+            {'base': 'http://127.0.0.1:9', 'id': 2},
+            {'base': self.server.url, 'id': 3},
+        ]
+        results, = self.blueprint.send_chunks(contexts, concurrency = 3)
+
+        self.assertEqual([record and record.url for record in results], [
+            self.server.url + '/1', None, self.server.url + '/3'])
+        (context, error), = results.errors
+        self.assertEqual(context, contexts[1])
+        self.assertIn('ConnectionError', repr(error))
+
+    def test_bulk_insert(self):
+        # Databases that return rows from bulk inserts set
+        # the ids of the Request rows, as done here
+        def bulk_create(queryset, objs):
+            for obj in objs:
+                parent = Request(**dict(
+                    (field.attname, getattr(obj, field.attname))
+                    for field in Request._meta.concrete_fields))
+                parent.save()
+                obj.id = parent.id
+            return objs
+
+        records = [
+            RequestRecord(
+                blueprint = self.blueprint, method = 'GET', url = 'http://localhost/{}'.format(n), status = 200)
+            for n in range(3)]
+        with mock.patch.object(connection.features, 'can_return_rows_from_bulk_insert', True), \
+                mock.patch.object(QuerySet, 'bulk_create', bulk_create):
+            RequestRecord.objects.bulk_insert(records)
+
+        stored = RequestRecord.objects.filter(blueprint = self.blueprint).order_by('pk')
+        self.assertEqual(
+            list(stored.values_list('pk', 'url', 'status')),
+            [(record.pk, record.url, 200) for record in records])
+        self.assertFalse(records[0]._state.adding)
+
+    @override_settings(SMITHY_SNAPSHOT_ROWS = True)
+    def test_snapshot_rows(self):
+        self.blueprint.send_batch(self.get_contexts(3))
+        record = RequestRecord.objects.filter(blueprint = self.blueprint).last()
+        self.assertEqual(record.get_rows()['headers'], [('X-Id', '2')])
+        self.assertFalse(Header.objects.filter(request = record).exists())
+
+    def test_command(self):
+        for suffix, content in (
+                ('.csv', 'base,id\n{0},a\n{0},b\n'.format(self.server.url)),
+                ('.jsonl', '{{"base": "{0}", "id": "c"}}\n'.format(self.server.url))):
+            with tempfile.NamedTemporaryFile('w', suffix = suffix, delete = False) as file:
+                file.write(content)
+            self.addCleanup(os.remove, file.name)
+            out = StringIO()
+            call_command('smithy_send_batch', str(self.blueprint.pk), file.name, stdout = out)
+            self.assertIn('failed', out.getvalue())
+
+        self.assertEqual(
+            sorted(RequestRecord.objects.values_list('url', flat = True)),
+            [self.server.url + '/' + path for path in 'abc'])
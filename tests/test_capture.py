@@ -0,0 +1,75 @@
+import hashlib
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from smithy.capture import BodyCapture
+from smithy.models import RequestBlueprint
+
+from tests.echo import EchoServerMixin
+
+
+class BodyCaptureTestCase(TestCase):
+
+    def test_small_bodies_are_kept_whole(self):
+        capture = BodyCapture(limit = 10)
+        capture.feed(b'hello')
+        self.assertFalse(capture.truncated)
+        self.assertEqual(capture.get_body(), b'hello')
+        self.assertEqual(capture.sha256, hashlib.sha256(b'hello').hexdigest())
+
+    def test_large_bodies_are_truncated(self):
+        capture = BodyCapture(limit = 4)
+        capture.feed(b'hello ')
+        capture.feed(b'world')
+        self.assertTrue(capture.truncated)
+        self.assertEqual(capture.size, 11)
+        self.assertTrue(capture.get_body().startswith(b'hell\r\n\r\n<< Truncated, showing 4 of 11 bytes'))
+        self.assertEqual(capture.sha256, hashlib.sha256(b'hello world').hexdigest())
+
+    def test_split_characters_are_dropped(self):
+        capture = BodyCapture(limit = 2)
+        capture.feed('aé'.encode('utf-8'))
+        self.assertTrue(capture.get_body().startswith(b'a\r\n'))
+
+
+class StreamedSendTestCase(EchoServerMixin, TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.media_root)
+        super().tearDownClass()
+
+    def send(self, size):
+        blueprint = RequestBlueprint.objects.create(
+            method = 'GET', url = '{}/bytes/{}'.format(self.server.url, size))
+        return blueprint.send()
+
+    @override_settings(SMITHY_RESPONSE_BODY_LIMIT = 1024)
+    def test_large_responses_are_truncated(self):
+        record = self.send(100000)
+        self.assertEqual(record.response_size, 100000)
+        self.assertEqual(record.response_sha256, hashlib.sha256(b'x' * 100000).hexdigest())
+        self.assertLess(len(record.raw_response), 2048)
+        self.assertEqual(record.response_file, '')
+
+    def test_connection_is_reused_after_streaming(self):
+        before = len(self.server.connections)
+        self.send(100000)
+        self.send(10)
+        self.assertEqual(len(self.server.connections), before + 1)
+
+    def test_full_body_is_saved_to_storage(self):
+        with self.settings(
+                SMITHY_RESPONSE_BODY_LIMIT = 1024,
+                SMITHY_RESPONSE_STORAGE = True,
+                MEDIA_ROOT = self.media_root):
+            record = self.send(50000)
+            with record.open_response_file() as body:
+                self.assertEqual(body.read(), b'x' * 50000)
@@ -0,0 +1,60 @@
+import time
+from unittest import mock
+
+from django.test import TestCase
+
+from smithy.dispatch import map_concurrent
+from smithy.models import RequestBlueprint
+
+
+class MapConcurrentTestCase(TestCase):
+
+    def test_results_are_in_input_order(self):
+        def slow_square(n):
+            time.sleep((10 - n) / 1000)
+            return n * n
+
+        results, errors = map_concurrent(slow_square, range(10), 4)
+        self.assertEqual(results, [n * n for n in range(10)])
+        self.assertEqual(errors, {})
+
+    def test_errors_are_collected(self):
+        def invert(n):
+            return 1 / n
+
+        results, errors = map_concurrent(invert, [1, 0, 2], 2)
+        self.assertEqual(results, [1, None, 0.5])
+        self.assertIsInstance(errors[1], ZeroDivisionError)
+
+
+class SendManyTestCase(TestCase):
+
+    def setUp(self):
+        self.blueprints = [
+            RequestBlueprint.objects.create(
+                name = str(n), method = 'GET', url = 'http://localhost/')
+            for n in range(5)
+        ]
+
+    def fake_send(self, blueprint, context = None):
+        if blueprint.name == '2':
+            raise ValueError("boom")
+        return (blueprint.name, context)
+
+    def test_send_many_collects_failures(self):
+        with mock.patch.object(RequestBlueprint, 'send', autospec = True, side_effect = self.fake_send):
+            results = RequestBlueprint.objects.send_many(
+                RequestBlueprint.objects.order_by('name'),
+                contexts = [{'n': n} for n in range(5)],
+                concurrency = 3)
+
+        self.assertEqual(results, [
+            ('0', {'n': 0}), ('1', {'n': 1}), None, ('3', {'n': 3}), ('4', {'n': 4})
+        ])
+        self.assertEqual(len(results.sent), 4)
+        self.assertEqual(results.errors[0][0], self.blueprints[2])
+        self.assertIsInstance(results.errors[0][1], ValueError)
+
+    def test_send_many_requires_one_context_per_blueprint(self):
+        with self.assertRaises(ValueError):
+            RequestBlueprint.objects.send_many(contexts = [{}])
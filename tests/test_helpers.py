@@ -0,0 +1,127 @@
+from django.test import TestCase
+
+from smithy.helpers import FastTemplate, TemplateCache, add_query_parameters, render_with_context, template_cache
+from smithy.models import RequestBlueprint, RequestRecord, Header
+
+
+class RenderWithContextTestCase(TestCase):
+
+    def setUp(self):
+        template_cache.clear()
+
+    def test_renders_variables(self):
+        self.assertEqual(
+            render_with_context("Hello {{ name }}", {'name': 'smithy'}),
+            "Hello smithy")
+
+    def test_plain_strings_skip_template_engine(self):
+        self.assertEqual(render_with_context("plain", {}), "plain")
+        self.assertNotIn("plain", template_cache)
+
+    def test_non_strings_are_stringified(self):
+        self.assertEqual(render_with_context(None, {}), "None")
+
+    def test_templates_are_cached(self):
+        render_with_context("{{ a }}", {'a': 1})
+        self.assertIn("{{ a }}", template_cache)
+        self.assertEqual(render_with_context("{{ a }}", {'a': 2}), "2")
+        self.assertEqual(len(template_cache), 1)
+
+    def test_cache_is_kept_when_blueprint_changes(self):
+        blueprint = RequestBlueprint.objects.create(
+            method = 'GET', url = 'http://localhost/')
+        render_with_context("{{ a }}", {})
+        Header.objects.create(name = 'x', value = '{{ a }}', request = blueprint)
+        self.assertEqual(len(template_cache), 1)
+
+    def test_cache_is_kept_when_record_rows_change(self):
+        blueprint = RequestBlueprint.objects.create(
+            method = 'GET', url = 'http://localhost/')
+        record = RequestRecord.objects.create(blueprint = blueprint)
+        Header.objects.create(name = 'x', value = 'y', request = record)
+        render_with_context("{{ a }}", {})
+        Header.objects.filter(request = record).delete()
+        self.assertEqual(len(template_cache), 1)
+
+
+class FastTemplateTestCase(TestCase):
+
+    def test_substitutes_variables_and_lookups(self):
+        class User:
+            name = 'ada'
+
+            def greeting(self):
+                return 'hi'
+
+        template = FastTemplate('{{ user.name }} {{user.greeting}} {{ items.1 }} {{ data.key.0 }} {{ missing.x }}!')
+        self.assertIsNone(template.template)
+        self.assertEqual(
+            template.render({'user': User(), 'items': ['a', 'b'], 'data': {'key': 'value'}}),
+            'ada hi b v !')
+
+    def test_nothing_is_escaped(self):
+        template = FastTemplate('{"name": "{{ name }}", "braces": "{}"}')
+        self.assertEqual(
+            template.render({'name': 'A & "B" <c>'}),
+            '{"name": "A & "B" <c>", "braces": "{}"}')
+
+    def test_tags_and_filters_use_django_without_escaping(self):
+        for source, expected in (
+                ('{{ name|upper }}', '<B>'),
+                ('{% if name %}{{ name }}{% endif %}', '<b>'),
+                ('{# comment #}{{ name }}', '<b>'),
+                ('{{ None }}', 'None')):
+            template = FastTemplate(source)
+            self.assertIsNotNone(template.template)
+            self.assertEqual(template.render({'name': '<b>'}), expected)
+
+    def test_matches_django(self):
+        context = {'a': 1, 'b': [1, 2], 'c': {'d': None}, 'e': 2.5}
+        for source in ('plain', '{{ a }}', '{{ b.0 }}-{{ b.5 }}', '{{ c.d }}', '{{ e }}', '{{ nope }}'):
+            self.assertEqual(FastTemplate(source).render(context), render_with_context(source, context))
+
+
+class TemplateCacheTestCase(TestCase):
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TemplateCache(maxsize = 2)
+        cache.get("{{ a }}")
+        cache.get("{{ b }}")
+        cache.get("{{ a }}")
+        cache.get("{{ c }}")
+        self.assertIn("{{ a }}", cache)
+        self.assertNotIn("{{ b }}", cache)
+        self.assertIn("{{ c }}", cache)
+
+
+class AddQueryParametersTestCase(TestCase):
+
+    def test_adds_parameters_in_order(self):
+        self.assertEqual(
+            add_query_parameters('http://localhost/path', [('b', '2'), ('a', '1')]),
+            'http://localhost/path?b=2&a=1')
+
+    def test_repeated_names_are_kept(self):
+        self.assertEqual(
+            add_query_parameters('http://localhost/?tag=x&tag=y', [('q', '1'), ('q', '2')]),
+            'http://localhost/?tag=x&tag=y&q=1&q=2')
+
+    def test_parameters_replace_url_parameters(self):
+        self.assertEqual(
+            add_query_parameters('http://localhost/?a=1&keep=&a=2', [('a', '3')]),
+            'http://localhost/?keep=&a=3')
+
+    def test_url_suffix_is_not_stripped_as_characters(self):
+        # Rebuilding the URL used to strip any trailing
+        # characters found in the existing query string
+        self.assertEqual(
+            add_query_parameters('http://localhost/ab?ba', [('c', '1')]),
+            'http://localhost/ab?ba&c=1')
+
+    def test_fragment_and_encoding(self):
+        self.assertEqual(
+            add_query_parameters('http://localhost/?a%20b=1#top', [('a b', 'c&d')]),
+            'http://localhost/?a+b=c%26d#top')
+
+    def test_no_parameters_leaves_url_untouched(self):
+        self.assertEqual(add_query_parameters('http://localhost/?', []), 'http://localhost/?')
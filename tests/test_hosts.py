@@ -0,0 +1,125 @@
+import threading
+import time
+
+from django.test import TestCase, override_settings
+from requests.exceptions import ReadTimeout
+
+from smithy.hosts import CircuitBreaker, CircuitOpen, HostLimiter, circuit_breaker
+from smithy.models import RequestBlueprint, RequestRecord
+from smithy.worker import process
+
+from tests.echo import EchoServerMixin
+
+
+class CircuitBreakerTestCase(TestCase):
+
+    @override_settings(SMITHY_CIRCUIT_BREAKER_THRESHOLD = 2, SMITHY_CIRCUIT_BREAKER_COOLDOWN = 60)
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker()
+        breaker.record_failure('a')
+        breaker.record_success('a')
+        breaker.record_failure('a')
+        breaker.check('a')
+
+        breaker.record_failure('a')
+        with self.assertRaises(CircuitOpen):
+            breaker.check('a')
+        breaker.check('b')
+
+    @override_settings(SMITHY_CIRCUIT_BREAKER_THRESHOLD = 1, SMITHY_CIRCUIT_BREAKER_COOLDOWN = 0.01)
+    def test_lets_requests_through_after_cooldown(self):
+        breaker = CircuitBreaker()
+        breaker.record_failure('a')
+        self.assertTrue(breaker.is_open('a'))
+        time.sleep(0.02)
+        self.assertFalse(breaker.is_open('a'))
+
+    @override_settings(SMITHY_CIRCUIT_BREAKER_THRESHOLD = 1, SMITHY_CIRCUIT_BREAKER_COOLDOWN = 0.05)
+    def test_lets_a_single_probe_through(self):
+        breaker = CircuitBreaker()
+        breaker.record_failure('a')
+        time.sleep(0.06)
+        breaker.check('a')
+        with self.assertRaises(CircuitOpen):
+            breaker.check('a')
+
+        # The failed probe reopens the circuit
+        breaker.record_failure('a')
+        with self.assertRaises(CircuitOpen):
+            breaker.check('a')
+        time.sleep(0.06)
+        breaker.check('a')
+        breaker.record_success('a')
+        breaker.check('a')
+        breaker.check('a')
+
+    @override_settings(SMITHY_CIRCUIT_BREAKER_THRESHOLD = None)
+    def test_can_be_disabled(self):
+        breaker = CircuitBreaker()
+        for _ in range(10):
+            breaker.record_failure('a')
+        self.assertFalse(breaker.is_open('a'))
+
+
+class HostLimiterTestCase(TestCase):
+
+    @override_settings(SMITHY_HOST_CONCURRENCY = 2)
+    def test_limits_requests_in_flight_per_host(self):
+        limiter = HostLimiter()
+        in_flight = []
+        peak = []
+        lock = threading.Lock()
+
+        def send():
+            with limiter.limit('a'):
+                with lock:
+                    in_flight.append(1)
+                    peak.append(len(in_flight))
+                time.sleep(0.01)
+                with lock:
+                    in_flight.pop()
+
+        threads = [threading.Thread(target = send) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max(peak), 2)
+
+
+class SendProtectionTestCase(EchoServerMixin, TestCase):
+
+    def setUp(self):
+        circuit_breaker.reset()
+        self.addCleanup(circuit_breaker.reset)
+
+    def test_read_timeout_of_blueprint(self):
+        blueprint = RequestBlueprint.objects.create(
+            method = 'GET', url = self.server.url + '/delay/1', read_timeout = 0.05)
+        with self.assertRaises(ReadTimeout):
+            blueprint.send()
+
+    @override_settings(SMITHY_CIRCUIT_BREAKER_THRESHOLD = 1)
+    def test_open_circuit_records_failure_without_sending(self):
+        blueprint = RequestBlueprint.objects.create(method = 'GET', url = 'http://127.0.0.1:1/{{ path }}')
+        with self.assertRaises(Exception):
+            blueprint.send({'path': 'first'})
+
+        record = blueprint.send({'path': 'second'})
+        self.assertEqual(record.state, RequestRecord.FAILED)
+        self.assertIsNone(record.status)
+        self.assertIn('Circuit open for 127.0.0.1:1', record.error)
+        self.assertEqual(record.url, 'http://127.0.0.1:1/second')
+
+    @override_settings(SMITHY_CIRCUIT_BREAKER_THRESHOLD = 1)
+    def test_worker_retries_short_circuited_records(self):
+        blueprint = RequestBlueprint.objects.create(method = 'GET', url = self.server.url + '/')
+        circuit_breaker.record_failure(self.server.url.split('//')[1])
+
+        sent = len(self.server.requests)
+        record = blueprint.enqueue()
+        record.attempts = 1
+        record = process(record)
+        self.assertEqual(record.state, RequestRecord.PENDING)
+        self.assertIsNotNone(record.next_attempt_at)
+        self.assertEqual(len(self.server.requests), sent)
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from smithy.models import RequestRecord
+from smithy.payloads import TEXT
+
+
+class PayloadTestCase(TestCase):
+
+    def create_record(self, codec):
+        return RequestRecord.objects.create(
+            method = 'GET', url = 'http://localhost/',
+            payload_codec = codec,
+            raw_request = 'GET / HTTP/1.1\r\n\r\n',
+            raw_response = 'HTTP/1.1 200 OK\r\n\r\n' + 'x' * 1000)
+
+    def test_text_payloads(self):
+        record = RequestRecord.objects.get(pk = self.create_record(TEXT).pk)
+        self.assertEqual(record.request_text, 'GET / HTTP/1.1\r\n\r\n')
+        self.assertIsNone(record.request_payload)
+        self.assertEqual(record.raw_request, 'GET / HTTP/1.1\r\n\r\n')
+
+    def test_zlib_payloads(self):
+        record = RequestRecord.objects.get(pk = self.create_record('zlib').pk)
+        self.assertEqual(record.response_text, '')
+        self.assertLess(len(record.response_payload), 100)
+        self.assertTrue(record.raw_response.endswith('x' * 1000))
+
+    def test_payloads_are_loaded_lazily(self):
+        pk = self.create_record('zlib').pk
+        record = RequestRecord.objects.defer('request_payload', 'response_payload').get(pk = pk)
+        with CaptureQueriesContext(connection) as queries:
+            record.raw_response
+        self.assertEqual(len(queries), 1)
+
+    def test_file_payloads(self):
+        media_root = tempfile.mkdtemp()
+        try:
+            with self.settings(SMITHY_PAYLOAD_STORAGE = True, MEDIA_ROOT = media_root):
+                with self.captureOnCommitCallbacks(execute = True):
+                    pk = self.create_record('file').pk
+                record = RequestRecord.objects.get(pk = pk)
+                self.assertTrue(bytes(record.request_payload).startswith(b'smithy/payloads/'))
+                self.assertEqual(record.raw_request, 'GET / HTTP/1.1\r\n\r\n')
+
+                # Nothing is written for records that are rolled back
+                with self.captureOnCommitCallbacks(execute = True) as callbacks:
+                    with self.assertRaises(ValueError), transaction.atomic():
+                        self.create_record('file')
+                        raise ValueError
+                self.assertEqual(callbacks, [])
+                self.assertEqual(len(os.listdir(os.path.join(media_root, 'smithy', 'payloads'))), 2)
+        finally:
+            shutil.rmtree(media_root)
+
+    @override_settings(SMITHY_PAYLOAD_CODEC = 'zlib')
+    def test_compress_command(self):
+        pks = [self.create_record(TEXT).pk for _ in range(3)]
+        call_command('smithy_compress_payloads', '--batch-size', '2', stdout = StringIO())
+
+        for record in RequestRecord.objects.filter(pk__in = pks):
+            self.assertEqual(record.payload_codec, 'zlib')
+            self.assertEqual(record.request_text, '')
+            self.assertEqual(record.raw_request, 'GET / HTTP/1.1\r\n\r\n')
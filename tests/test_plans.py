@@ -0,0 +1,115 @@
+import pickle
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from smithy.models import RequestBlueprint, Header, Variable, BodyParameter
+from smithy.plans import PlanCache, SendPlan, plan_cache
+
+
+class SendPlanTestCase(TestCase):
+
+    def setUp(self):
+        plan_cache.clear()
+        self.blueprint = RequestBlueprint.objects.create(
+            method = 'POST',
+            url = 'http://localhost/{{ path }}',
+            body = '{"id": {{ id }}}',
+            content_type = 'application/json')
+        Variable.objects.create(name = 'path', value = 'hooks', request = self.blueprint)
+        Header.objects.create(name = 'X-Id', value = '{{ id }}', request = self.blueprint)
+
+    def test_render(self):
+        rendered = self.blueprint.compile().render({'id': 7})
+        self.assertEqual(rendered.request.url, 'http://localhost/hooks')
+        self.assertEqual(rendered.request.body, '{"id": 7}')
+        self.assertEqual(rendered.request.headers['X-Id'], '7')
+        self.assertIn(('X-Id', '7'), rendered.headers)
+        self.assertEqual(rendered.fields['url'], 'http://localhost/hooks')
+
+    def test_fast_engine(self):
+        self.blueprint.template_engine = 'fast'
+        self.blueprint.save()
+        rendered = self.blueprint.compile().render({'id': '"7"'})
+        self.assertEqual(rendered.request.body, '{"id": "7"}')
+        self.assertEqual(rendered.request.url, 'http://localhost/hooks')
+        self.assertEqual(rendered.request.headers['X-Id'], '"7"')
+
+        # The Django engine escapes HTML
+        self.blueprint.template_engine = 'django'
+        self.blueprint.save()
+        rendered = self.blueprint.compile().render({'id': '"7"'})
+        self.assertEqual(rendered.request.body, '{"id": &quot;7&quot;}')
+
+    def test_form_body(self):
+        self.blueprint.content_type = 'application/x-www-form-urlencoded'
+        self.blueprint.save()
+        BodyParameter.objects.create(name = 'id', value = '{{ id }}', request = self.blueprint)
+        rendered = self.blueprint.compile().render({'id': 7})
+        self.assertEqual(rendered.request.body, 'id=7')
+
+    def test_plan_is_immutable(self):
+        plan = self.blueprint.compile()
+        with self.assertRaises(AttributeError):
+            plan.method = 'GET'
+        with self.assertRaises(AttributeError):
+            plan.extra = True
+
+    def test_cached_plan_needs_no_queries(self):
+        self.blueprint.compile()
+        with CaptureQueriesContext(connection) as queries:
+            plan = self.blueprint.compile()
+            plan.render({'id': 1})
+        self.assertEqual(len(queries), 0)
+
+    def test_plan_is_rebuilt_when_rows_change(self):
+        plan = self.blueprint.compile()
+        header = Header.objects.get(name = 'X-Id')
+        header.value = 'static'
+        header.save()
+        self.assertIsNot(self.blueprint.compile(), plan)
+        self.assertEqual(self.blueprint.compile().render({}).request.headers['X-Id'], 'static')
+
+    @override_settings(SMITHY_PLAN_CACHE_CHECK_INTERVAL = 0)
+    def test_plan_is_rebuilt_when_another_process_changes_it(self):
+        stale = RequestBlueprint.objects.get(pk = self.blueprint.pk)
+        plan = stale.compile()
+        # Changes made without signals, as seen from here
+        # when another process saves the blueprint or a row
+        RequestBlueprint.objects.filter(pk = self.blueprint.pk).update(
+            url = 'http://localhost/changed', modified = timezone.now())
+        Header.objects.filter(request = self.blueprint).update(value = 'other')
+        self.assertIsNot(stale.compile(), plan)
+        rendered = stale.compile().render({})
+        self.assertEqual(rendered.request.url, 'http://localhost/changed')
+        self.assertEqual(rendered.request.headers['X-Id'], 'other')
+        with CaptureQueriesContext(connection) as queries:
+            stale.compile()
+        self.assertEqual(len(queries), 1)
+
+    def test_row_changes_update_the_blueprint(self):
+        modified = RequestBlueprint.objects.get(pk = self.blueprint.pk).modified
+        Header.objects.get(name = 'X-Id').delete()
+        self.assertGreater(RequestBlueprint.objects.get(pk = self.blueprint.pk).modified, modified)
+
+    def test_plans_can_be_pickled(self):
+        plan = self.blueprint.compile()
+        copy = pickle.loads(pickle.dumps(plan))
+        self.assertIsInstance(copy, SendPlan)
+        self.assertEqual(copy.render({'id': 3}).request.body, '{"id": 3}')
+
+        self.blueprint.template_engine = 'fast'
+        self.blueprint.save()
+        copy = pickle.loads(pickle.dumps(self.blueprint.compile()))
+        self.assertEqual(copy.render({'id': 4}).request.body, '{"id": 4}')
+
+    @override_settings(SMITHY_PLAN_CACHE = 'default')
+    def test_plans_can_be_stored_in_django_cache(self):
+        caches['default'].clear()
+        self.blueprint.compile()
+        self.assertIsNotNone(caches['default'].get(PlanCache.KEY.format(self.blueprint.pk)))
+        self.blueprint.save()
+        self.assertIsNone(caches['default'].get(PlanCache.KEY.format(self.blueprint.pk)))
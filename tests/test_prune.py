@@ -0,0 +1,96 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from smithy.models import Request, RequestBlueprint, RequestRecord, Header
+
+
+class PruneTestCase(TestCase):
+
+    def setUp(self):
+        self.blueprint = RequestBlueprint.objects.create(
+            method = 'GET', url = 'http://localhost/')
+
+    def create_record(self, days_old = 0, status = 200, **kwargs):
+        record = RequestRecord.objects.create(
+            blueprint = self.blueprint, method = 'GET', url = 'http://localhost/',
+            status = status, **kwargs)
+        Header.objects.create(name = 'X', value = 'y', request = record)
+        RequestRecord.objects.filter(pk = record.pk).update(
+            created = timezone.now() - timedelta(days = days_old))
+        return record
+
+    def prune(self, *args):
+        call_command('smithy_prune', *args, stdout = StringIO())
+
+    def test_options_are_required(self):
+        with self.assertRaises(CommandError):
+            self.prune()
+
+    def test_max_age(self):
+        old = self.create_record(days_old = 40)
+        new = self.create_record(days_old = 1)
+        self.prune('--max-age', '30', '--batch-size', '1')
+
+        self.assertEqual(list(RequestRecord.objects.values_list('pk', flat = True)), [new.pk])
+        self.assertFalse(Request.objects.filter(pk = old.pk).exists())
+        self.assertFalse(Header.objects.filter(request_id = old.pk).exists())
+        self.assertTrue(Header.objects.filter(request_id = new.pk).exists())
+        self.assertTrue(RequestBlueprint.objects.filter(pk = self.blueprint.pk).exists())
+
+    def test_keep_failures_after(self):
+        success = self.create_record(days_old = 10)
+        failure = self.create_record(days_old = 10, status = 500)
+        self.prune('--keep-failures-after', '7')
+
+        self.assertFalse(RequestRecord.objects.filter(pk = success.pk).exists())
+        self.assertTrue(RequestRecord.objects.filter(pk = failure.pk).exists())
+
+    def test_max_per_blueprint(self):
+        records = [self.create_record() for _ in range(5)]
+        self.prune('--max-per-blueprint', '2', '--batch-size', '2')
+
+        self.assertEqual(
+            list(RequestRecord.objects.order_by('pk').values_list('pk', flat = True)),
+            [records[3].pk, records[4].pk])
+
+    def test_queued_records_are_kept(self):
+        pending = self.create_record(days_old = 40, state = RequestRecord.PENDING)
+        self.prune('--max-age', '30')
+        self.assertTrue(RequestRecord.objects.filter(pk = pending.pk).exists())
+
+    def test_dry_run(self):
+        self.create_record(days_old = 40)
+        out = StringIO()
+        call_command('smithy_prune', '--max-age', '30', '--dry-run', stdout = out)
+        self.assertIn('Would delete 1 records', out.getvalue())
+        self.assertEqual(RequestRecord.objects.count(), 1)
+
+    def test_dry_run_counts_records_once(self):
+        self.create_record(days_old = 40)
+        self.create_record(days_old = 10)
+        out = StringIO()
+        call_command(
+            'smithy_prune', '--max-age', '30', '--keep-failures-after', '7', '--dry-run', stdout = out)
+        self.assertIn('Would delete 2 records', out.getvalue())
+
+    @override_settings(SMITHY_RESPONSE_STORAGE = 'django.core.files.storage.FileSystemStorage')
+    def test_files_are_deleted_on_commit(self):
+        old = self.create_record(days_old = 40, response_file = 'smithy/responses/old')
+        with mock.patch('django.core.files.storage.FileSystemStorage.delete') as delete:
+            with self.captureOnCommitCallbacks(execute = True):
+                self.prune('--max-age', '30')
+                delete.assert_not_called()
+        delete.assert_called_once_with('smithy/responses/old')
+        self.assertFalse(RequestRecord.objects.filter(pk = old.pk).exists())
+
+    def test_files_are_kept_without_storage(self):
+        self.create_record(days_old = 40, response_file = 'smithy/responses/old')
+        with self.captureOnCommitCallbacks(execute = True):
+            self.prune('--max-age', '30')
+        self.assertEqual(RequestRecord.objects.count(), 0)
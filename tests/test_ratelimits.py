@@ -0,0 +1,120 @@
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from smithy import worker
+from smithy.models import RequestBlueprint, RequestRecord
+from smithy.ratelimits import RateLimited, RateLimiter, rate_limiter, take
+
+from tests.echo import EchoServerMixin
+
+
+class RateLimiterTestCase(TestCase):
+
+    def test_take(self):
+        # A bucket of 2 tokens, refilled 10 times a second
+        wait, full_at = take(0, 100, 10, 2)
+        self.assertEqual(wait, 0)
+        wait, full_at = take(full_at, 100, 10, 2)
+        self.assertEqual(wait, 0)
+        wait, full_at = take(full_at, 100, 10, 2)
+        self.assertAlmostEqual(wait, 0.1)
+        # Refilled after a while
+        wait, full_at = take(full_at, 101, 10, 2)
+        self.assertEqual(wait, 0)
+
+    def test_max_wait(self):
+        limiter = RateLimiter()
+        self.assertEqual(limiter.reserve('a', 1, 1, max_wait = 0), 0)
+        with self.assertRaises(RateLimited) as raised:
+            limiter.reserve('a', 1, 1, max_wait = 0)
+        self.assertEqual(raised.exception.key, 'a')
+        self.assertGreater(raised.exception.retry_after, 0.9)
+        # No token was taken by the refused reservation
+        self.assertLess(limiter.reserve('a', 1, 1), 1)
+        self.assertEqual(limiter.reserve('b', 1, 1), 0)
+
+    def test_refused_limits_take_no_token(self):
+        limiter = RateLimiter()
+        limiter.reserve('host', 1, 1)
+        limits = [('blueprint', 1, 1), ('host', 1, 1)]
+        for _ in range(3):
+            with self.assertRaises(RateLimited) as raised:
+                limiter.get_wait(limits, max_wait = 0)
+            self.assertEqual(raised.exception.key, 'host')
+        # The blueprint's bucket is still full
+        self.assertEqual(limiter.reserve('blueprint', 1, 1, max_wait = 0), 0)
+
+    def test_paces_threads(self):
+        limiter = RateLimiter()
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target = limiter.acquire, args = ([('a', 50, 1)],))
+            for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    @override_settings(SMITHY_RATE_LIMIT_CACHE = 'default')
+    def test_shared_through_cache(self):
+        caches['default'].clear()
+        first, second = RateLimiter(), RateLimiter()
+        self.assertEqual(first.reserve('a', 1, 1), 0)
+        self.assertGreater(second.reserve('a', 1, 1), 0.9)
+        self.assertIsNotNone(caches['default'].get(RateLimiter.KEY.format('a')))
+        self.assertIsNone(caches['default'].get(RateLimiter.KEY.format('a') + ':lock'))
+        with self.assertRaises(RateLimited):
+            first.reserve('a', 1, 1, max_wait = 1)
+        # A refused reservation takes no token from any bucket
+        with self.assertRaises(RateLimited):
+            first.get_wait([('b', 1, 1), ('a', 1, 1)], max_wait = 1)
+        self.assertEqual(second.reserve('b', 1, 1, max_wait = 0), 0)
+
+    @override_settings(SMITHY_RATE_LIMIT_CACHE = 'default')
+    def test_aacquire_through_cache(self):
+        caches['default'].clear()
+        limiter = RateLimiter()
+        async_to_sync(limiter.aacquire)([('a', 1, 1)])
+        with self.assertRaises(RateLimited):
+            async_to_sync(limiter.aacquire)([('a', 1, 1)], max_wait = 0)
+
+
+class RateLimitedSendTestCase(EchoServerMixin, TestCase):
+
+    def setUp(self):
+        rate_limiter.reset()
+
+    def test_blueprint_rate_limit(self):
+        blueprint = RequestBlueprint.objects.create(
+            method = 'GET', url = self.server.url, rate_limit = 20, rate_limit_burst = 2)
+        started = time.monotonic()
+        for _ in range(4):
+            blueprint.send()
+        # The first two are sent at once, the others 50ms apart
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    def test_host_rate_limit(self):
+        blueprint = RequestBlueprint.objects.create(method = 'GET', url = self.server.url)
+        host = self.server.url.split('/')[2]
+        with self.settings(SMITHY_HOST_RATE_LIMITS = {host: 20}):
+            blueprint.send()
+            with self.assertRaises(RateLimited):
+                blueprint.send(max_wait = 0)
+
+    @override_settings(SMITHY_WORKER_RATE_LIMIT_WAIT = 0)
+    def test_worker_defers_rate_limited_records(self):
+        blueprint = RequestBlueprint.objects.create(method = 'GET', url = self.server.url, rate_limit = 1)
+        first, second = blueprint.enqueue(), blueprint.enqueue()
+
+        self.assertEqual(worker.work(concurrency = 1), 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.state, RequestRecord.SENT)
+        self.assertEqual(second.state, RequestRecord.PENDING)
+        self.assertEqual(second.attempts, 0)
+        self.assertGreater(second.next_attempt_at, first.modified)
@@ -0,0 +1,69 @@
+import json
+from unittest import skipIf
+
+from django.test import TestCase, override_settings
+
+from smithy.models import RequestBlueprint, RequestRecord
+from smithy.sessions import async_client_pool, session_pool
+
+from tests.echo import EchoServerMixin
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class RedirectTestCase(EchoServerMixin, TestCase):
+
+    def setUp(self):
+        session_pool.close()
+        self.server.connections.clear()
+        self.blueprint = RequestBlueprint.objects.create(
+            method = 'POST', url = self.server.url + '/redirect/3',
+            body = 'hello', content_type = '', follow_redirects = True)
+
+    def test_redirects_are_followed(self):
+        record = RequestRecord.objects.get(pk = self.blueprint.send().pk)
+
+        self.assertEqual(record.status, 200)
+        self.assertEqual(record.url, self.server.url + '/redirect/3')
+        self.assertEqual(json.loads(record.raw_response.split('\r\n\r\n', 1)[1])['path'], '/get')
+        self.assertTrue(record.raw_request.startswith('GET /get HTTP/1.1'))
+
+        redirects = record.get_redirects()
+        self.assertEqual(
+            [(hop['method'], hop['url'], hop['status']) for hop in redirects],
+            [
+                ('POST', self.server.url + '/redirect/3', 302),
+                ('GET', self.server.url + '/redirect/2', 302),
+                ('GET', self.server.url + '/redirect/1', 302),
+            ])
+        self.assertTrue(all(hop['ms'] > 0 for hop in redirects))
+
+    def test_hops_reuse_the_connection(self):
+        self.blueprint.send()
+        self.assertEqual(len(self.server.connections), 1)
+
+    @override_settings(SMITHY_MAX_REDIRECTS = 2)
+    def test_redirect_chains_are_bounded(self):
+        record = self.blueprint.send()
+        self.assertEqual(record.status, 302)
+        self.assertEqual(len(record.get_redirects()), 2)
+        self.assertEqual(record.error, "Stopped after 2 redirects")
+
+    def test_redirects_are_not_followed_by_default(self):
+        self.blueprint.follow_redirects = False
+        self.blueprint.save()
+        record = self.blueprint.send()
+        self.assertEqual(record.status, 302)
+        self.assertEqual(record.redirects, '')
+
+    @skipIf(httpx is None, "httpx is not installed")
+    async def test_asend_follows_redirects(self):
+        record = await self.blueprint.asend()
+        await async_client_pool.aclose()
+
+        self.assertEqual(record.status, 200)
+        self.assertEqual(len(record.get_redirects()), 3)
+        self.assertTrue(record.raw_request.startswith('GET /get HTTP/1.1'))
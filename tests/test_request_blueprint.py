@@ -1,13 +1,19 @@
-from django.test import TestCase
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-from smithy.models import RequestBlueprint, QueryParameter
+from smithy.models import RequestBlueprint, RequestRecord, QueryParameter, Header, Cookie, Variable
+from smithy.plans import plan_cache
 
+from tests.echo import EchoServerMixin
 
-class RequestBlueprintTestCase(TestCase):
+
+class RequestBlueprintTestCase(EchoServerMixin, TestCase):
 
     def setUp(self):
         self.request = RequestBlueprint()
-        self.request.url = "https://postman-echo.com/get"
+        self.request.url = self.server.url + "/get"
         self.request.method = RequestBlueprint.METHODS[0][0]
         self.request.save()
 
@@ -18,6 +24,7 @@ class RequestBlueprintTestCase(TestCase):
             request = self.request
         )
         self.request.send()
+        self.assertEqual(self.server.requests[-1], "/get?test-name=text-value")
 
     def test_query_params_preserves_params_in_original_url(self):
         self.request.url += "?persist=true"
@@ -28,4 +35,102 @@ class RequestBlueprintTestCase(TestCase):
             request = self.request
         )
         self.request.send()
+        self.assertEqual(self.server.requests[-1], "/get?persist=true&test-name=text-value")
+
+    def test_render_does_not_send_or_write(self):
+        Header.objects.create(name = "X-Id", value = "{{ id }}", request = self.request)
+        Cookie.objects.create(name = "session", value = "s{{ id }}", request = self.request)
+        Variable.objects.create(name = "id", value = "{{ 42 }}", request = self.request)
+        requests = len(self.server.requests)
+
+        with CaptureQueriesContext(connection) as queries:
+            rendered = self.request.render()
+
+        self.assertEqual(rendered.request.method, "GET")
+        self.assertEqual(rendered.request.url, self.server.url + "/get")
+        self.assertEqual(rendered.request.headers["X-Id"], "{{ 42 }}")
+        self.assertEqual(rendered.request.headers["Cookie"], "session=s{{ 42 }}")
+        self.assertEqual(rendered.headers, [("X-Id", "{{ 42 }}")])
+        self.assertFalse(any(
+            not query['sql'].startswith('SELECT') for query in queries.captured_queries))
+        self.assertEqual(len(self.server.requests), requests)
+        self.assertFalse(RequestRecord.objects.exists())
+
+    def test_clean_validates_templates(self):
+        self.request.url = "{% if %}"
+        with self.assertRaises(ValidationError) as raised:
+            self.request.full_clean()
+        self.assertIn('url', raised.exception.message_dict)
+
+        with self.assertRaises(ValidationError):
+            Header(name = "X-Id", value = "{{ id|nope }}", request = self.request).full_clean()
+        # Variables aren't templates
+        Variable(name = "id", value = "{% if %}", request = self.request).full_clean()
+
+
+class RequestBlueprintQueryCountTestCase(EchoServerMixin, TestCase):
+
+    def setUp(self):
+        plan_cache.clear()
+
+    def create_blueprint(self, rows):
+        blueprint = RequestBlueprint.objects.create(
+            method = 'GET', url = self.server.url + '/{{ path }}')
+        for n in range(rows):
+            Variable.objects.create(name = 'var{}'.format(n), value = str(n), request = blueprint)
+            Header.objects.create(name = 'X-Header-{}'.format(n), value = '{{ var0 }}', request = blueprint)
+            QueryParameter.objects.create(name = 'q{}'.format(n), value = '{{ path }}', request = blueprint)
+            Cookie.objects.create(name = 'c{}'.format(n), value = str(n), request = blueprint)
+        return RequestBlueprint.objects.get(pk = blueprint.pk)
+
+    def test_send_uses_constant_number_of_queries(self):
+        small = self.create_blueprint(1)
+        large = self.create_blueprint(10)
+
+        with CaptureQueriesContext(connection) as small_queries:
+            small.send({'path': 'small'})
+        with CaptureQueriesContext(connection) as large_queries:
+            record = large.send({'path': 'large'})
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        # One of them stores the timings once the write is timed
+        self.assertLessEqual(len(large_queries), 13)
+        self.assertEqual(record.headers.count(), 10)
+        self.assertEqual(record.query_parameters.count(), 10)
+        self.assertEqual(record.cookies.count(), 10)
+
+    @override_settings(SMITHY_SNAPSHOT_ROWS = True)
+    def test_snapshot_rows_are_stored_in_one_insert(self):
+        blueprint = self.create_blueprint(10)
+        blueprint.compile()
+
+        with CaptureQueriesContext(connection) as queries:
+            record = blueprint.send({'path': 'snapshot'})
+
+        inserts = [q for q in queries if q['sql'].startswith('INSERT')]
+        # One insert into each table of the record
+        self.assertEqual(len(inserts), 2)
+        self.assertFalse(record.headers.exists())
+
+        rows = RequestRecord.objects.get(pk = record.pk).get_rows()
+        self.assertIn(('X-Header-9', '0'), rows['headers'])
+        self.assertEqual(len(rows['query_parameters']), 10)
+        self.assertIn(('c9', '9'), rows['cookies'])
+
+    def test_records_without_snapshot_read_their_rows(self):
+        record = self.create_blueprint(2).send({'path': 'rows'})
+
+        rows = RequestRecord.objects.get(pk = record.pk).get_rows()
+        self.assertEqual(record.rows, '')
+        self.assertEqual(rows['query_parameters'], [('q0', 'rows'), ('q1', 'rows')])
+
+    def test_send_many_prefetches_rows_once(self):
+        for _ in range(3):
+            self.create_blueprint(5)
+
+        with CaptureQueriesContext(connection) as queries:
+            results = RequestBlueprint.objects.send_many(contexts = {'path': 'many'})
 
+        self.assertEqual(len(results.sent), 3)
+        selects = [q for q in queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1 + len(RequestBlueprint.RELATED))
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.utils import timezone
+
+from smithy.cron import CronExpression
+from smithy.models import RequestBlueprint, Schedule
+from smithy.scheduler import Scheduler
+
+
+class CronExpressionTestCase(TestCase):
+    now = datetime(2026, 10, 18, 10, 29, 30, tzinfo = dt_timezone.utc)
+
+    def get_next(self, source):
+        return CronExpression(source).get_next(self.now)
+
+    def test_steps_ranges_and_names(self):
+        self.assertEqual(self.get_next('*/15 * * * *'), self.now.replace(minute = 30, second = 0))
+        self.assertEqual(self.get_next('0 9 * * mon-fri'), datetime(2026, 10, 19, 9, tzinfo = dt_timezone.utc))
+        self.assertEqual(self.get_next('@monthly'), datetime(2026, 11, 1, tzinfo = dt_timezone.utc))
+        self.assertEqual(self.get_next('0 0 29 feb *'), datetime(2028, 2, 29, tzinfo = dt_timezone.utc))
+
+    def test_day_of_month_or_day_of_week(self):
+        # The 1st of the month, or any Monday
+        self.assertEqual(self.get_next('30 2 1 * 1'), datetime(2026, 10, 19, 2, 30, tzinfo = dt_timezone.utc))
+
+    def test_invalid_expressions(self):
+        for source in ('* * * *', '60 * * * *', '* * * foo *', '*/0 * * * *', '0 0 30 2 *'):
+            with self.assertRaises(ValueError):
+                self.get_next(source)
+
+
+class ScheduleTestCase(TestCase):
+
+    def setUp(self):
+        self.blueprint = RequestBlueprint.objects.create(method = 'GET', url = 'http://localhost/')
+
+    def test_clean_requires_interval_or_cron(self):
+        with self.assertRaises(ValidationError):
+            Schedule(blueprint = self.blueprint).clean()
+        with self.assertRaises(ValidationError):
+            Schedule(blueprint = self.blueprint, interval = 5, cron = '* * * * *').clean()
+        with self.assertRaises(ValidationError):
+            Schedule(blueprint = self.blueprint, cron = '* *').clean()
+        # Parses, but never matches
+        with self.assertRaises(ValidationError):
+            Schedule(blueprint = self.blueprint, cron = '0 0 30 2 *').clean()
+        Schedule(blueprint = self.blueprint, cron = '* * * * *', context = '{"a": 1}').clean()
+
+    def test_intervals_do_not_drift(self):
+        start = timezone.now()
+        schedule = Schedule(blueprint = self.blueprint, interval = 10, next_run_at = start)
+        self.assertEqual(schedule.get_next_run(start + timedelta(seconds = 0.5)), start + timedelta(seconds = 10))
+        # Missed runs are skipped
+        self.assertEqual(schedule.get_next_run(start + timedelta(seconds = 35)), start + timedelta(seconds = 40))
+
+
+class SchedulerTestCase(TestCase):
+
+    def setUp(self):
+        self.blueprint = RequestBlueprint.objects.create(method = 'GET', url = 'http://localhost/')
+        self.due = timezone.now() - timedelta(seconds = 1)
+        self.schedule = Schedule.objects.create(
+            blueprint = self.blueprint, interval = 60, context = '{"a": 1}', next_run_at = self.due)
+        Schedule.objects.create(
+            blueprint = self.blueprint, interval = 60, next_run_at = self.due + timedelta(hours = 1))
+
+    def test_due_schedules_are_claimed_once(self):
+        first, second = Scheduler(concurrency = 1), Scheduler(concurrency = 1)
+        first.load()
+        second.load()
+
+        with mock.patch.object(RequestBlueprint, 'send') as send:
+            self.assertEqual(first.run_due(timezone.now().timestamp()), 1)
+            self.assertEqual(second.run_due(timezone.now().timestamp()), 0)
+            first.executor.shutdown()
+
+        send.assert_called_once_with({'a': 1})
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.last_run_at, self.due)
+        self.assertEqual(self.schedule.next_run_at, self.due + timedelta(seconds = 60))
+        # The second scheduler picked up the new run
+        self.assertEqual(second.heap[0][0], self.schedule.next_run_at.timestamp())
+
+    def test_run_once(self):
+        with mock.patch.object(RequestBlueprint, 'send') as send:
+            Scheduler(concurrency = 2).run(once = True)
+        self.assertEqual(send.call_count, 1)
+
+    def test_disabled_schedules_are_not_sent(self):
+        Schedule.objects.update(enabled = False)
+        with mock.patch.object(RequestBlueprint, 'send') as send:
+            Scheduler().run(once = True)
+        send.assert_not_called()
+
+    def test_broken_schedules_do_not_stop_others(self):
+        Schedule.objects.filter(pk = self.schedule.pk).update(interval = None, cron = '0 0 30 2 *')
+        Schedule.objects.create(blueprint = self.blueprint, interval = 60, next_run_at = self.due)
+        with mock.patch.object(RequestBlueprint, 'send') as send, \
+                self.assertLogs('smithy.scheduler', 'ERROR'):
+            Scheduler(concurrency = 1).run(once = True)
+        self.assertEqual(send.call_count, 1)
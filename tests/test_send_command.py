@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+
+from smithy.models import RequestBlueprint, RequestRecord
+
+from tests.echo import EchoServerMixin
+
+
+class SendCommandTestCase(EchoServerMixin, TransactionTestCase):
+
+    def setUp(self):
+        self.first = RequestBlueprint.objects.create(
+            name = 'first', method = 'GET', url = self.server.url + '/first/{{ id }}')
+        self.second = RequestBlueprint.objects.create(
+            name = 'second', method = 'GET', url = self.server.url + '/second/{{ id }}')
+
+    def write_contexts(self, content, suffix = '.jsonl'):
+        with tempfile.NamedTemporaryFile('w', suffix = suffix, delete = False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def call(self, *args):
+        out = StringIO()
+        call_command('smithy_send', *args, stdout = out)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_sends_blueprints_by_id_and_name(self):
+        path = self.write_contexts('{"id": 1}\n{"id": 2}\n')
+        # SQLite's in-memory test database allows one writer at a time
+        results = self.call(str(self.first.pk), 'second', '--context', path, '--concurrency', '1')
+
+        self.assertEqual(len(results), 4)
+        self.assertEqual(
+            sorted((result['blueprint'], result['index']) for result in results),
+            [(self.first.pk, 0), (self.first.pk, 1), (self.second.pk, 0), (self.second.pk, 1)])
+        for result in results:
+            self.assertEqual(result['status'], 200)
+            self.assertIsNone(result['error'])
+            self.assertIn('ttfb', result['timings'])
+        self.assertEqual(
+            sorted(RequestRecord.objects.values_list('pk', flat = True)),
+            sorted(result['record'] for result in results))
+
+    def test_no_record(self):
+        path = self.write_contexts('[{"id": 1}, {"id": 2}]', suffix = '.json')
+        results = self.call('first', '--context', path, '--no-record')
+
+        self.assertEqual([result['status'] for result in results], [200, 200])
+        self.assertNotIn('record', results[0])
+        self.assertFalse(RequestRecord.objects.exists())
+        self.assertIn('/first/2', self.server.requests)
+
+    def test_rps(self):
+        path = self.write_contexts(''.join('{{"id": {}}}\n'.format(n) for n in range(4)))
+        started = time.monotonic()
+        self.call('first', '--context', path, '--rps', '20', '--no-record', '--concurrency', '4')
+        self.assertGreaterEqual(time.monotonic() - started, 0.14)
+
+    def test_errors(self):
+        with self.assertRaisesMessage(CommandError, "No blueprint with primary key or name 'third'"):
+            self.call('third')
+
+        RequestBlueprint.objects.create(name = 'down', method = 'GET', url = 'http://127.0.0.1:9/')
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "1 requests failed"):
+            call_command('smithy_send', 'down', '--no-record', stdout = out)
+        self.assertIn('ConnectionError', json.loads(out.getvalue())['error'])
@@ -0,0 +1,48 @@
+from django.test import TestCase, override_settings
+
+from smithy.models import RequestBlueprint
+from smithy.sessions import SessionPool, session_pool
+
+from tests.echo import EchoServerMixin
+
+
+class SessionPoolTestCase(TestCase):
+
+    def test_sessions_are_keyed_by_scheme_and_host(self):
+        pool = SessionPool()
+        first = pool.get('http://example.com/a')
+        self.assertIs(pool.get('http://EXAMPLE.com/b?c=d'), first)
+        self.assertIsNot(pool.get('https://example.com/a'), first)
+        self.assertIsNot(pool.get('http://example.org/a'), first)
+        pool.close()
+        self.assertEqual(len(pool), 0)
+
+    @override_settings(SMITHY_POOL_SIZE = 2)
+    def test_least_recently_used_host_is_evicted(self):
+        pool = SessionPool()
+        first = pool.get('http://a.example.com')
+        pool.get('http://b.example.com')
+        pool.get('http://c.example.com')
+        self.assertEqual(len(pool), 2)
+        self.assertIsNot(pool.get('http://a.example.com'), first)
+
+    @override_settings(SMITHY_POOL_MAX_IDLE = 0)
+    def test_idle_sessions_are_replaced(self):
+        pool = SessionPool()
+        first = pool.get('http://example.com')
+        self.assertIsNot(pool.get('http://example.com'), first)
+
+
+class PooledSendTestCase(EchoServerMixin, TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        session_pool.close()
+        super().tearDownClass()
+
+    def test_repeated_sends_reuse_connection(self):
+        blueprint = RequestBlueprint.objects.create(
+            method = 'GET', url = self.server.url + '/ping')
+        for _ in range(3):
+            self.assertEqual(blueprint.send().status, 200)
+        self.assertEqual(len(self.server.connections), 1)
@@ -0,0 +1,120 @@
+from unittest import skipIf
+
+from django.test import TestCase
+from requests.exceptions import ConnectionError
+
+from smithy.models import RequestBlueprint
+from smithy.signals import pre_send, post_send, send_failed
+
+from tests.echo import EchoServerMixin
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+try:
+    import opentelemetry.sdk.trace
+except ImportError:
+    opentelemetry = None
+
+
+class EchoTestCase(EchoServerMixin, TestCase):
+
+    def setUp(self):
+        self.blueprint = RequestBlueprint.objects.create(
+            method = 'POST', url = self.server.url + '/{{ path }}', body = 'hello', content_type = '')
+        self.received = []
+
+
+class SignalsTestCase(EchoTestCase):
+
+    def connect(self, signal):
+        def receiver(sender, **kwargs):
+            self.received.append((signal, kwargs))
+        signal.connect(receiver)
+        self.addCleanup(signal.disconnect, receiver)
+
+    def test_send_sends_signals(self):
+        self.connect(pre_send)
+        self.connect(post_send)
+        self.connect(send_failed)
+
+        def add_header(sender, request, **kwargs):
+            request.headers['X-Trace'] = 'abc'
+        pre_send.connect(add_header)
+        self.addCleanup(pre_send.disconnect, add_header)
+        self.blueprint.body = 'héllo'
+        self.blueprint.save()
+
+        record = self.blueprint.send({'path': 'signals'})
+
+        (pre, pre_kwargs), (post, post_kwargs) = self.received
+        self.assertEqual((pre, post), (pre_send, post_send))
+        self.assertEqual(pre_kwargs['context'], {'path': 'signals'})
+        self.assertEqual(post_kwargs['record'], record)
+        self.assertEqual(post_kwargs['status'], 200)
+        self.assertEqual(post_kwargs['duration'], record.duration)
+        self.assertEqual(post_kwargs['request_bytes'], 6)
+        self.assertEqual(post_kwargs['response_bytes'], record.response_size)
+        self.assertIn('X-Trace: abc', record.raw_request)
+
+    def test_failed_send_sends_signal(self):
+        self.connect(post_send)
+        self.connect(send_failed)
+        self.blueprint.url = 'http://127.0.0.1:1/'
+        self.blueprint.save()
+
+        with self.assertRaises(ConnectionError):
+            self.blueprint.send()
+
+        [(signal, kwargs)] = self.received
+        self.assertEqual(signal, send_failed)
+        self.assertIsInstance(kwargs['exception'], ConnectionError)
+        self.assertEqual(kwargs['request'].url, 'http://127.0.0.1:1/')
+        self.assertGreater(kwargs['duration'], 0)
+
+
+@skipIf(prometheus_client is None, "prometheus_client is not installed")
+class PrometheusTestCase(EchoTestCase):
+
+    def test_metrics_are_exported(self):
+        from smithy.contrib import prometheus
+
+        registry = prometheus_client.CollectorRegistry()
+        prometheus.metrics.clear()
+        prometheus.install(registry)
+        self.addCleanup(post_send.disconnect, dispatch_uid = 'smithy.contrib.prometheus')
+        self.addCleanup(send_failed.disconnect, dispatch_uid = 'smithy.contrib.prometheus')
+
+        self.blueprint.send({'path': 'metrics'})
+
+        labels = {'blueprint': str(self.blueprint.pk), 'host': self.server.url.split('//')[1]}
+        self.assertEqual(registry.get_sample_value(
+            'smithy_requests_total', dict(labels, status = '200')), 1)
+        self.assertEqual(registry.get_sample_value(
+            'smithy_request_duration_seconds_count', labels), 1)
+
+
+@skipIf(opentelemetry is None, "opentelemetry-sdk is not installed")
+class OpenTelemetryTestCase(EchoTestCase):
+
+    def test_trace_context_is_injected(self):
+        from opentelemetry import trace
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        from smithy.contrib import opentelemetry as adapter
+
+        exporter = InMemorySpanExporter()
+        provider = opentelemetry.sdk.trace.TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        adapter.install()
+        for signal in (pre_send, post_send, send_failed):
+            self.addCleanup(signal.disconnect, dispatch_uid = 'smithy.contrib.opentelemetry')
+
+        record = self.blueprint.send({'path': 'traced'})
+
+        [span] = exporter.get_finished_spans()
+        self.assertEqual(span.attributes['http.response.status_code'], 200)
+        self.assertIn('traceparent: 00-{:032x}-'.format(span.context.trace_id), record.raw_request)
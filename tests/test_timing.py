@@ -0,0 +1,69 @@
+import time
+
+from django.test import TestCase
+
+from smithy.models import RequestBlueprint, RequestRecord
+from smithy.sessions import session_pool
+from smithy.timing import Timer, activate, current, measure
+
+from tests.echo import EchoServerMixin
+
+
+class TimerTestCase(TestCase):
+
+    def test_nested_phases_are_not_counted_twice(self):
+        timer = Timer()
+        with timer.measure('ttfb'):
+            with timer.measure('connect'):
+                time.sleep(0.01)
+            timer.add('connect', 5 * 10 ** 6)
+
+        self.assertGreaterEqual(timer.phases['connect'], 15 * 10 ** 6)
+        self.assertLess(timer.phases['ttfb'], 10 ** 7)
+        self.assertEqual(timer.duration, round(sum(timer.phases.values()) / 1e6, 3))
+
+    def test_measure_without_active_timer(self):
+        with measure('db'):
+            pass
+        self.assertIsNone(current())
+
+        timer = Timer()
+        with activate(timer):
+            with measure('db'):
+                pass
+        self.assertIn('db', timer.phases)
+        self.assertIsNone(current())
+
+
+class SendTimingTestCase(EchoServerMixin, TestCase):
+
+    def setUp(self):
+        session_pool.close()
+        self.blueprint = RequestBlueprint.objects.create(method = 'GET', url = self.server.url + '/')
+
+    def test_send_records_timings(self):
+        record = RequestRecord.objects.get(pk = self.blueprint.send().pk)
+
+        timings = record.get_timings()
+        self.assertEqual(list(timings), ['db', 'render', 'connect', 'ttfb', 'download', 'db_write'])
+        self.assertGreater(timings['connect'], 0)
+        self.assertAlmostEqual(record.duration, sum(timings.values()), places = 2)
+
+    def test_pooled_connection_is_not_reopened(self):
+        self.blueprint.send()
+        record = self.blueprint.send()
+        self.assertNotIn('connect', record.get_timings())
+        self.assertNotIn('db', record.get_timings())
+
+    def test_duration_percentiles(self):
+        other = RequestBlueprint.objects.create(method = 'GET', url = self.server.url + '/')
+        for duration in (10, 20, 30, 40, 50):
+            RequestRecord.objects.create(blueprint = self.blueprint, duration = duration)
+        RequestRecord.objects.create(blueprint = other, duration = 7)
+        RequestRecord.objects.create(blueprint = other)
+
+        percentiles = RequestRecord.objects.duration_percentiles()
+        self.assertEqual(percentiles, {
+            self.blueprint.pk: {0.5: 30, 0.95: 48},
+            other.pk: {0.5: 7, 0.95: 7},
+        })
@@ -0,0 +1,68 @@
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from smithy import worker
+from smithy.models import RequestBlueprint, RequestRecord
+
+from tests.echo import EchoServerMixin
+
+
+@override_settings(SMITHY_WORKER_BACKOFF_BASE = 10)
+class WorkerTestCase(EchoServerMixin, TestCase):
+
+    def create_blueprint(self, url):
+        return RequestBlueprint.objects.create(method = 'GET', url = url)
+
+    def test_enqueue_creates_pending_record(self):
+        blueprint = self.create_blueprint(self.server.url + '/{{ path }}')
+        record = blueprint.enqueue({'path': 'queued'})
+        self.assertEqual(record.state, RequestRecord.PENDING)
+        self.assertEqual(record.get_context(), {'path': 'queued'})
+        self.assertEqual(self.server.requests, [])
+
+    def test_worker_sends_queued_records(self):
+        blueprint = self.create_blueprint(self.server.url + '/{{ path }}')
+        record = blueprint.enqueue({'path': 'queued'})
+
+        call_command('smithy_worker', '--once', '--concurrency', '1')
+
+        record.refresh_from_db()
+        self.assertEqual(record.state, RequestRecord.SENT)
+        self.assertEqual(record.status, 200)
+        self.assertEqual(record.attempts, 1)
+        self.assertEqual(record.url, self.server.url + '/queued')
+        self.assertIn('/queued', self.server.requests)
+
+    def test_records_that_are_not_due_are_skipped(self):
+        blueprint = self.create_blueprint(self.server.url)
+        blueprint.enqueue(delay = 60)
+        self.assertEqual(worker.work(), 0)
+
+    def test_failures_are_retried_with_backoff(self):
+        # Nothing listens on port 9 (discard) on test machines
+        blueprint = self.create_blueprint('http://127.0.0.1:9/')
+        record = blueprint.enqueue()
+
+        self.assertEqual(worker.work(), 1)
+        record.refresh_from_db()
+        self.assertEqual(record.state, RequestRecord.PENDING)
+        self.assertEqual(record.attempts, 1)
+        self.assertGreater(record.next_attempt_at, timezone.now())
+        self.assertIn('ConnectionError', record.error)
+
+    @override_settings(SMITHY_WORKER_MAX_ATTEMPTS = 1)
+    def test_records_fail_after_max_attempts(self):
+        blueprint = self.create_blueprint('http://127.0.0.1:9/')
+        record = blueprint.enqueue()
+
+        worker.work()
+        record.refresh_from_db()
+        self.assertEqual(record.state, RequestRecord.FAILED)
+        self.assertIsNone(record.next_attempt_at)
+
+    def test_backoff_grows_exponentially(self):
+        with self.settings(SMITHY_WORKER_BACKOFF_BASE = 1, SMITHY_WORKER_BACKOFF_MAX = 100):
+            self.assertTrue(0.5 <= worker.get_backoff(1) <= 1)
+            self.assertTrue(4 <= worker.get_backoff(4) <= 8)
+            self.assertTrue(50 <= worker.get_backoff(20) <= 100)